@@ -0,0 +1,173 @@
+# app/aggregation.py
+"""
+Shared OHLC aggregation SQL for ml_labeled_data.
+
+Every script that rolls one timeframe up into another (the transformation
+pipeline, aggregate_timeframes.py, create_multi_timeframes.py,
+run_3min_data.py) builds its statement here, so bucket alignment, first/last
+semantics and the derived columns are defined once.
+
+Buckets follow the NSE session grid from app.session_calendar (intraday bars
+start at 09:15 IST, daily bars at IST midnight) in both modes.
+
+open/close are taken in a single ordered pass per bucket, either with
+TimescaleDB's first()/last() aggregates or, without the extension, with
+first_value/last_value over one shared window. The derived columns are then
+computed once from the aggregated OHLC instead of re-aggregating per column.
+
+Statement parameters: $1 = symbol, then whatever `range_sql` references
+(by default $2/$3 = inclusive start/end timestamps).
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from .session_calendar import get_calendar
+
+FIRST_LAST_MODES = ("timescale", "window")
+
+DEFAULT_RANGE_SQL = "time >= $2 AND time <= $3"
+
+# Derived candle metrics, computed from the aggregated bar
+DERIVED_COLUMNS = {
+    "price_change_pct": "ROUND(((close - open) / NULLIF(open, 0) * 100)::numeric, 4)",
+    "body_size_pct": "ROUND((ABS(close - open) / NULLIF((high - low), 0) * 100)::numeric, 4)",
+    "close_position": "ROUND(((close - low) / NULLIF((high - low), 0))::numeric, 4)",
+}
+
+
+def bucket_expr(minutes: int, column: str = "time") -> str:
+    """SQL expression for the start of the session-aligned `minutes` bar containing `column`."""
+    return get_calendar().bucket_sql(minutes, column)
+
+
+def _bars_cte(source: str, bucket: str, mode: str, range_sql: str) -> str:
+    where = f"""
+            WHERE symbol = $1
+              AND timeframe = '{source}'
+              AND {range_sql}
+              AND open IS NOT NULL
+              AND high IS NOT NULL
+              AND low IS NOT NULL
+              AND close IS NOT NULL"""
+
+    if mode == "timescale":
+        return f"""
+        bars AS (
+            SELECT
+                {bucket} AS bucket_time,
+                first(open, time) AS open,
+                MAX(high) AS high,
+                MIN(low) AS low,
+                last(close, time) AS close,
+                SUM(volume) AS volume
+            FROM ml_labeled_data{where}
+            GROUP BY bucket_time
+        )"""
+
+    # One sort per bucket feeds both first_value and last_value
+    return f"""
+        ordered AS (
+            SELECT
+                {bucket} AS bucket_time,
+                high, low, volume,
+                first_value(open) OVER w AS bucket_open,
+                last_value(close) OVER w AS bucket_close
+            FROM ml_labeled_data{where}
+            WINDOW w AS (
+                PARTITION BY {bucket} ORDER BY time
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+        ),
+        bars AS (
+            SELECT
+                bucket_time,
+                MIN(bucket_open) AS open,
+                MAX(high) AS high,
+                MIN(low) AS low,
+                MIN(bucket_close) AS close,
+                SUM(volume) AS volume
+            FROM ordered
+            GROUP BY bucket_time
+        )"""
+
+
+def aggregate_select_sql(
+    source: str,
+    minutes: int,
+    mode: str = "timescale",
+    range_sql: str = DEFAULT_RANGE_SQL,
+    derived: bool = False,
+    bucket: Optional[str] = None,
+) -> str:
+    """
+    SELECT of aggregated bars (bucket_time, open, high, low, close, volume[, derived...])
+    without writing them, e.g. for verification or benchmarking.
+    """
+    if mode not in FIRST_LAST_MODES:
+        raise ValueError(f"Unknown first/last mode: {mode} (expected one of {FIRST_LAST_MODES})")
+    bucket = bucket or bucket_expr(minutes)
+    extra = "".join(f", {expr} AS {name}" for name, expr in DERIVED_COLUMNS.items()) if derived else ""
+    return f"""
+        WITH {_bars_cte(source, bucket, mode, range_sql)}
+        SELECT bucket_time, open, high, low, close, volume{extra}
+        FROM bars
+        ORDER BY bucket_time
+    """
+
+
+def aggregate_upsert_sql(
+    target: str,
+    minutes: int,
+    source: str = "1min",
+    mode: str = "timescale",
+    range_sql: str = DEFAULT_RANGE_SQL,
+    derived: bool = True,
+    labeling_version: Optional[int] = None,
+    on_conflict: str = "update",
+    bucket: Optional[str] = None,
+) -> str:
+    """
+    INSERT ... SELECT that rolls `source` rows up into `target` bars of `minutes` length.
+
+    derived           also write price_change_pct / body_size_pct / close_position
+    labeling_version  value written to labeling_version (None leaves the column out)
+    on_conflict       "update" refreshes existing bars, "nothing" keeps them
+    bucket            override the bucket start expression (defaults to bucket_expr)
+    """
+    if mode not in FIRST_LAST_MODES:
+        raise ValueError(f"Unknown first/last mode: {mode} (expected one of {FIRST_LAST_MODES})")
+    if on_conflict not in ("update", "nothing"):
+        raise ValueError(f"Unknown on_conflict action: {on_conflict}")
+    bucket = bucket or bucket_expr(minutes)
+
+    columns = ["open", "high", "low", "close", "volume"]
+    values = list(columns)
+    if derived:
+        columns += list(DERIVED_COLUMNS)
+        values += list(DERIVED_COLUMNS.values())
+    if labeling_version is not None:
+        columns.append("labeling_version")
+        values.append(str(int(labeling_version)))
+
+    if on_conflict == "update":
+        updates = ",\n                ".join(f"{c} = EXCLUDED.{c}" for c in columns)
+        conflict = f"""DO UPDATE SET
+                {updates},
+                updated_at = NOW()"""
+    else:
+        conflict = "DO NOTHING"
+
+    return f"""
+        WITH {_bars_cte(source, bucket, mode, range_sql)}
+        INSERT INTO ml_labeled_data (
+            symbol, timeframe, time, {", ".join(columns)},
+            created_at, updated_at
+        )
+        SELECT
+            $1, '{target}', bucket_time, {", ".join(values)},
+            NOW(), NOW()
+        FROM bars
+        ORDER BY bucket_time
+        ON CONFLICT (symbol, timeframe, time) {conflict}
+    """
@@ -0,0 +1,152 @@
+# app/bulk_load.py
+"""
+COPY-based bulk ingestion.
+
+Rows are streamed into a temporary staging table with COPY
+(asyncpg copy_records_to_table) and merged into the target with a single
+INSERT ... SELECT ... ON CONFLICT, so a load costs two round trips instead of
+one per row. Used by the backfill and seed scripts.
+
+Duplicate keys inside one load are collapsed before the merge; the row that
+arrived last wins.
+
+Loaders that flush often (the real-time feed) pass reuse_stage=True: the
+staging table is then created once per session and emptied on commit, so a
+flush does not add and drop catalog entries every few seconds. Temporary
+tables are never WAL-logged either way.
+"""
+from __future__ import annotations
+
+import logging
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Dict, Iterable, Optional, Sequence, Union
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+Records = Union[Iterable[Sequence[Any]], AsyncIterable[Sequence[Any]]]
+
+
+@dataclass
+class BulkLoadResult:
+    table: str
+    rows: int = 0        # rows streamed into staging
+    written: int = 0     # rows inserted or updated in the target
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.table}: {self.rows} rows staged, {self.written} written in "
+                f"{self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)")
+
+
+class _Counter:
+    """Counts records as COPY consumes them (works for sync and async iterables)."""
+
+    def __init__(self, records: Records):
+        self.records = records
+        self.count = 0
+
+    def __iter__(self):
+        for record in self.records:
+            self.count += 1
+            yield record
+
+    async def __aiter__(self):
+        async for record in self.records:
+            self.count += 1
+            yield record
+
+    def source(self):
+        return self if hasattr(self.records, "__aiter__") else iter(self)
+
+
+async def bulk_upsert(
+    conn: asyncpg.Connection,
+    table: str,
+    columns: Sequence[str],
+    records: Records,
+    key_columns: Sequence[str],
+    on_conflict: str = "nothing",
+    update_columns: Optional[Sequence[str]] = None,
+    extra_values: Optional[Dict[str, str]] = None,
+    reuse_stage: bool = False,
+) -> BulkLoadResult:
+    """
+    Stream `records` (tuples ordered like `columns`) into `table`.
+
+    key_columns     the target's conflict key
+    on_conflict     "nothing" keeps existing rows, "update" overwrites them
+    update_columns  columns refreshed on conflict (default: all non-key columns)
+    extra_values    column -> SQL expression added on insert, e.g. {"created_at": "NOW()"}
+                    (also refreshed on update unless it is created_at)
+    reuse_stage     keep the staging table for the connection's lifetime instead of
+                    creating it per call
+    """
+    if on_conflict not in ("nothing", "update"):
+        raise ValueError(f"Unknown on_conflict action: {on_conflict}")
+    extra_values = extra_values or {}
+    stage = f"_bulk_{table.split('.')[-1]}"
+    if reuse_stage:
+        # One kept stage per column list, so callers loading different columns never collide
+        stage += f"_{zlib.crc32(','.join(columns).encode()):08x}"
+    cols = ", ".join(columns)
+    keys = ", ".join(key_columns)
+    result = BulkLoadResult(table)
+    counter = _Counter(records)
+    started = time.perf_counter()
+
+    nested = conn.is_in_transaction()
+    async with conn.transaction():
+        if reuse_stage:
+            exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", f"pg_temp.{stage}")
+            if not exists:
+                await conn.execute(f"""
+                    CREATE TEMP TABLE {stage} ON COMMIT DELETE ROWS AS
+                    SELECT {cols} FROM {table} WITH NO DATA;
+                    ALTER TABLE {stage} ADD COLUMN _seq BIGSERIAL
+                """)
+            elif nested:
+                # Rows from an earlier call in the same outer transaction are still there
+                await conn.execute(f"TRUNCATE {stage}")
+        else:
+            # DROP first: inside an outer transaction ON COMMIT DROP has not fired yet
+            await conn.execute(f"""
+                DROP TABLE IF EXISTS {stage};
+                CREATE TEMP TABLE {stage} ON COMMIT DROP AS
+                SELECT {cols} FROM {table} WITH NO DATA;
+                ALTER TABLE {stage} ADD COLUMN _seq BIGSERIAL
+            """)
+        await conn.copy_records_to_table(stage, records=counter.source(), columns=list(columns))
+        result.rows = counter.count
+
+        if on_conflict == "update":
+            updates = [c for c in (update_columns or columns) if c not in key_columns]
+            updates += [c for c in extra_values if c != "created_at"]
+            conflict = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in updates)
+        else:
+            conflict = "DO NOTHING"
+
+        insert_cols = cols + "".join(f", {c}" for c in extra_values)
+        select_cols = cols + "".join(f", {expr}" for expr in extra_values.values())
+        status = await conn.execute(f"""
+            INSERT INTO {table} ({insert_cols})
+            SELECT {select_cols}
+            FROM (
+                SELECT DISTINCT ON ({keys}) {cols}
+                FROM {stage}
+                ORDER BY {keys}, _seq DESC
+            ) AS staged
+            ON CONFLICT ({keys}) {conflict}
+        """)
+        result.written = int(status.split()[-1])
+
+    result.seconds = time.perf_counter() - started
+    logger.info(f"[BULK LOAD] {result}")
+    return result
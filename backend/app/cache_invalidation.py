@@ -0,0 +1,139 @@
+# app/cache_invalidation.py
+"""
+Range-scoped invalidation of the API's Redis caches.
+
+After data under a time range is rewritten (a migration, a bulk backfill),
+only cache entries that can contain those bars are dropped; everything else
+stays warm. Keys follow the schemes the API writes:
+
+  ind:id:<id>:p:<hash>:symbol:<SYM>:tf:<tf>:ckpt       indicator checkpoint
+  ind:id:<id>:p:<hash>:symbol:<SYM>:tf:<tf>:chunk:<n>  closed indicator chunk
+  cpr:end:<to>:start:<from>:symbol:<SYM>               /indicators/cpr response
+  bars:<SYM>:<tf>:recent                               recent live bars (zset)
+
+Indicator state is cumulative, so every chunk from the first one touching a
+range onwards is stale, and so is the checkpoint. A CPR day is derived from
+the previous session, so a CPR entry is stale when a range covers the session
+before any of its days. Recent-bar sets are trimmed rather than deleted.
+
+Entries in API processes' in-memory L1 cache are not reachable from here and
+expire on their own TTL (at most five minutes).
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import TIMEFRAME_MINUTES
+from .indicator_cache import chunk_days
+from .session_calendar import IST_OFFSET_SECONDS, SessionCalendar, get_calendar
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+Range = Tuple[int, int]  # [start, end) in UTC epoch seconds
+
+
+@dataclass
+class InvalidationResult:
+    scanned: int = 0
+    deleted: List[str] = field(default_factory=list)
+    trimmed: Dict[str, int] = field(default_factory=dict)   # recent-bar key -> members removed
+    dry_run: bool = False
+
+    def __str__(self) -> str:
+        verb = "would delete" if self.dry_run else "deleted"
+        return (f"scanned {self.scanned} keys, {verb} {len(self.deleted)}, "
+                f"trimmed {sum(self.trimmed.values())} bars from {len(self.trimmed)} recent sets")
+
+
+def _pairs(parts: Sequence[str]) -> Dict[str, str]:
+    return dict(zip(parts[0::2], parts[1::2]))
+
+
+def _chunk_no(t: int, days: int) -> int:
+    return ((int(t) + IST_OFFSET_SECONDS) // SECONDS_PER_DAY) // days
+
+
+def _cpr_ranges(ranges: Sequence[Range], calendar: SessionCalendar) -> List[Range]:
+    """Extend each range to the end of the next trading day, whose CPR it feeds."""
+    extended = []
+    for start, end in ranges:
+        last = datetime.utcfromtimestamp(end - 1 + IST_OFFSET_SECONDS).date()
+        following = calendar.trading_days(last + timedelta(days=1), last + timedelta(days=10))
+        next_day = following[0] if following else last + timedelta(days=1)
+        next_midnight = int((datetime.combine(next_day, datetime.min.time()) - datetime(1970, 1, 1)).total_seconds())
+        extended.append((start, next_midnight + SECONDS_PER_DAY - IST_OFFSET_SECONDS))
+    return extended
+
+
+def stale_key(key: str, symbols: Iterable[str], ranges: Sequence[Range],
+              calendar: Optional[SessionCalendar] = None) -> bool:
+    """True when the indicator or CPR cache entry `key` may hold bars from `ranges`."""
+    parts = key.split(":")
+    if parts[0] == "ind" and len(parts) >= 10:
+        fields = _pairs(parts[1:9])
+        if fields.get("symbol") not in symbols:
+            return False
+        if parts[9] == "ckpt":
+            return True
+        if parts[9] == "chunk" and len(parts) == 11:
+            days = chunk_days(TIMEFRAME_MINUTES.get(fields.get("tf"), 1440))
+            return int(parts[10]) >= min(_chunk_no(start, days) for start, _ in ranges)
+        return False
+    if parts[0] == "cpr":
+        fields = _pairs(parts[1:])
+        if fields.get("symbol") not in symbols:
+            return False
+        lo, hi = int(fields["start"]), int(fields["end"])
+        return any(start <= hi and lo < end for start, end in _cpr_ranges(ranges, calendar or get_calendar()))
+    return False
+
+
+async def invalidate_ranges(redis_client, symbols: Iterable[str], ranges: Sequence[Range],
+                            dry_run: bool = False, batch_size: int = 500) -> InvalidationResult:
+    """
+    Drop indicator and CPR entries for `symbols` that overlap `ranges` and trim
+    the overlapping bars from their recent-bar sets. Keys are found with SCAN,
+    so Redis is never blocked; dry_run only reports what would go.
+    """
+    result = InvalidationResult(dry_run=dry_run)
+    symbols = set(symbols)
+    if not ranges or not symbols:
+        return result
+    calendar = get_calendar()
+
+    for pattern in ("ind:*", "cpr:*"):
+        doomed = []
+        async for raw in redis_client.scan_iter(match=pattern, count=batch_size):
+            key = raw.decode() if isinstance(raw, bytes) else raw
+            result.scanned += 1
+            if stale_key(key, symbols, ranges, calendar):
+                doomed.append(key)
+        result.deleted.extend(doomed)
+        if not dry_run:
+            for i in range(0, len(doomed), batch_size):
+                await redis_client.delete(*doomed[i:i + batch_size])
+
+    for symbol in sorted(symbols):
+        for tf, minutes in TIMEFRAME_MINUTES.items():
+            key = f"bars:{symbol}:{tf}:recent"
+            if not await redis_client.exists(key):
+                continue
+            result.scanned += 1
+            removed = 0
+            for start, end in ranges:
+                # Bars are scored by bucket start; a bucket that began before the range can still contain it
+                lo, hi = start - minutes * 60 + 1, end - 1
+                if dry_run:
+                    removed += await redis_client.zcount(key, lo, hi)
+                else:
+                    removed += await redis_client.zremrangebyscore(key, lo, hi)
+            if removed:
+                result.trimmed[key] = removed
+
+    logger.info(f"[CACHE INVALIDATION] {', '.join(sorted(symbols))}, {len(ranges)} ranges: {result}")
+    return result
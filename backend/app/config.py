@@ -13,6 +13,9 @@ class Settings(BaseSettings):
     db_pool_max: int = 20
     db_pool_timeout: int = 60
     db_query_timeout: int = 30  # Individual query timeout
+    db_slow_query_ms: int = 500             # statements slower than this are counted as slow
+    db_slow_query_sample_rate: float = 1.0  # share of slow statements logged (and EXPLAINed)
+    db_slow_query_explain: bool = True      # capture EXPLAIN (FORMAT JSON) for logged statements
     
     # Redis
     redis_url: str = "redis://localhost:6379"
@@ -34,6 +37,30 @@ class Settings(BaseSettings):
     refresh_interval: int = 300
     max_memory_cache_size: int = 100000  # Max records in memory
     
+    # Label propagation across timeframes
+    label_propagation_enabled: bool = True
+    label_propagation_timeframes: list[str] = ["1min", "5min", "15min", "30min", "1hour", "1day"]
+    label_propagation_down: bool = True          # coarse label -> contained finer bars
+    label_propagation_up: str = "majority"       # none | last | majority | unanimous
+    label_propagation_confidence: float = 1.0    # confidence written on propagated rows
+    
+    # NSE session calendar (times are IST, dates YYYY-MM-DD); see app/session_calendar.py
+    session_open: str = "09:15"
+    session_close: str = "15:30"
+    session_holidays: list[str] = []                      # added to the built-in NSE list
+    session_half_days: dict[str, str] = {}                # date -> early close
+    session_special_sessions: dict[str, list[str]] = {}   # date -> [open, close], e.g. Muhurat
+    
+    # Indicator checkpoints (app/indicator_cache.py): bars are frozen into the cache
+    # only this many seconds after they end, so late writes and repairs are picked up
+    indicator_settle_seconds: int = 120
+    
+    # Live bar streams (/stream/bars, /ws/bars): max pushes per second per connection
+    bar_stream_max_rate: float = 4.0
+    
+    # Admin endpoints (/admin/*): disabled unless set; requests must send it as X-Admin-Token
+    admin_token: Optional[str] = None
+    
     # API Settings
     api_title: str = "TradingView ML Visualization API"
     api_version: str = "1.0.0"
@@ -86,4 +113,20 @@ TABLE_MAP = {
     "D": "nifty50_ohlc",      # Daily: aggregate from base table
     "W": "nifty50_ohlc",      # Weekly: aggregate from base table
     "M": "nifty50_ohlc"       # Monthly: aggregate from base table
-}
\ No newline at end of file
+}
+
+# Bar length in minutes for each DB timeframe string (ml_labeled_data.timeframe)
+TIMEFRAME_MINUTES = {
+    "1min": 1,
+    "2min": 2,
+    "3min": 3,
+    "5min": 5,
+    "10min": 10,
+    "15min": 15,
+    "30min": 30,
+    "1hour": 60,
+    "1day": 1440,
+}
+
+# Timeframes the transformation pipeline stores in ml_labeled_data; others are resampled on the fly
+MATERIALIZED_TIMEFRAMES = ("1min", "2min", "3min", "5min", "15min", "30min", "1hour", "1day")
@@ -10,6 +10,12 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import asyncpg
 
+from .config import MATERIALIZED_TIMEFRAMES, TIMEFRAME_MINUTES, get_settings
+from .label_propagation import propagate_bar_label, publish_label_changes
+from .monitoring import InstrumentedConnection, InstrumentedPool, instrument_pool, slow_query_log
+from .session_calendar import resample_history
+from .streaming import publish_label_event
+
 logger = logging.getLogger("app.database")
 
 # IST timezone offset (UTC+5:30)
@@ -80,6 +86,18 @@ def _normalize_timeframe(resolution: str) -> str:
     return r
 
 
+def _resample_source(timeframe: str) -> Optional[str]:
+    """
+    Coarsest stored timeframe whose bars nest inside `timeframe`, for timeframes
+    that are not materialized in ml_labeled_data (e.g. 10min). None if stored.
+    """
+    minutes = TIMEFRAME_MINUTES.get(timeframe)
+    if minutes is None or timeframe in MATERIALIZED_TIMEFRAMES:
+        return None
+    sources = [tf for tf in MATERIALIZED_TIMEFRAMES if TIMEFRAME_MINUTES[tf] < minutes and minutes % TIMEFRAME_MINUTES[tf] == 0]
+    return max(sources, key=TIMEFRAME_MINUTES.get, default=None)
+
+
 def _as_epoch_seconds(from_ts: int, to_ts: int) -> Tuple[int, int]:
     """
     Accept seconds or milliseconds from the client. Convert to epoch seconds.
@@ -107,7 +125,8 @@ async def create_pool(
     dsn: Optional[str] = None,
     min_size: int = 10,
     max_size: int = 20,
-) -> asyncpg.Pool:
+) -> InstrumentedPool:
+    """Connection pool whose acquires and statements are measured (app/monitoring.py)."""
     dsn = (
         dsn
         or os.getenv("DATABASE_URL")
@@ -116,9 +135,15 @@ async def create_pool(
     )
     if not dsn:
         raise RuntimeError("No database DSN found in env (DATABASE_URL / TIMESCALE_DATABASE_URL / POSTGRES_URL)")
-    pool = await asyncpg.create_pool(dsn=dsn, min_size=min_size, max_size=max_size)
+    settings = get_settings()
+    slow_query_log.configure(
+        settings.db_slow_query_ms, settings.db_slow_query_sample_rate, settings.db_slow_query_explain
+    )
+    pool = await asyncpg.create_pool(
+        dsn=dsn, min_size=min_size, max_size=max_size, connection_class=InstrumentedConnection
+    )
     logger.info("Database pool created: min=%s, max=%s", min_size, max_size)
-    return pool
+    return instrument_pool(pool)
 
 
 # -----------------------------
@@ -145,6 +170,13 @@ class DataManager:
         timeframe = _normalize_timeframe(resolution)
         from_s, to_s = _as_epoch_seconds(from_timestamp, to_timestamp)
 
+        source = _resample_source(timeframe)
+        if source:
+            # Not stored: roll up the nearest finer stored timeframe on the session grid
+            ratio = TIMEFRAME_MINUTES[timeframe] // TIMEFRAME_MINUTES[source]
+            history = await self.get_history(symbol, from_s, to_s, source, limit=limit * ratio)
+            return resample_history(history, TIMEFRAME_MINUTES[timeframe])
+
         query = """
             SELECT
               "time" AS ts,
@@ -216,32 +248,39 @@ class DataManager:
             UPDATE ml_labeled_data
             SET label = $1,
                 label_confidence = $2,
+                label_source = 'user',
                 updated_at = NOW()
             WHERE symbol = $3
             AND timeframe = $4
             AND time = to_timestamp($5)
+            RETURNING time
         """
         insert_sql = """
-            INSERT INTO ml_labeled_data (symbol, timeframe, time, label, label_confidence, labeling_version, labeling_rules_used, created_at, updated_at)
-            VALUES ($1, $2, to_timestamp($3), $4, $5, 'user', '{user}', NOW(), NOW())
+            INSERT INTO ml_labeled_data (symbol, timeframe, time, label, label_confidence, label_source, labeling_version, labeling_rules_used, created_at, updated_at)
+            VALUES ($1, $2, to_timestamp($3), $4, $5, 'user', 'user', '{user}', NOW(), NOW())
+            RETURNING time
         """
 
         async with self.pool.acquire() as conn:
             tr = conn.transaction()
             await tr.start()
             try:
-                res = await conn.execute(update_sql, label, confidence, symbol_db, timeframe, t)
-                # res format like 'UPDATE 0' or 'UPDATE 1'
-                if res.split()[-1] == '0':
+                bar_time = await conn.fetchval(update_sql, label, confidence, symbol_db, timeframe, t)
+                if bar_time is None:
                     # no row — insert minimal record
-                    await conn.execute(insert_sql, symbol_db, timeframe, t, label, confidence)
+                    bar_time = await conn.fetchval(insert_sql, symbol_db, timeframe, t, label, confidence)
                 await tr.commit()
-                return True
             except Exception as e:
                 await tr.rollback()
                 logger.error("set_bar_label failed: %s", e)
                 return False
 
+            changes = await propagate_bar_label(conn, symbol_db, timeframe, bar_time)
+
+        await publish_label_event("created", symbol_db, timeframe, t, label, confidence)
+        await publish_label_changes(symbol_db, changes)
+        return True
+
 
     async def delete_bar_label(
         self,
@@ -257,18 +296,56 @@ class DataManager:
             UPDATE ml_labeled_data
             SET label = NULL,
                 label_confidence = NULL,
+                label_source = NULL,
                 updated_at = NOW()
             WHERE symbol = $1
             AND timeframe = $2
             AND time = to_timestamp($3)
+            AND label IS NOT NULL
+            RETURNING time
         """
         async with self.pool.acquire() as conn:
             try:
-                await conn.execute(sql, symbol_db, timeframe, t)
-                return True
+                bar_time = await conn.fetchval(sql, symbol_db, timeframe, t)
             except Exception as e:
                 logger.error("delete_bar_label failed: %s", e)
                 return False
+            if bar_time is None:
+                return False
+
+            changes = await propagate_bar_label(conn, symbol_db, timeframe, bar_time)
+
+        await publish_label_event("deleted", symbol_db, timeframe, t)
+        await publish_label_changes(symbol_db, changes)
+        return True
+
+    # ---------- DAILY PIVOTS ----------
+    async def get_daily_pivots(
+        self,
+        symbol: str,
+        from_timestamp: int,
+        to_timestamp: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Materialized pivot rows (see create_daily_pivots.sql) for trading days in the window.
+        Each row carries "time": the UTC epoch of the trading day's IST midnight,
+        matching the 1D bar times returned by get_history.
+        """
+        symbol_db = _normalize_symbol(symbol)
+        from_s, to_s = _as_epoch_seconds(from_timestamp, to_timestamp)
+
+        # trade_date is an IST calendar date
+        sql = """
+            SELECT *, (EXTRACT(EPOCH FROM trade_date::timestamp)::bigint - 19800) AS time
+            FROM daily_pivots
+            WHERE symbol = $1
+              AND trade_date BETWEEN (to_timestamp($2) AT TIME ZONE 'UTC')::date
+                                 AND (to_timestamp($3) AT TIME ZONE 'UTC')::date
+            ORDER BY trade_date
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(sql, symbol_db, from_s + 19800, to_s + 19800)
+        return [dict(r) for r in rows]
 
     # ---------- MARKS (fixed) ----------
     async def get_marks(
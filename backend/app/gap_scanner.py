@@ -0,0 +1,153 @@
+# app/gap_scanner.py
+"""
+Missing-minute detection for 1min source data.
+
+The session calendar supplies every expected session (holidays, half-days and
+special sessions included); Postgres expands them into minutes with
+generate_series and anti-joins against the stored bars, then collapses
+consecutive missing minutes into runs, so a year-long scan is one statement
+that returns only the gaps.
+
+Repairs are queued in aggregation_dirty_ranges (create_aggregation_dirty_ranges.sql).
+The transformation pipeline drains the queue: it re-copies the range from
+nifty50_ohlc, clears backfill checkpoints for affected days so the next
+backfill run refetches them, and re-aggregates only the buckets that contain
+the gap.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from .database import IST_OFFSET
+from .session_calendar import SessionCalendar, get_calendar
+
+logger = logging.getLogger(__name__)
+
+# Where 1min bars live and how a table's rows are selected
+GAP_SOURCES = {
+    "ml_labeled_data": "d.symbol = $1 AND d.timeframe = '1min'",
+    "nifty50_ohlc": "$1::text IS NOT NULL",  # single-instrument table
+}
+
+_SCAN_SQL = """
+    WITH sessions AS (
+        SELECT open_at, close_at
+        FROM unnest($2::timestamp[], $3::timestamp[]) AS s(open_at, close_at)
+    ),
+    expected AS (
+        SELECT generate_series(open_at, close_at - INTERVAL '1 minute', INTERVAL '1 minute') AS minute
+        FROM sessions
+    ),
+    missing AS (
+        SELECT e.minute
+        FROM expected e
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {table} d
+            WHERE {predicate} AND d.time = e.minute
+        )
+    ),
+    runs AS (
+        SELECT minute, minute - ROW_NUMBER() OVER (ORDER BY minute) * INTERVAL '1 minute' AS grp
+        FROM missing
+    )
+    SELECT MIN(minute) AS gap_start, MAX(minute) AS gap_end, COUNT(*) AS minutes
+    FROM runs
+    GROUP BY grp
+    ORDER BY gap_start
+"""
+
+
+@dataclass
+class Gap:
+    start: datetime   # first missing minute (naive IST)
+    end: datetime     # last missing minute (naive IST)
+    minutes: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "minutes": self.minutes,
+            # UTC epochs, like /history
+            "from": _utc_epoch(self.start),
+            "to": _utc_epoch(self.end),
+        }
+
+
+def _utc_epoch(naive_ist: datetime) -> int:
+    return int((naive_ist - datetime(1970, 1, 1)).total_seconds()) - int(IST_OFFSET.total_seconds())
+
+
+def _now_ist() -> datetime:
+    return datetime.utcnow() + IST_OFFSET
+
+
+def expected_sessions(start: date, end: date, calendar: Optional[SessionCalendar] = None):
+    """(opens, closes) of every session in [start, end], the running one cut at the current minute."""
+    calendar = calendar or get_calendar()
+    now = _now_ist().replace(second=0, microsecond=0)
+    opens, closes = [], []
+    for day in calendar.trading_days(start, end):
+        open_at, close_at = calendar.session_bounds(day)
+        close_at = min(close_at, now)
+        if close_at > open_at:
+            opens.append(open_at)
+            closes.append(close_at)
+    return opens, closes
+
+
+async def scan_gaps(
+    conn: asyncpg.Connection,
+    symbol: str,
+    start: date,
+    end: date,
+    source: str = "ml_labeled_data",
+    calendar: Optional[SessionCalendar] = None,
+) -> List[Gap]:
+    """Runs of missing 1min bars in [start, end] (IST trading days)."""
+    if source not in GAP_SOURCES:
+        raise ValueError(f"Unknown gap source: {source} (expected one of {list(GAP_SOURCES)})")
+    opens, closes = expected_sessions(start, end, calendar)
+    if not opens:
+        return []
+    sql = _SCAN_SQL.format(table=source, predicate=GAP_SOURCES[source])
+    rows = await conn.fetch(sql, symbol, opens, closes)
+    return [Gap(r["gap_start"], r["gap_end"], r["minutes"]) for r in rows]
+
+
+def summarize(gaps: List[Gap], start: date, end: date, calendar: Optional[SessionCalendar] = None) -> Dict[str, Any]:
+    opens, closes = expected_sessions(start, end, calendar)
+    expected = sum(int((c - o).total_seconds() // 60) for o, c in zip(opens, closes))
+    missing = sum(g.minutes for g in gaps)
+    return {
+        "sessions": len(opens),
+        "expected_minutes": expected,
+        "missing_minutes": missing,
+        "coverage_pct": round(100.0 * (expected - missing) / expected, 3) if expected else 100.0,
+        "gaps": len(gaps),
+        "days_affected": len({g.start.date() for g in gaps} | {g.end.date() for g in gaps}),
+    }
+
+
+async def enqueue_repairs(conn: asyncpg.Connection, symbol: str, gaps: List[Gap], backfill: bool = True) -> int:
+    """Queue each gap for repair; ranges already pending are not queued twice."""
+    if not gaps:
+        return 0
+    status = await conn.execute("""
+        INSERT INTO aggregation_dirty_ranges (symbol, range_start, range_end, needs_backfill)
+        SELECT $1, g.range_start, g.range_end, $4
+        FROM unnest($2::timestamp[], $3::timestamp[]) AS g(range_start, range_end)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM aggregation_dirty_ranges q
+            WHERE q.symbol = $1 AND q.status = 'pending'
+              AND q.range_start <= g.range_start AND q.range_end >= g.range_end
+        )
+    """, symbol, [g.start for g in gaps], [g.end + timedelta(seconds=59) for g in gaps], backfill)
+    queued = int(status.split()[-1])
+    logger.info(f"[GAPS] queued {queued} repair ranges for {symbol} ({len(gaps)} gaps)")
+    return queued
@@ -0,0 +1,252 @@
+# app/indicator_cache.py
+"""
+Checkpointed indicator series.
+
+For every (symbol, timeframe, indicator, params) the cache keeps:
+
+  <base>:ckpt          streaming state after the last *closed* bar, plus the
+                       outputs of the chunk that bar falls in ("open" chunk)
+  <base>:chunk:<n>     outputs of earlier, fully closed chunks
+
+Chunks are runs of whole IST calendar days sized to roughly CHUNK_BARS bars.
+A chunk that holds no bars (a weekend, a holiday, the part of the first chunk
+before the window starts) is stored empty, so it reads as cached rather than
+as missing.
+A request for the latest window reads the closed chunks, then fetches only the
+bars after the checkpoint and advances the state one bar at a time
+(indicator_engine.step). Bars that are still forming are computed on a copy of
+the state and never checkpointed. Anything the cache cannot serve (expired
+chunk, window before the cached coverage, very long tail) falls back to a
+vectorized pass over the full window, which also refreshes the checkpoint.
+
+A bar is only frozen into a chunk or the checkpoint once it is settle_seconds
+past its end, so bars the sync or aggregation is still writing are recomputed
+on every request instead of being cached for a day. Data rewritten later
+(gap repairs, migrations) is invalidated with
+app.cache_invalidation.invalidate_ranges, which the repair pipeline calls.
+"""
+from __future__ import annotations
+
+import bisect
+import copy
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .cache import CacheManager
+from .config import TIMEFRAME_MINUTES
+from .database import DataManager, _normalize_symbol, _normalize_timeframe
+from .indicator_engine import (
+    IST_OFFSET_SECONDS,
+    SECONDS_PER_DAY,
+    SESSION_MINUTES,
+    Bars,
+    IndicatorSpec,
+    init_state,
+    lookback_seconds,
+    series_to_json,
+    step_bars,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BARS = 1500        # target bars per cached chunk
+MAX_TAIL_BARS = 5000     # longer gaps since the checkpoint are recomputed vectorized
+SETTLE_SECONDS = 120     # bars younger than this after their end are never frozen
+
+
+def chunk_days(bar_minutes: int) -> int:
+    """
+    Calendar days per chunk for a bar length (daily bars use yearly chunks).
+    Sized as if every day were a session, so chunks spanning weekends and
+    holidays hold fewer than CHUNK_BARS bars.
+    """
+    if bar_minutes >= 1440:
+        return 365
+    return max(1, CHUNK_BARS * bar_minutes // SESSION_MINUTES)
+
+
+class IndicatorCheckpoints:
+    def __init__(self, cache_manager: CacheManager, ttl: Optional[int] = None, max_tail_bars: int = MAX_TAIL_BARS,
+                 settle_seconds: int = SETTLE_SECONDS):
+        self.cache = cache_manager
+        self.ttl = ttl or cache_manager.settings.cache_ttl_1d
+        self.max_tail_bars = max_tail_bars
+        self.settle_seconds = settle_seconds
+
+    def base_key(self, spec: IndicatorSpec, params: Dict[str, Any], symbol_db: str, timeframe: str) -> str:
+        phash = self.cache.get_hash_key(json.dumps(params, sort_keys=True))[:12]
+        return self.cache.get_cache_key("ind", symbol=symbol_db, tf=timeframe, id=spec.id, p=phash)
+
+    @staticmethod
+    def _chunk_no(t: int, days: int) -> int:
+        return ((int(t) + IST_OFFSET_SECONDS) // SECONDS_PER_DAY) // days
+
+    async def series(
+        self,
+        data_manager: DataManager,
+        spec: IndicatorSpec,
+        params: Dict[str, Any],
+        symbol: str,
+        resolution: str,
+        from_ts: int,
+        to_ts: int,
+        limit: int,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        JSON-ready {"t": [...], "series": {output: [...]}} for [from_ts, to_ts],
+        or None when there is no data in the window.
+        """
+        symbol_db = _normalize_symbol(symbol)
+        timeframe = _normalize_timeframe(resolution)
+        bar_minutes = TIMEFRAME_MINUTES.get(timeframe, 1440)
+        ctx = {
+            "spec": spec,
+            "params": params,
+            "symbol": symbol_db,
+            "resolution": resolution,
+            "bar_seconds": bar_minutes * 60,
+            "days": chunk_days(bar_minutes),
+            "base": self.base_key(spec, params, symbol_db, timeframe),
+            "now": int(time.time()),
+            "limit": limit,
+        }
+        # Bars starting at or before this are settled and may be checkpointed
+        ctx["frozen_until"] = ctx["now"] - ctx["bar_seconds"] - self.settle_seconds
+
+        ckpt = await self.cache.get(f"{ctx['base']}:ckpt")
+        if ckpt:
+            ckpt = copy.deepcopy(ckpt)  # the L1 entry is shared with concurrent requests
+        tail_bars = (min(to_ts, ctx["now"]) - ckpt["t"]) // ctx["bar_seconds"] if ckpt else 0
+        if ckpt and ckpt["from"] <= from_ts and tail_bars <= self.max_tail_bars:
+            result = await self._from_checkpoint(data_manager, ctx, ckpt, from_ts, to_ts)
+            if result is not None:
+                return result
+            logger.info(f"[INDICATOR CACHE] {ctx['base']}: chunk missing, recomputing")
+        return await self._full(data_manager, ctx, ckpt, from_ts, to_ts)
+
+    async def _from_checkpoint(self, data_manager: DataManager, ctx: Dict[str, Any], ckpt: Dict[str, Any],
+                               from_ts: int, to_ts: int) -> Optional[Dict[str, Any]]:
+        spec, base = ctx["spec"], ctx["base"]
+        t_out: List[int] = []
+        s_out: Dict[str, List[Optional[float]]] = {name: [] for name in spec.outputs}
+
+        if from_ts <= ckpt["t"]:
+            for no in range(self._chunk_no(from_ts, ctx["days"]), ckpt["chunk"]):
+                part = await self.cache.get(f"{base}:chunk:{no}")
+                if part is None:
+                    return None
+                _extend(t_out, s_out, part)
+            _extend(t_out, s_out, ckpt["open"])
+
+        if to_ts > ckpt["t"]:
+            history = await data_manager.get_history(
+                ctx["symbol"], ckpt["t"] + 1, to_ts, ctx["resolution"], limit=ctx["limit"]
+            )
+            if history.get("s") == "ok":
+                bars = Bars.from_history(history)
+                bars = bars.slice(int(np.searchsorted(bars.t, ckpt["t"], side="right")))
+                n_closed = int(np.searchsorted(bars.t, ctx["frozen_until"], side="right"))
+                if n_closed:
+                    closed = bars.slice(0, n_closed)
+                    outputs = step_bars(spec.id, ckpt["state"], closed, ctx["params"])
+                    await self._advance(ctx, ckpt, closed, outputs)
+                    _extend(t_out, s_out, _to_json(closed.t, outputs))
+                if n_closed < len(bars):
+                    forming = bars.slice(n_closed)
+                    outputs = step_bars(spec.id, ckpt["state"], forming, ctx["params"], commit=False)
+                    _extend(t_out, s_out, _to_json(forming.t, outputs))
+
+        lo, hi = bisect.bisect_left(t_out, from_ts), bisect.bisect_right(t_out, to_ts)
+        if lo >= hi:
+            return None
+        return {"t": t_out[lo:hi], "series": {name: values[lo:hi] for name, values in s_out.items()}}
+
+    async def _advance(self, ctx: Dict[str, Any], ckpt: Dict[str, Any], closed: Bars, outputs: Dict[str, np.ndarray]):
+        """Move the checkpoint past newly closed bars, flushing chunks they close out."""
+        base, days = ctx["base"], ctx["days"]
+        chunk_nos = (closed.session_ids() // days).tolist()
+        start = 0
+        for i in range(len(closed) + 1):
+            if i < len(closed) and chunk_nos[i] == ckpt["chunk"]:
+                continue
+            _extend(ckpt["open"]["t"], ckpt["open"]["series"], _to_json(closed.t[start:i], {k: v[start:i] for k, v in outputs.items()}))
+            if i == len(closed):
+                break
+            await self.cache.set(f"{base}:chunk:{ckpt['chunk']}", ckpt["open"], self.ttl)
+            await self._write_empty(base, outputs, ckpt["chunk"] + 1, chunk_nos[i])
+            ckpt["chunk"] = chunk_nos[i]
+            ckpt["open"] = {"t": [], "series": {name: [] for name in outputs}}
+            start = i
+        ckpt["t"] = int(closed.t[-1])
+        await self.cache.set(f"{base}:ckpt", ckpt, self.ttl)
+
+    async def _full(self, data_manager: DataManager, ctx: Dict[str, Any], ckpt: Optional[Dict[str, Any]],
+                    from_ts: int, to_ts: int) -> Optional[Dict[str, Any]]:
+        spec, params = ctx["spec"], ctx["params"]
+        fetch_from = from_ts - lookback_seconds(spec, params, ctx["bar_seconds"] // 60)
+        history = await data_manager.get_history(ctx["symbol"], fetch_from, to_ts, ctx["resolution"], limit=ctx["limit"])
+        if history.get("s") != "ok":
+            return None
+
+        bars = Bars.from_history(history)
+        outputs = spec.func(bars, **params)
+        keep = int(np.searchsorted(bars.t, from_ts))
+        if keep >= len(bars):
+            return None
+        window_t = bars.t[keep:]
+        window = {name: values[keep:] for name, values in outputs.items()}
+
+        # Checkpoint the last settled bar unless a newer checkpoint already exists
+        n_closed = int(np.searchsorted(bars.t, ctx["frozen_until"], side="right"))
+        if n_closed > keep and (not ckpt or bars.t[n_closed - 1] >= ckpt["t"]):
+            try:
+                await self._write(ctx, bars, window_t, window, keep, n_closed, from_ts)
+            except Exception as e:
+                logger.error(f"[INDICATOR CACHE] checkpoint write failed for {ctx['base']}: {e}")
+
+        return _to_json(window_t, window)
+
+    async def _write(self, ctx: Dict[str, Any], bars: Bars, window_t: np.ndarray, window: Dict[str, np.ndarray],
+                     keep: int, n_closed: int, from_ts: int):
+        base, days = ctx["base"], ctx["days"]
+        closed = n_closed - keep
+        chunk_nos = (bars.slice(keep, n_closed).session_ids() // days)
+        bounds = np.flatnonzero(np.r_[True, chunk_nos[1:] != chunk_nos[:-1], True])
+        expected = self._chunk_no(from_ts, days)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            no = int(chunk_nos[a])
+            await self._write_empty(base, window, expected, no)
+            expected = no + 1
+            if b < closed:
+                part = _to_json(window_t[a:b], {k: v[a:b] for k, v in window.items()})
+                await self.cache.set(f"{base}:chunk:{no}", part, self.ttl)
+
+        a = int(bounds[-2])
+        ckpt = {
+            "t": int(bars.t[n_closed - 1]),
+            "from": from_ts,
+            "chunk": int(chunk_nos[-1]),
+            "state": init_state(ctx["spec"].id, bars.slice(0, n_closed), ctx["params"]),
+            "open": _to_json(window_t[a:closed], {k: v[a:closed] for k, v in window.items()}),
+        }
+        await self.cache.set(f"{base}:ckpt", ckpt, self.ttl)
+
+    async def _write_empty(self, base: str, outputs: Dict[str, Any], start: int, stop: int):
+        """Store chunks [start, stop) as empty; they hold no bars and must not read as missing."""
+        empty = {"t": [], "series": {name: [] for name in outputs}}
+        for no in range(start, stop):
+            await self.cache.set(f"{base}:chunk:{no}", empty, self.ttl)
+
+
+def _to_json(t: np.ndarray, outputs: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    return {"t": t.tolist(), "series": {name: series_to_json(values) for name, values in outputs.items()}}
+
+
+def _extend(t_out: List[int], s_out: Dict[str, List[Optional[float]]], part: Dict[str, Any]):
+    t_out.extend(part["t"])
+    for name, values in s_out.items():
+        values.extend(part["series"][name])
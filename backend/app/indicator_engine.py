@@ -0,0 +1,643 @@
+# app/indicator_engine.py
+"""
+Vectorized technical indicator engine.
+
+Indicators operate on the columnar arrays returned by DataManager.get_history
+({"t", "o", "h", "l", "c", "v"}) and return a dict of output series aligned
+with "t". Values inside an indicator's warm-up are NaN.
+
+Everything is expressed as whole-array NumPy operations except SuperTrend's
+band ratchet, which is inherently sequential and runs as one tight loop.
+
+Every indicator can also be advanced one closed bar at a time (init_state /
+step) so a cached checkpoint only has to process the bars appended since it
+was taken; see app/indicator_cache.py.
+"""
+from __future__ import annotations
+
+import copy
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# get_history returns UTC epochs; trading sessions are IST calendar days
+IST_OFFSET_SECONDS = 19800
+SECONDS_PER_DAY = 86400
+SESSION_MINUTES = 375  # 09:15 - 15:30 IST
+
+
+# -----------------------------
+# Input container
+# -----------------------------
+@dataclass
+class Bars:
+    t: np.ndarray  # int64 epoch seconds (UTC)
+    o: np.ndarray
+    h: np.ndarray
+    l: np.ndarray
+    c: np.ndarray
+    v: np.ndarray
+
+    @classmethod
+    def from_history(cls, history: Mapping[str, Any]) -> "Bars":
+        """Build from a get_history() payload (lists keyed t/o/h/l/c/v)."""
+        n = len(history.get("t") or [])
+        return cls(
+            t=np.asarray(history.get("t") or [], dtype=np.int64),
+            o=np.asarray(history.get("o") or [], dtype=np.float64),
+            h=np.asarray(history.get("h") or [], dtype=np.float64),
+            l=np.asarray(history.get("l") or [], dtype=np.float64),
+            c=np.asarray(history.get("c") or [], dtype=np.float64),
+            v=np.asarray(history.get("v") or np.zeros(n), dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def slice(self, start: int, stop: Optional[int] = None) -> "Bars":
+        return Bars(*(a[start:stop] for a in (self.t, self.o, self.h, self.l, self.c, self.v)))
+
+    def session_ids(self) -> np.ndarray:
+        """IST trading-day number for every bar."""
+        return (self.t + IST_OFFSET_SECONDS) // SECONDS_PER_DAY
+
+
+def _session_bounds(session_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start index of every session and the session ordinal of every bar."""
+    starts = np.flatnonzero(np.r_[True, session_ids[1:] != session_ids[:-1]])
+    ordinal = np.cumsum(np.r_[True, session_ids[1:] != session_ids[:-1]]) - 1
+    return starts, ordinal
+
+
+def _nan(n: int) -> np.ndarray:
+    return np.full(n, np.nan)
+
+
+# -----------------------------
+# Kernels
+# -----------------------------
+def _ewm(x: np.ndarray, alpha: float, seed: Optional[float] = None) -> np.ndarray:
+    """
+    y[i] = y[i-1] + alpha * (x[i] - y[i-1]), with y[-1] = seed (defaults to x[0]).
+
+    Solved block-wise in closed form: within a block
+    y[k] = b^(k+1) * y_prev + alpha * b^k * cumsum(x[j] / b^j), b = 1 - alpha,
+    with the block length capped so b^k never under/overflows.
+    """
+    n = len(x)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    b = 1.0 - alpha
+    if b <= 0.0:
+        out[:] = x
+        return out
+    y_prev = float(x[0]) if seed is None else float(seed)
+    block = n if b == 1.0 else max(1, min(n, int(math.log(1e-150) / math.log(b))))
+    w_full = b ** np.arange(block)
+    for start in range(0, n, block):
+        xs = x[start:start + block]
+        w = w_full[:len(xs)]
+        ys = b * w * y_prev + alpha * w * np.cumsum(xs / w)
+        out[start:start + len(xs)] = ys
+        y_prev = ys[-1]
+    return out
+
+
+def _rolling_mean(x: np.ndarray, period: int) -> np.ndarray:
+    out = _nan(len(x))
+    if period <= 0 or len(x) < period:
+        return out
+    cs = np.cumsum(np.r_[0.0, x])
+    out[period - 1:] = (cs[period:] - cs[:-period]) / period
+    return out
+
+
+def _wilder(x: np.ndarray, period: int, first: int) -> np.ndarray:
+    """Wilder smoothing seeded with the SMA of x[first:first+period]."""
+    out = _nan(len(x))
+    seed_at = first + period - 1
+    if seed_at >= len(x):
+        return out
+    out[seed_at] = x[first:seed_at + 1].mean()
+    out[seed_at + 1:] = _ewm(x[seed_at + 1:], 1.0 / period, seed=out[seed_at])
+    return out
+
+
+def _true_range(bars: Bars) -> np.ndarray:
+    prev_c = np.r_[bars.c[0], bars.c[:-1]] if len(bars) else bars.c
+    return np.maximum.reduce([bars.h - bars.l, np.abs(bars.h - prev_c), np.abs(bars.l - prev_c)])
+
+
+# -----------------------------
+# Indicators
+# -----------------------------
+def sma(bars: Bars, period: int = 20) -> Dict[str, np.ndarray]:
+    return {"sma": _rolling_mean(bars.c, period)}
+
+
+def ema(bars: Bars, period: int = 20) -> Dict[str, np.ndarray]:
+    out = _ewm(bars.c, 2.0 / (period + 1))
+    out[:period - 1] = np.nan
+    return {"ema": out}
+
+
+def _rsi_averages(bars: Bars, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    delta = np.diff(bars.c, prepend=bars.c[:1])
+    avg_gain = _wilder(np.clip(delta, 0.0, None), period, first=1)
+    avg_loss = _wilder(np.clip(-delta, 0.0, None), period, first=1)
+    return avg_gain, avg_loss
+
+
+def rsi(bars: Bars, period: int = 14) -> Dict[str, np.ndarray]:
+    avg_gain, avg_loss = _rsi_averages(bars, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    out[(avg_loss == 0) & ~np.isnan(avg_gain)] = 100.0
+    return {"rsi": out}
+
+
+def atr(bars: Bars, period: int = 14) -> Dict[str, np.ndarray]:
+    return {"atr": _wilder(_true_range(bars), period, first=0)}
+
+
+def bollinger(bars: Bars, period: int = 20, mult: float = 2.0) -> Dict[str, np.ndarray]:
+    mid = _rolling_mean(bars.c, period)
+    std = _nan(len(bars))
+    if len(bars) >= period:
+        std[period - 1:] = sliding_window_view(bars.c, period).std(axis=1)
+    return {"middle": mid, "upper": mid + mult * std, "lower": mid - mult * std}
+
+
+def _session_cumsum(x: np.ndarray, starts: np.ndarray, ordinal: np.ndarray) -> np.ndarray:
+    """Running total of x that restarts at every session boundary."""
+    cum = np.cumsum(x)
+    # subtract the running total carried in from earlier sessions
+    return cum - np.r_[0.0, cum][starts][ordinal]
+
+
+def _vwap_sums(bars: Bars) -> Dict[str, np.ndarray]:
+    tp = (bars.h + bars.l + bars.c) / 3.0
+    starts, ordinal = _session_bounds(bars.session_ids())
+    return {
+        "pv": _session_cumsum(tp * bars.v, starts, ordinal),
+        "vol": _session_cumsum(bars.v, starts, ordinal),
+        "tp": _session_cumsum(tp, starts, ordinal),
+        "n": np.arange(len(bars)) - starts[ordinal] + 1.0,
+    }
+
+
+def vwap(bars: Bars) -> Dict[str, np.ndarray]:
+    """
+    Session-anchored VWAP. Until the session has traded volume (index feeds
+    never do) the typical price is equal-weighted instead, so the value at a bar
+    only depends on bars up to it.
+    """
+    if len(bars) == 0:
+        return {"vwap": _nan(0)}
+    sums = _vwap_sums(bars)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(sums["vol"] > 0, sums["pv"] / sums["vol"], sums["tp"] / sums["n"])
+    return {"vwap": out}
+
+
+def _supertrend_run(bars: Bars, period: int, multiplier: float, atr_v: np.ndarray) -> Tuple[Dict[str, np.ndarray], Tuple[float, float, float]]:
+    """SuperTrend series plus the final (upper, lower, trend) band state."""
+    n = len(bars)
+    line, direction = _nan(n), _nan(n)
+    hl2 = (bars.h + bars.l) / 2.0
+    basic_upper = (hl2 + multiplier * atr_v).tolist()
+    basic_lower = (hl2 - multiplier * atr_v).tolist()
+    close = bars.c.tolist()
+
+    first = period - 1
+    if first >= n:
+        return {"supertrend": line, "direction": direction}, (math.nan, math.nan, math.nan)
+
+    upper, lower, trend = basic_upper[first], basic_lower[first], 1.0
+    st, dr = [math.nan] * n, [math.nan] * n
+    st[first], dr[first] = lower, trend
+    for i in range(first + 1, n):
+        prev_close = close[i - 1]
+        upper = basic_upper[i] if basic_upper[i] < upper or prev_close > upper else upper
+        lower = basic_lower[i] if basic_lower[i] > lower or prev_close < lower else lower
+        if trend > 0 and close[i] < lower:
+            trend = -1.0
+        elif trend < 0 and close[i] > upper:
+            trend = 1.0
+        st[i] = lower if trend > 0 else upper
+        dr[i] = trend
+    return {"supertrend": np.asarray(st), "direction": np.asarray(dr)}, (upper, lower, trend)
+
+
+def supertrend(bars: Bars, period: int = 10, multiplier: float = 3.0) -> Dict[str, np.ndarray]:
+    atr_v = _wilder(_true_range(bars), period, first=0)
+    return _supertrend_run(bars, period, multiplier, atr_v)[0]
+
+
+def pivot_levels(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Pivot levels from a prior period's HLC: floor-trader CPR (same formulas as
+    routes/indicators.calculate_cpr) plus Camarilla and Fibonacci pivots.
+    Mirrors refresh_daily_pivots() in create_daily_pivots.sql.
+    """
+    pivot = (high + low + close) / 3.0
+    bc = (high + low) / 2.0
+    tc = 2.0 * pivot - bc
+    rng = high - low
+    return {
+        "pivot": pivot,
+        "bc": bc,
+        "tc": tc,
+        "r1": 2.0 * pivot - low,
+        "r2": pivot + rng,
+        "r3": high + 2.0 * (pivot - low),
+        "s1": 2.0 * pivot - high,
+        "s2": pivot - rng,
+        "s3": low - 2.0 * (high - pivot),
+        "prev_high": high,
+        "prev_low": low,
+        "prev_close": close,
+        # Camarilla / Fibonacci
+        **{f"cam_r{i}": close + rng * 1.1 / d for i, d in ((1, 12), (2, 6), (3, 4), (4, 2))},
+        **{f"cam_s{i}": close - rng * 1.1 / d for i, d in ((1, 12), (2, 6), (3, 4), (4, 2))},
+        **{f"fib_r{i}": pivot + f * rng for i, f in ((1, 0.382), (2, 0.618), (3, 1.0))},
+        **{f"fib_s{i}": pivot - f * rng for i, f in ((1, 0.382), (2, 0.618), (3, 1.0))},
+    }
+
+
+def session_cpr(bars: Bars) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    CPR per trading session from the previous session's HLC.
+    Works on any resolution (daily bars are one-bar sessions).
+    Returns (first bar time of each session, levels per session); the first session is NaN.
+    """
+    if len(bars) == 0:
+        empty = np.empty(0)
+        return bars.t, pivot_levels(empty, empty, empty)
+    starts, _ = _session_bounds(bars.session_ids())
+    ends = np.r_[starts[1:], len(bars)] - 1
+    day_high = np.maximum.reduceat(bars.h, starts)
+    day_low = np.minimum.reduceat(bars.l, starts)
+    day_close = bars.c[ends]
+    # shift by one session: today's levels come from yesterday's HLC
+    prev_high, prev_low, prev_close = (np.r_[np.nan, a[:-1]] for a in (day_high, day_low, day_close))
+    return bars.t[starts], pivot_levels(prev_high, prev_low, prev_close)
+
+
+CPR_OUTPUTS = ("pivot", "bc", "tc", "r1", "r2", "r3", "s1", "s2", "s3")
+
+
+def cpr(bars: Bars) -> Dict[str, np.ndarray]:
+    """CPR levels broadcast onto every bar of the session they apply to."""
+    if len(bars) == 0:
+        return {k: _nan(0) for k in CPR_OUTPUTS}
+    _, ordinal = _session_bounds(bars.session_ids())
+    _, levels = session_cpr(bars)
+    return {k: levels[k][ordinal] for k in CPR_OUTPUTS}
+
+
+# -----------------------------
+# Streaming state
+# -----------------------------
+# State is a plain JSON-serialisable dict so it can be checkpointed in Redis.
+# <id>_state(bars, **params) returns the state after the last bar of `bars`,
+# derived from the vectorized kernels where the warm-up is complete and folded
+# bar by bar otherwise. <id>_step(state, bar, **params) applies one bar
+# (t, o, h, l, c, v) in place and returns that bar's outputs; it is O(1) except
+# for the O(period) window shift of SMA/Bollinger.
+Bar = Tuple[float, float, float, float, float, float]
+
+
+def _iter_bars(bars: Bars):
+    return zip(*(a.tolist() for a in (bars.t, bars.o, bars.h, bars.l, bars.c, bars.v)))
+
+
+def _fold(step_func: Callable[..., Dict[str, float]], state: Dict[str, Any], bars: Bars, **params) -> Dict[str, Any]:
+    for bar in _iter_bars(bars):
+        step_func(state, bar, **params)
+    return state
+
+
+def _window_state(bars: Bars, period: int) -> Dict[str, Any]:
+    window = bars.c[-period:]
+    return {"window": window.tolist(), "sum": float(window.sum()), "sumsq": float((window * window).sum())}
+
+
+def _window_push(state: Dict[str, Any], x: float, period: int) -> bool:
+    """Slide the close window by one bar; True once it holds `period` values."""
+    window = state["window"]
+    window.append(x)
+    state["sum"] += x
+    state["sumsq"] += x * x
+    if len(window) > period:
+        old = window.pop(0)
+        state["sum"] -= old
+        state["sumsq"] -= old * old
+    return len(window) == period
+
+
+def sma_state(bars: Bars, period: int = 20) -> Dict[str, Any]:
+    return _window_state(bars, period)
+
+
+def sma_step(state: Dict[str, Any], bar: Bar, period: int = 20) -> Dict[str, float]:
+    full = _window_push(state, bar[4], period)
+    return {"sma": state["sum"] / period if full else math.nan}
+
+
+def bollinger_state(bars: Bars, period: int = 20, mult: float = 2.0) -> Dict[str, Any]:
+    return _window_state(bars, period)
+
+
+def bollinger_step(state: Dict[str, Any], bar: Bar, period: int = 20, mult: float = 2.0) -> Dict[str, float]:
+    if not _window_push(state, bar[4], period):
+        return {"middle": math.nan, "upper": math.nan, "lower": math.nan}
+    mid = state["sum"] / period
+    std = math.sqrt(max(state["sumsq"] / period - mid * mid, 0.0))
+    return {"middle": mid, "upper": mid + mult * std, "lower": mid - mult * std}
+
+
+def ema_state(bars: Bars, period: int = 20) -> Dict[str, Any]:
+    n = len(bars)
+    return {"n": n, "ema": float(_ewm(bars.c, 2.0 / (period + 1))[-1]) if n else None}
+
+
+def ema_step(state: Dict[str, Any], bar: Bar, period: int = 20) -> Dict[str, float]:
+    x = bar[4]
+    state["ema"] = x if state["n"] == 0 else state["ema"] + 2.0 / (period + 1) * (x - state["ema"])
+    state["n"] += 1
+    return {"ema": state["ema"] if state["n"] >= period else math.nan}
+
+
+def _rsi_value(avg_gain: float, avg_loss: float) -> float:
+    return 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def rsi_state(bars: Bars, period: int = 14) -> Dict[str, Any]:
+    state = {"n": 0, "prev": None, "gain": 0.0, "loss": 0.0}
+    if len(bars) <= period:
+        return _fold(rsi_step, state, bars, period=period)
+    avg_gain, avg_loss = _rsi_averages(bars, period)
+    return {"n": len(bars), "prev": float(bars.c[-1]), "gain": float(avg_gain[-1]), "loss": float(avg_loss[-1])}
+
+
+def rsi_step(state: Dict[str, Any], bar: Bar, period: int = 14) -> Dict[str, float]:
+    x, deltas = bar[4], state["n"]
+    state["n"] += 1
+    if deltas == 0:
+        state["prev"] = x
+        return {"rsi": math.nan}
+    delta, state["prev"] = x - state["prev"], x
+    gain, loss = max(delta, 0.0), max(-delta, 0.0)
+    if deltas < period:            # still summing the seed window
+        state["gain"] += gain
+        state["loss"] += loss
+        return {"rsi": math.nan}
+    if deltas == period:           # seed: SMA of the first `period` moves
+        state["gain"] = (state["gain"] + gain) / period
+        state["loss"] = (state["loss"] + loss) / period
+    else:
+        state["gain"] += (gain - state["gain"]) / period
+        state["loss"] += (loss - state["loss"]) / period
+    return {"rsi": _rsi_value(state["gain"], state["loss"])}
+
+
+def _atr_state(bars: Bars, period: int) -> Tuple[Dict[str, Any], np.ndarray]:
+    atr_v = _wilder(_true_range(bars), period, first=0)
+    if len(bars) < period:
+        state = {"n": 0, "prev": None, "atr": 0.0}
+        for bar in _iter_bars(bars):
+            _atr_push(state, bar, period)
+        return state, atr_v
+    return {"n": len(bars), "prev": float(bars.c[-1]), "atr": float(atr_v[-1])}, atr_v
+
+
+def _atr_push(state: Dict[str, Any], bar: Bar, period: int) -> float:
+    """Advance Wilder ATR by one bar; NaN until `period` true ranges are in."""
+    _, _, h, l, c, _ = bar
+    prev = state["prev"]
+    tr = h - l if prev is None else max(h - l, abs(h - prev), abs(l - prev))
+    state["prev"] = c
+    state["n"] += 1
+    n = state["n"]
+    if n < period:
+        state["atr"] += tr
+        return math.nan
+    if n == period:
+        state["atr"] = (state["atr"] + tr) / period
+    else:
+        state["atr"] += (tr - state["atr"]) / period
+    return state["atr"]
+
+
+def atr_state(bars: Bars, period: int = 14) -> Dict[str, Any]:
+    return _atr_state(bars, period)[0]
+
+
+def atr_step(state: Dict[str, Any], bar: Bar, period: int = 14) -> Dict[str, float]:
+    return {"atr": _atr_push(state, bar, period)}
+
+
+def supertrend_state(bars: Bars, period: int = 10, multiplier: float = 3.0) -> Dict[str, Any]:
+    atr_st, atr_v = _atr_state(bars, period)
+    _, (upper, lower, trend) = _supertrend_run(bars, period, multiplier, atr_v)
+    if len(bars) < period:
+        upper = lower = trend = None
+    return {"atr": atr_st, "upper": upper, "lower": lower, "trend": trend}
+
+
+def supertrend_step(state: Dict[str, Any], bar: Bar, period: int = 10, multiplier: float = 3.0) -> Dict[str, float]:
+    _, _, h, l, c, _ = bar
+    prev_close = state["atr"]["prev"]
+    atr_now = _atr_push(state["atr"], bar, period)
+    if atr_now != atr_now:
+        return {"supertrend": math.nan, "direction": math.nan}
+    hl2 = (h + l) / 2.0
+    basic_upper, basic_lower = hl2 + multiplier * atr_now, hl2 - multiplier * atr_now
+    if state["trend"] is None:
+        upper, lower, trend = basic_upper, basic_lower, 1.0
+    else:
+        upper, lower, trend = state["upper"], state["lower"], state["trend"]
+        upper = basic_upper if basic_upper < upper or prev_close > upper else upper
+        lower = basic_lower if basic_lower > lower or prev_close < lower else lower
+        if trend > 0 and c < lower:
+            trend = -1.0
+        elif trend < 0 and c > upper:
+            trend = 1.0
+    state.update(upper=upper, lower=lower, trend=trend)
+    return {"supertrend": lower if trend > 0 else upper, "direction": trend}
+
+
+def _session_of(t: float) -> int:
+    return (int(t) + IST_OFFSET_SECONDS) // SECONDS_PER_DAY
+
+
+def vwap_state(bars: Bars) -> Dict[str, Any]:
+    if len(bars) == 0:
+        return {"session": None, "pv": 0.0, "vol": 0.0, "tp": 0.0, "n": 0.0}
+    sums = _vwap_sums(bars)
+    return {"session": _session_of(bars.t[-1]), **{k: float(v[-1]) for k, v in sums.items()}}
+
+
+def vwap_step(state: Dict[str, Any], bar: Bar) -> Dict[str, float]:
+    t, _, h, l, c, v = bar
+    session = _session_of(t)
+    if session != state["session"]:
+        state.update(session=session, pv=0.0, vol=0.0, tp=0.0, n=0.0)
+    tp = (h + l + c) / 3.0
+    state["pv"] += tp * v
+    state["vol"] += v
+    state["tp"] += tp
+    state["n"] += 1.0
+    return {"vwap": state["pv"] / state["vol"] if state["vol"] > 0 else state["tp"] / state["n"]}
+
+
+def cpr_state(bars: Bars) -> Dict[str, Any]:
+    if len(bars) == 0:
+        return {"session": None, "high": None, "low": None, "close": None, "levels": None}
+    starts, _ = _session_bounds(bars.session_ids())
+    _, levels = session_cpr(bars)
+    last = {k: float(levels[k][-1]) for k in CPR_OUTPUTS}
+    start = starts[-1]
+    return {
+        "session": _session_of(bars.t[-1]),
+        "high": float(bars.h[start:].max()),
+        "low": float(bars.l[start:].min()),
+        "close": float(bars.c[-1]),
+        "levels": None if math.isnan(last["pivot"]) else last,
+    }
+
+
+def cpr_step(state: Dict[str, Any], bar: Bar) -> Dict[str, float]:
+    t, _, h, l, c, _ = bar
+    session = _session_of(t)
+    if session != state["session"]:
+        if state["session"] is not None:
+            levels = pivot_levels(state["high"], state["low"], state["close"])
+            state["levels"] = {k: levels[k] for k in CPR_OUTPUTS}
+        state.update(session=session, high=h, low=l)
+    state["high"] = max(state["high"], h)
+    state["low"] = min(state["low"], l)
+    state["close"] = c
+    levels = state["levels"]
+    return {k: levels[k] if levels else math.nan for k in CPR_OUTPUTS}
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+@dataclass(frozen=True)
+class IndicatorSpec:
+    id: str
+    name: str
+    description: str
+    func: Callable[..., Dict[str, np.ndarray]]
+    outputs: Tuple[str, ...]
+    params: Dict[str, Any] = field(default_factory=dict)       # defaults; types drive parsing
+    warmup: Callable[[Dict[str, Any]], int] = lambda p: 0     # bars before the first valid value
+    session_warmup: bool = False                               # needs the whole previous session
+    state_func: Optional[Callable[..., Dict[str, Any]]] = None  # streaming state after a run of bars
+    step_func: Optional[Callable[..., Dict[str, float]]] = None  # advance that state by one bar
+
+    def parse_params(self, raw: Mapping[str, Any]) -> Dict[str, Any]:
+        """Merge caller-supplied params over defaults, coercing to the default's type."""
+        params = dict(self.params)
+        for key, default in self.params.items():
+            if key not in raw or raw[key] is None:
+                continue
+            try:
+                params[key] = type(default)(raw[key])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {self.id}.{key}: {raw[key]!r}")
+            if isinstance(default, int) and params[key] < 1:
+                raise ValueError(f"{self.id}.{key} must be >= 1")
+        return params
+
+
+INDICATORS: Dict[str, IndicatorSpec] = {
+    spec.id: spec for spec in (
+        IndicatorSpec("sma", "Simple Moving Average", "Arithmetic mean of the last N closes",
+                      sma, ("sma",), {"period": 20}, lambda p: p["period"],
+                      state_func=sma_state, step_func=sma_step),
+        IndicatorSpec("ema", "Exponential Moving Average", "Exponentially weighted mean of closes",
+                      ema, ("ema",), {"period": 20}, lambda p: 4 * p["period"],
+                      state_func=ema_state, step_func=ema_step),
+        IndicatorSpec("rsi", "Relative Strength Index", "Wilder RSI of closes",
+                      rsi, ("rsi",), {"period": 14}, lambda p: 5 * p["period"],
+                      state_func=rsi_state, step_func=rsi_step),
+        IndicatorSpec("atr", "Average True Range", "Wilder-smoothed true range",
+                      atr, ("atr",), {"period": 14}, lambda p: 5 * p["period"],
+                      state_func=atr_state, step_func=atr_step),
+        IndicatorSpec("bollinger", "Bollinger Bands", "SMA with N standard deviation bands",
+                      bollinger, ("middle", "upper", "lower"), {"period": 20, "mult": 2.0}, lambda p: p["period"],
+                      state_func=bollinger_state, step_func=bollinger_step),
+        IndicatorSpec("vwap", "Volume Weighted Average Price", "Session-anchored VWAP",
+                      vwap, ("vwap",), {}, lambda p: 0, session_warmup=True,
+                      state_func=vwap_state, step_func=vwap_step),
+        IndicatorSpec("supertrend", "SuperTrend", "ATR trailing stop with trend direction",
+                      supertrend, ("supertrend", "direction"), {"period": 10, "multiplier": 3.0},
+                      lambda p: 5 * p["period"], state_func=supertrend_state, step_func=supertrend_step),
+        IndicatorSpec("cpr", "Central Pivot Range", "Daily pivot points with support and resistance levels",
+                      cpr, CPR_OUTPUTS, {}, lambda p: 0, session_warmup=True,
+                      state_func=cpr_state, step_func=cpr_step),
+    )
+}
+
+
+def compute(indicator_id: str, bars: Bars, params: Optional[Mapping[str, Any]] = None) -> Dict[str, np.ndarray]:
+    spec = INDICATORS[indicator_id]
+    return spec.func(bars, **spec.parse_params(params or {}))
+
+
+def init_state(indicator_id: str, bars: Bars, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Streaming state after the last bar of `bars` (params already parsed)."""
+    return INDICATORS[indicator_id].state_func(bars, **params)
+
+
+def step(indicator_id: str, state: Dict[str, Any], bar: Bar, params: Dict[str, Any]) -> Dict[str, float]:
+    """Apply one bar to `state` in place and return that bar's outputs."""
+    return INDICATORS[indicator_id].step_func(state, bar, **params)
+
+
+def step_bars(indicator_id: str, state: Dict[str, Any], bars: Bars, params: Dict[str, Any],
+              commit: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Run `bars` through step() and return their outputs as arrays.
+    With commit=False the bars are applied to a copy (e.g. a still-forming bar).
+    """
+    spec = INDICATORS[indicator_id]
+    if not commit:
+        state = copy.deepcopy(state)
+    out = {name: np.empty(len(bars)) for name in spec.outputs}
+    for i, bar in enumerate(_iter_bars(bars)):
+        for name, value in spec.step_func(state, bar, **params).items():
+            out[name][i] = value
+    return out
+
+
+def lookback_seconds(spec: IndicatorSpec, params: Dict[str, Any], bar_minutes: int) -> int:
+    """
+    Calendar seconds to fetch before the requested window so the warm-up is covered.
+    Intraday bars only exist for SESSION_MINUTES a day and only on weekdays, so bar
+    counts are converted to trading days and padded for weekends and holidays.
+    """
+    bars_needed = spec.warmup(params)
+    if bar_minutes >= 1440:
+        trading_days = bars_needed
+    else:
+        trading_days = math.ceil(bars_needed * bar_minutes / SESSION_MINUTES)
+    if spec.session_warmup:
+        trading_days += 1
+    if trading_days == 0:
+        return 0
+    calendar_days = math.ceil(trading_days * 7 / 5) + 3
+    return calendar_days * SECONDS_PER_DAY
+
+
+def series_to_json(values: np.ndarray, decimals: int = 4) -> List[Optional[float]]:
+    """Round and convert to a JSON-friendly list with NaN -> None."""
+    return [None if x != x else x for x in np.round(values, decimals).tolist()]
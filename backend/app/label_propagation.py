@@ -0,0 +1,294 @@
+# app/label_propagation.py
+"""
+Cross-timeframe label propagation.
+
+User labels live on one (symbol, timeframe, time) row of ml_labeled_data. This
+module projects them down onto the finer bars a labelled bar contains and up
+onto the coarser bars that contain it, so every chart resolution shows the
+label and /marks stays a plain index lookup on (symbol, timeframe, time).
+
+Every label carries its origin in label_source (backend/create_label_source.sql):
+'user' for labels set through the API, 'propagated' for rows written here, NULL
+for model or legacy labels. labeling_version belongs to the aggregation
+pipeline, which stamps it on every bar it writes, so it says nothing about the
+label. Propagated labels are only ever written over unlabelled rows or earlier
+propagated rows, never over a user or model label. A range is always
+recomputed as a whole (clear propagated rows, then re-derive them) so deletes
+and relabels need no special casing; only rows whose label ends up different
+are reported back, so clients are told about net changes.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import asyncpg
+
+from .config import TIMEFRAME_MINUTES, get_settings
+from .live_bars import bar_epoch
+from .streaming import publish_label_event
+
+logger = logging.getLogger(__name__)
+
+PROPAGATED_SOURCE = "propagated"
+UP_POLICIES = ("none", "last", "majority", "unanimous")
+
+# A source label is a user label (same definition /marks uses) that was not itself propagated
+_SOURCE_PREDICATE = f"""
+    s.label IS NOT NULL
+    AND s.label_confidence = 1.0
+    AND s.label_source IS DISTINCT FROM '{PROPAGATED_SOURCE}'
+"""
+
+# Propagation may only write to unlabelled rows or earlier propagated ones
+_TARGET_PREDICATE = f"""(
+    d.label IS NULL
+    OR d.label_source = '{PROPAGATED_SOURCE}'
+)"""
+
+# Joined to itself so RETURNING can report the label each row had before
+_CLEAR_SQL = f"""
+    UPDATE ml_labeled_data AS d
+    SET label = NULL,
+        label_confidence = NULL,
+        label_source = NULL,
+        updated_at = NOW()
+    FROM ml_labeled_data AS o
+    WHERE d.symbol = $1
+      AND d.timeframe = ANY($2::text[])
+      AND d.time BETWEEN $3 AND $4
+      AND d.label_source = '{PROPAGATED_SOURCE}'
+      AND o.symbol = d.symbol
+      AND o.timeframe = d.timeframe
+      AND o.time = d.time
+    RETURNING d.timeframe, d.time, o.label
+"""
+
+# Coarse source label -> every finer bar inside [s.time, s.time + source length)
+_DOWN_SQL = f"""
+    UPDATE ml_labeled_data AS d
+    SET label = s.label,
+        label_confidence = $5,
+        label_source = '{PROPAGATED_SOURCE}',
+        updated_at = NOW()
+    FROM ml_labeled_data AS s
+    WHERE s.symbol = $1
+      AND s.timeframe = $2
+      AND s.time BETWEEN $3 AND $4
+      AND {_SOURCE_PREDICATE}
+      AND d.symbol = s.symbol
+      AND d.timeframe = $6
+      AND d.time >= s.time
+      AND d.time < s.time + make_interval(mins => $7)
+      AND {_TARGET_PREDICATE}
+    RETURNING d.timeframe, d.time, d.label
+"""
+
+# Finer source labels -> the coarser bar containing them, one vote per source bar.
+# $8 selects the policy: 'last' takes the latest label, 'majority' needs > half
+# of the source bars in the bucket to agree, 'unanimous' needs all of them to
+# agree. Unlabelled source bars count towards the total, so a single label in an
+# otherwise unlabelled bucket is not a majority.
+_UP_SQL = f"""
+    WITH members AS (
+        SELECT
+            c.time AS bar_time,
+            s.time AS source_time,
+            CASE WHEN {_SOURCE_PREDICATE} THEN s.label END AS vote
+        FROM ml_labeled_data AS c
+        JOIN ml_labeled_data AS s
+          ON s.symbol = c.symbol
+         AND s.timeframe = $2
+         AND s.time >= c.time
+         AND s.time < c.time + make_interval(mins => $7)
+        WHERE c.symbol = $1
+          AND c.timeframe = $6
+          AND c.time BETWEEN $3 AND $4
+    ),
+    tallies AS (
+        SELECT
+            bar_time,
+            vote AS label,
+            COUNT(*) AS n,
+            MAX(source_time) AS latest,
+            SUM(COUNT(*)) OVER (PARTITION BY bar_time) AS total
+        FROM members
+        GROUP BY bar_time, vote
+    ),
+    votes AS (
+        SELECT DISTINCT ON (bar_time) bar_time, label, n, total
+        FROM tallies
+        WHERE label IS NOT NULL
+        ORDER BY bar_time,
+                 CASE WHEN $8::text = 'last' THEN 0 ELSE n END DESC,
+                 latest DESC
+    )
+    UPDATE ml_labeled_data AS d
+    SET label = v.label,
+        label_confidence = $5,
+        label_source = '{PROPAGATED_SOURCE}',
+        updated_at = NOW()
+    FROM votes AS v
+    WHERE d.symbol = $1
+      AND d.timeframe = $6
+      AND d.time = v.bar_time
+      AND {_TARGET_PREDICATE}
+      AND (
+            $8::text = 'last'
+         OR ($8::text = 'majority' AND v.n * 2 > v.total)
+         OR ($8::text = 'unanimous' AND v.n = v.total)
+      )
+    RETURNING d.timeframe, d.time, d.label
+"""
+
+
+class LabelChange(NamedTuple):
+    """A propagated row whose label changed; label is None when it was cleared."""
+    timeframe: str
+    time: datetime          # naive IST, as stored
+    label: Optional[str]
+
+
+@dataclass
+class PropagationResult:
+    counts: Dict[str, int] = field(default_factory=dict)   # rows written per "src->dst" pair, plus "cleared"
+    changes: List[LabelChange] = field(default_factory=list)
+
+
+@dataclass
+class PropagationRules:
+    """Which timeframes take part and how labels travel between them."""
+    timeframes: List[str] = field(default_factory=lambda: ["1min", "5min", "15min", "30min", "1hour", "1day"])
+    down: bool = True
+    up: str = "majority"
+    confidence: float = 1.0
+    enabled: bool = True
+
+    def __post_init__(self):
+        if self.up not in UP_POLICIES:
+            raise ValueError(f"Unknown up-propagation policy: {self.up} (expected one of {UP_POLICIES})")
+        unknown = [tf for tf in self.timeframes if tf not in TIMEFRAME_MINUTES]
+        if unknown:
+            raise ValueError(f"Unknown timeframes for label propagation: {unknown}")
+        # finest first
+        self.timeframes = sorted(set(self.timeframes), key=TIMEFRAME_MINUTES.__getitem__)
+
+    @classmethod
+    def from_settings(cls) -> "PropagationRules":
+        s = get_settings()
+        return cls(
+            timeframes=list(s.label_propagation_timeframes),
+            down=s.label_propagation_down,
+            up=s.label_propagation_up,
+            confidence=s.label_propagation_confidence,
+            enabled=s.label_propagation_enabled,
+        )
+
+    def down_pairs(self) -> List[Tuple[str, str]]:
+        """(source, target) pairs, coarsest source first so the nearest coarser label wins."""
+        if not self.down:
+            return []
+        tfs = self.timeframes
+        return [(src, dst) for src in reversed(tfs) for dst in tfs
+                if TIMEFRAME_MINUTES[dst] < TIMEFRAME_MINUTES[src]]
+
+    def up_pairs(self) -> List[Tuple[str, str]]:
+        """(source, target) pairs, finest source first so the nearest finer labels win."""
+        if self.up == "none":
+            return []
+        tfs = self.timeframes
+        return [(src, dst) for src in tfs for dst in tfs
+                if TIMEFRAME_MINUTES[dst] > TIMEFRAME_MINUTES[src]]
+
+
+def _day_window(from_time: datetime, to_time: datetime) -> Tuple[datetime, datetime]:
+    """Widen a range to whole days so no bar of any timeframe straddles its edges."""
+    start = from_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = to_time.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1) - timedelta(microseconds=1)
+    return start, end
+
+
+async def propagate_range(
+    conn: asyncpg.Connection,
+    symbol: str,
+    from_time: datetime,
+    to_time: datetime,
+    rules: Optional[PropagationRules] = None,
+) -> PropagationResult:
+    """
+    Recompute propagated labels for `symbol` over [from_time, to_time] (widened to whole days).
+    Runs one set-based UPDATE per timeframe pair inside a single transaction.
+    Returns rows written per "src->dst" pair plus the number of rows cleared, and the
+    rows whose label differs from before the run.
+    """
+    rules = rules or PropagationRules.from_settings()
+    start, end = _day_window(from_time, to_time)
+    result = PropagationResult()
+
+    async with conn.transaction():
+        cleared = await conn.fetch(_CLEAR_SQL, symbol, rules.timeframes, start, end)
+        result.counts["cleared"] = len(cleared)
+        before = {(r["timeframe"], r["time"]): r["label"] for r in cleared}
+        after = {key: None for key in before}
+
+        for src, dst in rules.down_pairs():
+            rows = await conn.fetch(
+                _DOWN_SQL, symbol, src, start, end, rules.confidence, dst, TIMEFRAME_MINUTES[src]
+            )
+            result.counts[f"{src}->{dst}"] = len(rows)
+            after.update(((r["timeframe"], r["time"]), r["label"]) for r in rows)
+
+        for src, dst in rules.up_pairs():
+            rows = await conn.fetch(
+                _UP_SQL, symbol, src, start, end, rules.confidence, dst, TIMEFRAME_MINUTES[dst], rules.up
+            )
+            result.counts[f"{src}->{dst}"] = len(rows)
+            after.update(((r["timeframe"], r["time"]), r["label"]) for r in rows)
+
+    result.changes = [
+        LabelChange(tf, t, label) for (tf, t), label in sorted(after.items())
+        if label != before.get((tf, t))
+    ]
+    return result
+
+
+async def propagate_bar_label(
+    conn: asyncpg.Connection,
+    symbol: str,
+    timeframe: str,
+    bar_time: Optional[datetime],
+    rules: Optional[PropagationRules] = None,
+) -> List[LabelChange]:
+    """
+    Incremental hook for a single label create/update/delete: recompute the day around `bar_time`.
+    Returns the propagated rows that changed (see publish_label_changes).
+    Never raises; propagation failures must not fail the label write itself.
+    """
+    if bar_time is None:
+        return []
+    try:
+        rules = rules or PropagationRules.from_settings()
+        if not rules.enabled or timeframe not in rules.timeframes:
+            return []
+        result = await propagate_range(conn, symbol, bar_time, bar_time, rules)
+        written = sum(v for k, v in result.counts.items() if k != "cleared")
+        logger.info(f"[LABEL PROPAGATION] {symbol} {timeframe} @ {bar_time}: {written} rows labelled, "
+                    f"{result.counts['cleared']} cleared, {len(result.changes)} changed")
+        return result.changes
+    except Exception as e:
+        logger.error(f"[LABEL PROPAGATION] failed for {symbol} {timeframe} @ {bar_time}: {e}")
+        return []
+
+
+async def publish_label_changes(symbol: str, changes: List[LabelChange], confidence: Optional[float] = None) -> None:
+    """Label events for propagated rows, so subscribers on every timeframe see them."""
+    confidence = PropagationRules.from_settings().confidence if confidence is None else confidence
+    for change in changes:
+        if change.label is None:
+            await publish_label_event("deleted", symbol, change.timeframe, bar_epoch(change.time))
+        else:
+            await publish_label_event(
+                "created", symbol, change.timeframe, bar_epoch(change.time), change.label, confidence
+            )
@@ -0,0 +1,198 @@
+# app/live_bars.py
+"""
+Tick-to-bar builder for the live feed.
+
+Each tick updates the forming bar of every configured timeframe in O(1)
+(open on the first tick of a bucket, then high/low/close/volume), with
+buckets taken from the session calendar so live bars line up with the ones
+the pipeline aggregates. A bar closes when a tick lands in a later bucket or
+when close_due() sees the clock pass the bar's end plus a short grace period
+(ticks stamped just before the boundary can arrive a little after it); the
+builder never touches the database itself.
+
+A tick whose finest-timeframe bucket has already closed is dropped from every
+timeframe, so the persisted 1min bars and the published higher-timeframe bars
+are always built from the same ticks.
+
+The ingestion service (scripts/real-time-data-sync.py) publishes every
+forming bar to Redis and writes only closed 1min bars to Postgres; higher
+timeframes are re-aggregated from those by the transformation pipeline.
+
+Redis layout (the encoding is a compact JSON array, see encode_bar):
+
+  PUBLISH bars:{symbol}:{timeframe}          one message per update
+  SET     bars:{symbol}:{timeframe}:forming  latest forming bar, for new subscribers
+  ZSET    bars:{symbol}:{timeframe}:recent   last N stored bars scored by UTC epoch;
+                                             appended per flush, never rebuilt
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import TIMEFRAME_MINUTES
+from .session_calendar import IST_OFFSET_SECONDS, SessionCalendar, get_calendar
+
+BAR_CHANNEL_PREFIX = "bars"
+LIVE_TIMEFRAMES = ("1min", "5min", "15min", "1hour", "1day")
+CLOSE_GRACE_SECONDS = 1.5   # how long after its end a bar still accepts late ticks
+
+
+def bar_channel(symbol: str, timeframe: str) -> str:
+    return f"{BAR_CHANNEL_PREFIX}:{symbol}:{timeframe}"
+
+
+@dataclass
+class LiveBar:
+    time: datetime      # bucket start, naive IST
+    end: datetime       # exclusive; clipped to the session close
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int = 0
+    ticks: int = 1
+    closed: bool = False
+
+    def update(self, price: float, quantity: int):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += quantity
+        self.ticks += 1
+
+
+def bar_epoch(value: datetime) -> int:
+    """Naive IST datetime -> UTC epoch seconds"""
+    return int((value - datetime(1970, 1, 1)).total_seconds()) - IST_OFFSET_SECONDS
+
+
+def encode_bar(bar: LiveBar) -> str:
+    """[time (UTC epoch, like /history), open, high, low, close, volume, closed]"""
+    epoch = bar_epoch(bar.time)
+    return json.dumps(
+        [epoch, bar.open, bar.high, bar.low, bar.close, bar.volume, 1 if bar.closed else 0],
+        separators=(",", ":"),
+    )
+
+
+def decode_bar(payload) -> Dict:
+    epoch, o, h, l, c, v, closed = json.loads(payload)
+    return {"time": epoch, "open": o, "high": h, "low": l, "close": c, "volume": v, "closed": bool(closed)}
+
+
+class BarBuilder:
+    """Forming bars per (symbol, timeframe); not thread-safe, feed it from one task."""
+
+    def __init__(self, timeframes: Sequence[str] = LIVE_TIMEFRAMES, calendar: Optional[SessionCalendar] = None,
+                 grace_seconds: float = CLOSE_GRACE_SECONDS):
+        unknown = [tf for tf in timeframes if tf not in TIMEFRAME_MINUTES]
+        if unknown:
+            raise ValueError(f"Unknown timeframes: {unknown}")
+        # Finest first: a tick late for it is late for all of them
+        self.timeframes = sorted(timeframes, key=TIMEFRAME_MINUTES.__getitem__)
+        self.calendar = calendar or get_calendar()
+        self.grace = timedelta(seconds=grace_seconds)
+        self.bars: Dict[Tuple[str, str], LiveBar] = {}
+        self.closed_until: Dict[Tuple[str, str], datetime] = {}  # end of the last closed bar
+        self.late_ticks = 0       # ticks for a bucket that already closed
+        self.off_session = 0      # ticks outside the session
+
+    def _bar_end(self, start: datetime, minutes: int, close_at: datetime) -> datetime:
+        return min(start + timedelta(minutes=minutes), close_at)
+
+    def add_tick(self, symbol: str, ts: datetime, price: float,
+                 quantity: int = 0) -> Tuple[List[Tuple[str, LiveBar]], List[Tuple[str, LiveBar]]]:
+        """
+        Apply one tick (naive IST timestamp). Returns (updated, closed), each a list
+        of (timeframe, bar); closed bars are final and come before the new bar opens.
+        """
+        bounds = self.calendar.session_bounds(ts.date())
+        if bounds is None or not bounds[0] <= ts < bounds[1]:
+            self.off_session += 1
+            return [], []
+
+        updated, closed = [], []
+        for tf in self.timeframes:
+            minutes = TIMEFRAME_MINUTES[tf]
+            start = self.calendar.bucket_start(ts, minutes)
+            key = (symbol, tf)
+            bar = self.bars.get(key)
+
+            if (bar is not None and start < bar.time) or start < self.closed_until.get(key, start):
+                self.late_ticks += 1
+                if tf == self.timeframes[0]:
+                    return [], []   # keep coarser bars consistent with the finest, persisted one
+                continue
+            if bar is not None and start == bar.time:
+                bar.update(price, quantity)
+            else:
+                if bar is not None:
+                    bar.closed = True
+                    self.closed_until[key] = bar.end
+                    closed.append((tf, bar))
+                bar = LiveBar(start, self._bar_end(start, minutes, bounds[1]), price, price, price, price, quantity)
+                self.bars[key] = bar
+            updated.append((tf, bar))
+        return updated, closed
+
+    def close_due(self, now: datetime) -> List[Tuple[str, str, LiveBar]]:
+        """Close and return (symbol, timeframe, bar) for every bar whose end plus grace has passed."""
+        due = []
+        for (symbol, tf), bar in list(self.bars.items()):
+            if now >= bar.end + self.grace:
+                bar.closed = True
+                due.append((symbol, tf, bar))
+                self.closed_until[(symbol, tf)] = bar.end
+                del self.bars[(symbol, tf)]
+        return due
+
+
+# -----------------------------
+# Recent bars (capped sorted sets)
+# -----------------------------
+def recent_key(symbol: str, timeframe: str) -> str:
+    return f"{bar_channel(symbol, timeframe)}:recent"
+
+
+async def store_recent(redis_client, symbol: str, timeframe: str, bars: Sequence[LiveBar], cap: int) -> None:
+    """Upsert bars by time (a re-sent bar replaces the old member) and trim to the newest `cap`."""
+    if not bars:
+        return
+    key = recent_key(symbol, timeframe)
+    pipe = redis_client.pipeline(transaction=False)
+    for bar in bars:
+        epoch = bar_epoch(bar.time)
+        pipe.zremrangebyscore(key, epoch, epoch)
+        pipe.zadd(key, {encode_bar(bar): epoch})
+    pipe.zremrangebyrank(key, 0, -(cap + 1))
+    await pipe.execute()
+
+
+async def read_recent(redis_client, symbol: str, timeframe: str,
+                      since: int, until: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Decoded bars with since <= time <= until (UTC epochs), oldest first."""
+    members = await redis_client.zrangebyscore(
+        recent_key(symbol, timeframe), since, "+inf" if until is None else until
+    )
+    return [decode_bar(m) for m in members]
+
+
+def rollup(start: datetime, end: datetime, bars: Sequence[Dict[str, Any]], closed: bool) -> Optional[LiveBar]:
+    """One bar for [start, end) from decoded finer bars (oldest first)."""
+    if not bars:
+        return None
+    return LiveBar(
+        start, end,
+        open=bars[0]["open"],
+        high=max(b["high"] for b in bars),
+        low=min(b["low"] for b in bars),
+        close=bars[-1]["close"],
+        volume=sum(b["volume"] for b in bars),
+        ticks=len(bars),
+        closed=closed,
+    )
@@ -14,13 +14,14 @@ from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from .config import get_settings
 from .database import DataManager, data_refresh_task, create_pool
 from .cache import CacheManager, cache_maintenance_task
+from .streaming import RedisFanout, create_bar_events, create_label_events, set_bar_events, set_label_events
 from .udf_handlers import UDFHandler
 from .monitoring import (
     health_monitor, metrics_update_task,
     track_request_metrics, update_db_pool_metrics
 )
 from .models import HealthResponse, CacheStats
-from app.routes import marks_asyncpg, labels, indicators
+from app.routes import marks_asyncpg, labels, indicators, stream, admin
 
 # -------- logging --------
 logging.basicConfig(
@@ -34,6 +35,8 @@ settings = get_settings()
 data_manager: Optional[DataManager] = None
 cache_manager: Optional[CacheManager] = None
 redis_client: Optional[redis.Redis] = None
+label_events: Optional[RedisFanout] = None
+bar_events: Optional[RedisFanout] = None
 
 background_tasks = []  # supervised background tasks
 
@@ -43,13 +46,15 @@ async def task_supervisor():
     """
     Supervise background tasks and restart them if they fail.
     """
-    global data_manager, cache_manager
+    global data_manager, cache_manager, label_events, bar_events
 
     # If you have a separate health_check_task, import and add it here.
     task_configs = [
         {"name": "cache_maintenance", "func": cache_maintenance_task, "args": [cache_manager]},
         {"name": "data_refresh", "func": data_refresh_task, "args": [data_manager]},
         {"name": "metrics_update", "func": metrics_update_task, "args": []},
+        {"name": "label_events", "func": label_events.run, "args": []},
+        {"name": "bar_events", "func": bar_events.run, "args": []},
         # {"name": "health_check", "func": health_check_task, "args": []},  # only if defined
     ]
 
@@ -83,7 +88,7 @@ async def task_supervisor():
 # -------- lifespan --------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global data_manager, cache_manager, redis_client
+    global data_manager, cache_manager, redis_client, label_events, bar_events
 
     try:
         logger.info("Starting TradingView ML Visualization API")
@@ -102,6 +107,14 @@ async def lifespan(app: FastAPI):
         # Cache
         cache_manager = CacheManager(redis_client)
 
+        # Label event fan-out (Redis pub/sub across workers)
+        label_events = create_label_events(redis_client)
+        set_label_events(label_events)
+
+        # Live bar fan-out: one psubscribe on bars:* per worker
+        bar_events = create_bar_events(redis_client)
+        set_bar_events(bar_events)
+
         # --- DB POOL + DATA MANAGER (FIX) ---
         # Create a real asyncpg pool and pass it to DataManager
         pool = await create_pool()
@@ -114,16 +127,21 @@ async def lifespan(app: FastAPI):
         app.include_router(udf_handler.get_router())
         app.include_router(marks_asyncpg.router)      # asyncpg-backed /marks route
         app.include_router(labels.router)             # labels CRUD endpoints
+        app.include_router(stream.router)             # SSE/WebSocket label events and live bars
         
         # Set data manager for indicators and include router
         try:
             indicators.set_data_manager(data_manager)
+            indicators.set_cache_manager(cache_manager)
             app.include_router(indicators.router)         # technical indicators endpoints
             logger.info("Indicators router included successfully")
         except Exception as e:
             logger.error(f"Failed to include indicators router: {e}")
         logger.info("UDF routes included successfully")
 
+        admin.set_data_manager(data_manager)
+        app.include_router(admin.router)              # gap scan / repair queue
+
         # Supervise background tasks
         background_tasks.append(asyncio.create_task(task_supervisor()))
         logger.info("All systems initialized successfully")
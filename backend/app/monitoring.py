@@ -3,6 +3,15 @@ import time
 from functools import wraps
 import logging
 import asyncio
+import hashlib
+import json
+import random
+import re
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+import asyncpg
 
 logger = logging.getLogger(__name__)
 
@@ -159,4 +168,312 @@ async def metrics_update_task(interval: int = 30):
             await asyncio.sleep(interval)
         except Exception as e:
             logger.error(f"Metrics update error: {e}")
-            await asyncio.sleep(interval)
\ No newline at end of file
+            await asyncio.sleep(interval)
+
+
+# -----------------------------
+# Database instrumentation
+# -----------------------------
+# create_pool() builds the asyncpg pool with InstrumentedConnection and wraps it
+# in InstrumentedPool, so every acquire and every fetch/fetchrow/fetchval/execute
+# is measured without touching the callers. Statements are labelled
+# "<verb>:<table>:<digest>" (digest of the SQL with literals stripped) to keep
+# label cardinality bounded; statement_stats() maps labels back to SQL.
+
+db_pool_acquire_seconds = Histogram(
+    'tradingview_db_pool_acquire_seconds',
+    'Time spent waiting for a pool connection',
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+
+db_pool_waiting = Gauge(
+    'tradingview_db_pool_waiting',
+    'Callers currently waiting for a pool connection'
+)
+
+db_query_duration = Histogram(
+    'tradingview_db_query_duration_seconds',
+    'Statement latency in seconds',
+    ['statement'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+)
+
+db_query_rows = Histogram(
+    'tradingview_db_query_rows',
+    'Rows returned or affected per statement',
+    ['statement'],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+)
+
+db_query_errors = Counter(
+    'tradingview_db_query_errors_total',
+    'Statements that raised',
+    ['statement']
+)
+
+db_slow_queries = Counter(
+    'tradingview_db_slow_queries_total',
+    'Statements slower than the slow-query threshold',
+    ['statement']
+)
+
+MAX_STATEMENT_LABELS = 500     # further distinct statements are counted as "other"
+MAX_SQL_CHARS = 2000           # SQL kept per statement / slow-log entry
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|(?<![$\w])\d+(?:\.\d+)?\b")
+_TABLE_RE = re.compile(r"\b(?:from|into|update|join)\s+([\w.\"]+)", re.IGNORECASE)
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete", "values")
+
+_labels: Dict[str, str] = {}               # raw SQL -> label
+_statements: Dict[str, Dict[str, Any]] = {}  # label -> running totals
+
+
+def statement_label(query: str) -> str:
+    """Stable, low-cardinality label for a SQL string."""
+    label = _labels.get(query)
+    if label is not None:
+        return label
+    normalized = " ".join(_LITERAL_RE.sub("?", query).split())
+    verb = normalized.split(" ", 1)[0].lower() if normalized else "empty"
+    match = _TABLE_RE.search(normalized)
+    table = match.group(1).replace('"', '') if match else "-"
+    digest = hashlib.md5(normalized.encode()).hexdigest()[:8]
+    label = f"{verb}:{table}:{digest}"
+    if label not in _statements:
+        if len(_statements) >= MAX_STATEMENT_LABELS:
+            label = "other"
+        _statements.setdefault(label, {
+            "sql": normalized[:MAX_SQL_CHARS], "calls": 0, "errors": 0,
+            "total_seconds": 0.0, "max_seconds": 0.0, "rows": 0,
+        })
+    if len(_labels) < MAX_STATEMENT_LABELS * 4:  # f-string SQL can produce endless raw variants
+        _labels[query] = label
+    return label
+
+
+def statement_stats(top: int = 20) -> list:
+    """Per-statement totals, most total time first."""
+    rows = [
+        {"statement": label, **stats,
+         "avg_ms": round(stats["total_seconds"] * 1000 / stats["calls"], 2) if stats["calls"] else 0.0}
+        for label, stats in _statements.items()
+    ]
+    rows.sort(key=lambda r: r["total_seconds"], reverse=True)
+    return rows[:top]
+
+
+def _row_count(method: str, result: Any) -> Optional[int]:
+    if method == "fetch":
+        return len(result)
+    if method in ("fetchrow", "fetchval"):
+        return 0 if result is None else 1
+    if method == "execute" and isinstance(result, str):
+        tail = result.rsplit(" ", 1)[-1]  # "INSERT 0 5", "UPDATE 3", "SELECT 12"
+        return int(tail) if tail.isdigit() else None
+    return None
+
+
+@dataclass
+class SlowQuery:
+    at: float
+    statement: str
+    seconds: float
+    rows: Optional[int]
+    sql: str
+    plan: Any = None
+    error: Optional[str] = None
+
+
+class SlowQueryLog:
+    """
+    Sampled log of statements above threshold_ms. For a sampled entry the plan
+    is captured with EXPLAIN (FORMAT JSON) (never ANALYZE, so nothing runs twice)
+    on a separate pool connection in the background, one at a time and at most
+    once per statement per explain_cooldown seconds.
+    """
+
+    def __init__(self, threshold_ms: float = 500, sample_rate: float = 1.0, explain: bool = True,
+                 explain_cooldown: float = 60.0, size: int = 100):
+        self.configure(threshold_ms, sample_rate, explain, explain_cooldown)
+        self.entries: deque = deque(maxlen=size)
+        self._explaining = False
+        self._explained_at: Dict[str, float] = {}
+
+    def configure(self, threshold_ms: float, sample_rate: float, explain: bool, explain_cooldown: float = 60.0):
+        self.threshold = threshold_ms / 1000.0
+        self.sample_rate = sample_rate
+        self.explain = explain
+        self.explain_cooldown = explain_cooldown
+
+    def record(self, pool, label: str, query: str, args: tuple, seconds: float, rows: Optional[int]):
+        db_slow_queries.labels(statement=label).inc()
+        if random.random() >= self.sample_rate:
+            return
+        entry = SlowQuery(time.time(), label, round(seconds, 4), rows, " ".join(query.split())[:MAX_SQL_CHARS])
+        self.entries.append(entry)
+        logger.warning(f"[SLOW QUERY] {label} took {seconds * 1000:.0f}ms ({rows} rows): {entry.sql[:300]}")
+
+        now = time.monotonic()
+        if (self.explain and pool is not None and not self._explaining
+                and label.split(":", 1)[0] in _EXPLAINABLE
+                and now - self._explained_at.get(label, -self.explain_cooldown) >= self.explain_cooldown):
+            self._explaining = True
+            self._explained_at[label] = now
+            asyncio.get_running_loop().create_task(self._explain(pool, entry, query, args))
+
+    async def _explain(self, pool, entry: SlowQuery, query: str, args: tuple):
+        try:
+            async with pool.acquire() as conn:
+                # Unbound call: the EXPLAIN itself is not instrumented
+                plan = await asyncpg.Connection.fetchval(conn, f"EXPLAIN (FORMAT JSON) {query}", *args, timeout=10)
+            entry.plan = json.loads(plan) if isinstance(plan, str) else plan
+            logger.info(f"[SLOW QUERY] plan for {entry.statement}: {_plan_summary(entry.plan)}")
+        except Exception as e:
+            entry.error = f"EXPLAIN failed: {e}"
+            logger.debug(f"[SLOW QUERY] EXPLAIN failed for {entry.statement}: {e}")
+        finally:
+            self._explaining = False
+
+    def recent(self, limit: int = 20) -> list:
+        return [asdict(e) for e in list(self.entries)[-limit:]][::-1]
+
+
+def _plan_summary(plan: Any) -> str:
+    try:
+        root = plan[0]["Plan"]
+        return f"{root['Node Type']} cost={root['Total Cost']} rows={root['Plan Rows']}"
+    except (TypeError, KeyError, IndexError):
+        return "n/a"
+
+
+# Global slow-query log; create_pool() applies the settings
+slow_query_log = SlowQueryLog()
+
+
+class InstrumentedConnection(asyncpg.Connection):
+    """asyncpg connection that times fetch/fetchrow/fetchval/execute/executemany."""
+
+    _monitor_pool = None   # set on acquire; used for EXPLAIN capture
+    _paused = False        # pool reset queries are not measured
+
+    async def _measured(self, method: str, query: str, args: tuple, kwargs: dict):
+        call = getattr(super(), method)
+        if self._paused:
+            return await call(query, *args, **kwargs)
+        label = statement_label(query)
+        stats = _statements[label]
+        started = time.perf_counter()
+        try:
+            result = await call(query, *args, **kwargs)
+        except Exception:
+            elapsed = time.perf_counter() - started
+            db_query_errors.labels(statement=label).inc()
+            db_query_duration.labels(statement=label).observe(elapsed)
+            stats["errors"] += 1
+            raise
+        elapsed = time.perf_counter() - started
+        rows = _row_count(method, result)
+
+        db_query_duration.labels(statement=label).observe(elapsed)
+        stats["calls"] += 1
+        stats["total_seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        if rows is not None:
+            db_query_rows.labels(statement=label).observe(rows)
+            stats["rows"] += rows
+        if elapsed >= slow_query_log.threshold:
+            slow_query_log.record(self._monitor_pool, label, query, args if method != "executemany" else (),
+                                  elapsed, rows)
+        return result
+
+    async def fetch(self, query, *args, **kwargs):
+        return await self._measured("fetch", query, args, kwargs)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        return await self._measured("fetchrow", query, args, kwargs)
+
+    async def fetchval(self, query, *args, **kwargs):
+        return await self._measured("fetchval", query, args, kwargs)
+
+    async def execute(self, query, *args, **kwargs):
+        return await self._measured("execute", query, args, kwargs)
+
+    async def executemany(self, command, args, **kwargs):
+        return await self._measured("executemany", command, (args,), kwargs)
+
+    async def reset(self, *, timeout=None):
+        self._paused = True
+        try:
+            await super().reset(timeout=timeout)
+        finally:
+            self._paused = False
+
+
+class _TimedAcquire:
+    """Wraps Pool.acquire() for both `async with pool.acquire()` and `await pool.acquire()`."""
+
+    def __init__(self, pool: asyncpg.Pool, timeout: Optional[float]):
+        self._pool = pool
+        self._ctx = pool.acquire(timeout=timeout)
+
+    async def _timed(self, acquire):
+        db_pool_waiting.inc()
+        started = time.perf_counter()
+        try:
+            conn = await acquire
+        finally:
+            db_pool_waiting.dec()
+            db_pool_acquire_seconds.observe(time.perf_counter() - started)
+        if isinstance(conn, InstrumentedConnection):
+            conn._monitor_pool = self._pool
+        return conn
+
+    async def __aenter__(self):
+        return await self._timed(self._ctx.__aenter__())
+
+    async def __aexit__(self, *exc):
+        return await self._ctx.__aexit__(*exc)
+
+    def __await__(self):
+        return self._timed(self._ctx).__await__()
+
+
+class InstrumentedPool:
+    """
+    Thin proxy over asyncpg.Pool that times acquire(); everything else is
+    delegated. Build the pool with connection_class=InstrumentedConnection to
+    also measure statements.
+    """
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _TimedAcquire:
+        return _TimedAcquire(self._pool, timeout)
+
+    async def fetch(self, query, *args, timeout=None, **kwargs):
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchrow(self, query, *args, timeout=None, **kwargs):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def execute(self, query, *args, timeout=None):
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command, args, *, timeout=None):
+        async with self.acquire() as conn:
+            return await conn.executemany(command, args, timeout=timeout)
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+def instrument_pool(pool: asyncpg.Pool) -> InstrumentedPool:
+    return pool if isinstance(pool, InstrumentedPool) else InstrumentedPool(pool)
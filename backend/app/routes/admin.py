@@ -0,0 +1,127 @@
+# app/routes/admin.py
+"""
+Operational endpoints: 1min gap detection and repair queueing (app/gap_scanner.py),
+per-statement database timings and the slow-query log (app/monitoring.py).
+Disabled (404) unless ADMIN_TOKEN is set; requests need a matching X-Admin-Token header.
+"""
+
+import logging
+import secrets
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from ..config import get_settings
+from ..database import DataManager, _normalize_symbol
+from ..gap_scanner import GAP_SOURCES, enqueue_repairs, scan_gaps, summarize
+from ..monitoring import slow_query_log, statement_stats
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+MAX_SCAN_DAYS = 1100  # a little over four years of sessions per request
+
+_data_manager: Optional[DataManager] = None
+
+def set_data_manager(dm: DataManager):
+    """Set the data manager instance"""
+    global _data_manager
+    _data_manager = dm
+
+async def get_data_manager() -> DataManager:
+    if not _data_manager:
+        raise HTTPException(status_code=503, detail="Data manager not available")
+    return _data_manager
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Fail closed: without ADMIN_TOKEN configured the admin routes do not exist."""
+    token = get_settings().admin_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+class GapRepairRequest(BaseModel):
+    symbol: str = "NIFTY"
+    from_date: date = Field(..., alias="from")
+    to_date: date = Field(..., alias="to")
+    source: str = "ml_labeled_data"
+    backfill: bool = True  # also release affected days for the next backfill run
+
+
+def _check_range(from_date: date, to_date: date, source: str):
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' is before 'from'")
+    if (to_date - from_date).days > MAX_SCAN_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range exceeds {MAX_SCAN_DAYS} days")
+    if source not in GAP_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source '{source}' (expected one of {list(GAP_SOURCES)})")
+
+
+@router.get("/gaps", dependencies=[Depends(require_admin)])
+async def get_gaps(
+    symbol: str = Query("NIFTY"),
+    from_date: Optional[date] = Query(None, alias="from", description="First IST day (default: 30 days ago)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last IST day (default: today)"),
+    source: str = Query("ml_labeled_data", description="ml_labeled_data or nifty50_ohlc"),
+    data_manager: DataManager = Depends(get_data_manager),
+):
+    """Missing 1min bars per contiguous run, with coverage totals."""
+    to_date = to_date or date.today()
+    from_date = from_date or to_date - timedelta(days=30)
+    _check_range(from_date, to_date, source)
+    symbol_db = _normalize_symbol(symbol)
+
+    async with data_manager.acquire() as conn:
+        gaps = await scan_gaps(conn, symbol_db, from_date, to_date, source)
+
+    return {
+        "status": "ok",
+        "symbol": symbol_db,
+        "source": source,
+        "from": from_date.isoformat(),
+        "to": to_date.isoformat(),
+        "summary": summarize(gaps, from_date, to_date),
+        "gaps": [g.to_dict() for g in gaps],
+    }
+
+
+@router.post("/gaps/repair", dependencies=[Depends(require_admin)])
+async def repair_gaps(
+    request: GapRepairRequest,
+    data_manager: DataManager = Depends(get_data_manager),
+):
+    """Scan the range and queue every gap for backfill and re-aggregation of its buckets."""
+    _check_range(request.from_date, request.to_date, request.source)
+    symbol_db = _normalize_symbol(request.symbol)
+
+    async with data_manager.acquire() as conn:
+        gaps = await scan_gaps(conn, symbol_db, request.from_date, request.to_date, request.source)
+        queued = await enqueue_repairs(conn, symbol_db, gaps, backfill=request.backfill)
+
+    return {
+        "status": "ok",
+        "symbol": symbol_db,
+        "gaps": len(gaps),
+        "missing_minutes": sum(g.minutes for g in gaps),
+        "queued": queued,
+    }
+
+
+@router.get("/queries", dependencies=[Depends(require_admin)])
+async def get_query_stats(
+    top: int = Query(20, ge=1, le=500, description="Statements to return, most total time first"),
+    slow: int = Query(20, ge=0, le=100, description="Recent slow-query log entries to return"),
+):
+    """Per-statement totals since startup (this worker) and the sampled slow-query log with plans."""
+    return {
+        "status": "ok",
+        "slow_threshold_ms": slow_query_log.threshold * 1000,
+        "sample_rate": slow_query_log.sample_rate,
+        "statements": statement_stats(top),
+        "slow_queries": slow_query_log.recent(slow),
+    }
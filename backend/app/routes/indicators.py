@@ -1,16 +1,24 @@
 # app/routes/indicators.py
 """
 Technical indicators API endpoints for TradingView charts.
-Provides Central Pivot Range (CPR) and extensible framework for other indicators.
+Provides Central Pivot Range (CPR) plus the vectorized indicator engine
+(app/indicator_engine.py) behind a generic /indicators/{id} endpoint.
 """
 
 import logging
-from datetime import datetime, timedelta
+import time
+import numpy as np
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Any
-from fastapi import APIRouter, Query, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, Query, HTTPException, Depends, Request
+from pydantic import BaseModel, Field
 
+from ..cache import CacheManager
+from ..config import TIMEFRAME_MINUTES
 from ..database import DataManager, _normalize_symbol, _normalize_timeframe, _as_epoch_seconds
+from ..indicator_cache import IndicatorCheckpoints
+from ..indicator_engine import INDICATORS, Bars, compute, lookback_seconds, series_to_json, session_cpr
+from ..session_calendar import IST_OFFSET_SECONDS, get_calendar
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +39,23 @@ class CPRPoint(BaseModel):
     s3: float         # Support 3
     prev_high: float  # Previous day high
     prev_close: float # Previous day close
+    prev_low: Optional[float] = None
+    # Camarilla pivots
+    cam_r1: Optional[float] = None
+    cam_r2: Optional[float] = None
+    cam_r3: Optional[float] = None
+    cam_r4: Optional[float] = None
+    cam_s1: Optional[float] = None
+    cam_s2: Optional[float] = None
+    cam_s3: Optional[float] = None
+    cam_s4: Optional[float] = None
+    # Fibonacci pivots
+    fib_r1: Optional[float] = None
+    fib_r2: Optional[float] = None
+    fib_r3: Optional[float] = None
+    fib_s1: Optional[float] = None
+    fib_s2: Optional[float] = None
+    fib_s3: Optional[float] = None
 
 class CPRResponse(BaseModel):
     """CPR indicator response"""
@@ -41,6 +66,20 @@ class CPRResponse(BaseModel):
     from_time: int
     to_time: int
 
+class IndicatorRequest(BaseModel):
+    """One study in a batch request"""
+    id: str
+    params: Dict[str, Any] = {}
+    key: Optional[str] = None  # response key; defaults to id plus param values, e.g. "ema_50"
+
+class BatchIndicatorRequest(BaseModel):
+    """Several studies over one symbol, resolution and window"""
+    symbol: str = "NIFTY50"
+    resolution: str = "5"
+    from_timestamp: int = Field(..., alias="from")
+    to_timestamp: int = Field(..., alias="to")
+    indicators: List[IndicatorRequest]
+
 class IndicatorSettings(BaseModel):
     """Indicator display settings"""
     enabled: bool = True
@@ -104,15 +143,69 @@ async def get_cpr_data(
     Generate CPR data for the given time range.
     CPR values are calculated from previous day's HLC and remain constant throughout the trading day.
     Returns one CPR point per trading day.
+
+    Reads the materialized daily_pivots table (filled by the aggregation pipeline)
+    and computes levels from daily bars for any trading day it does not cover.
+    Only a response that covers every trading day up to today is cached.
     """
     normalized_symbol = _normalize_symbol(symbol)
     from_ts, to_ts = _as_epoch_seconds(from_timestamp, to_timestamp)
     
     logger.info(f"Calculating CPR for {normalized_symbol} from {from_ts} to {to_ts}")
-    
+
+    cache_key = None
+    if _cache_manager is not None:
+        cache_key = _cache_manager.get_cache_key("cpr", symbol=normalized_symbol, start=from_ts, end=to_ts)
+        cached = await _cache_manager.get(cache_key)
+        if cached is not None:
+            return [CPRPoint(**p) for p in cached]
+
+    try:
+        rows = await data_manager.get_daily_pivots(normalized_symbol, from_ts, to_ts)
+    except Exception as e:
+        logger.warning(f"daily_pivots unavailable, computing CPR from bars: {e}")
+        rows = []
+
+    fields = [k for k in CPRPoint.model_fields if k != "time"]
+    points = {
+        r["time"]: CPRPoint(time=r["time"], **{k: round(float(r[k]), 2) for k in fields if r.get(k) is not None})
+        for r in rows
+    }
+    expected = _expected_day_times(from_ts, to_ts)
+    missing = [t for t in expected if t not in points]
+    if missing:
+        logger.info(f"daily_pivots covers {len(expected) - len(missing)}/{len(expected)} trading days, "
+                    f"computing {len(missing)} from daily bars")
+        computed = await _compute_cpr_points(data_manager, normalized_symbol, min(missing), max(missing))
+        for p in computed:
+            points.setdefault(p.time, p)
+    cpr_points = [points[t] for t in sorted(points)]
+
+    complete = all(t in points for t in expected)
+    if cache_key and cpr_points and complete:
+        await _cache_manager.set(cache_key, [p.model_dump() for p in cpr_points], _cache_manager.settings.cache_ttl_5m)
+    return cpr_points
+
+def _day_time(day: date) -> int:
+    """UTC epoch of a trading day's IST midnight (the time of its CPR point)"""
+    return (day - date(1970, 1, 1)).days * 86400 - IST_OFFSET_SECONDS
+
+def _expected_day_times(from_ts: int, to_ts: int) -> List[int]:
+    """Trading days in the window that should have CPR levels: none after today (IST)"""
+    first = datetime.utcfromtimestamp(from_ts + IST_OFFSET_SECONDS).date()
+    last = datetime.utcfromtimestamp(min(to_ts, int(time.time())) + IST_OFFSET_SECONDS).date()
+    return [_day_time(d) for d in get_calendar().trading_days(first, last)]
+
+async def _compute_cpr_points(
+    data_manager: DataManager,
+    normalized_symbol: str,
+    from_ts: int,
+    to_ts: int
+) -> List[CPRPoint]:
+    """CPR points computed from daily bars (for days daily_pivots does not cover)."""
     # Get daily OHLC data to calculate CPR
-    # We need to get data from earlier to have previous day's HLC for first day
-    extended_from = from_ts - (24 * 3600 * 10)  # 10 days before to ensure we have enough data
+    # Reach back far enough to include the previous trading day's HLC for the first day
+    extended_from = from_ts - lookback_seconds(INDICATORS["cpr"], {}, TIMEFRAME_MINUTES["1day"])
     
     try:
         # Always get daily bars for CPR calculation regardless of requested resolution
@@ -124,57 +217,15 @@ async def get_cpr_data(
             logger.warning(f"No daily data for CPR calculation: {daily_history}")
             return []
         
-        daily_bars = []
-        times = daily_history.get("t", [])
-        opens = daily_history.get("o", [])
-        highs = daily_history.get("h", [])
-        lows = daily_history.get("l", [])
-        closes = daily_history.get("c", [])
+        # Levels for every day at once, each from the previous day's HLC
+        day_times, levels = session_cpr(Bars.from_history(daily_history))
+        keep = (day_times >= from_ts) & ~np.isnan(levels["pivot"])
+        columns = {k: np.round(v[keep], 2).tolist() for k, v in levels.items()}
         
-        for i in range(len(times)):
-            daily_bars.append({
-                "time": times[i],
-                "open": opens[i],
-                "high": highs[i],
-                "low": lows[i],
-                "close": closes[i]
-            })
-        
-        # Generate CPR points - one per trading day
-        cpr_points = []
-        
-        for i in range(1, len(daily_bars)):  # Start from index 1 to have previous day
-            prev_day = daily_bars[i-1]
-            current_day = daily_bars[i]
-            
-            # Skip if current day is before our requested range
-            if current_day["time"] < from_ts:
-                continue
-                
-            # Calculate CPR from previous day's HLC
-            cpr_levels = calculate_cpr(
-                prev_day["high"],
-                prev_day["low"], 
-                prev_day["close"]
-            )
-            
-            # Create CPR point for current day (using current day's timestamp as start of trading day)
-            cpr_point = CPRPoint(
-                time=current_day["time"],  # Start of current trading day
-                pivot=cpr_levels["pivot"],
-                bc=cpr_levels["bc"],
-                tc=cpr_levels["tc"],
-                r1=cpr_levels["r1"],
-                r2=cpr_levels["r2"],
-                r3=cpr_levels["r3"],
-                s1=cpr_levels["s1"],
-                s2=cpr_levels["s2"],
-                s3=cpr_levels["s3"],
-                prev_high=cpr_levels["prev_high"],
-                prev_close=cpr_levels["prev_close"]
-            )
-            
-            cpr_points.append(cpr_point)
+        cpr_points = [
+            CPRPoint(time=t, **{k: columns[k][i] for k in CPRPoint.model_fields if k != "time"})
+            for i, t in enumerate(day_times[keep].tolist())
+        ]
         
         logger.info(f"Generated {len(cpr_points)} CPR points for trading days")
         return cpr_points
@@ -191,6 +242,16 @@ def set_data_manager(dm: DataManager):
     global _data_manager
     _data_manager = dm
 
+# Cache manager and checkpointed indicator series (set by main.py once the cache is up)
+_cache_manager: Optional[CacheManager] = None
+_checkpoints: Optional[IndicatorCheckpoints] = None
+
+def set_cache_manager(cm: CacheManager):
+    """Enable cached CPR reads and checkpointed indicator series"""
+    global _cache_manager, _checkpoints
+    _cache_manager = cm
+    _checkpoints = IndicatorCheckpoints(cm, settle_seconds=cm.settings.indicator_settle_seconds)
+
 async def get_data_manager() -> DataManager:
     """Get the data manager instance"""
     if not _data_manager:
@@ -238,21 +299,159 @@ async def get_cpr_indicator(
 @router.get("/available")
 async def get_available_indicators():
     """Get list of available technical indicators"""
-    return {
-        "indicators": [
-            {
-                "id": "cpr",
-                "name": "Central Pivot Range",
-                "description": "Daily pivot points with support and resistance levels",
-                "settings": {
-                    "pivot_color": "#FFEB3B",
-                    "bc_color": "#FF5722", 
-                    "tc_color": "#4CAF50",
-                    "resistance_color": "#2196F3",
-                    "support_color": "#FF9800",
-                    "line_width": 1,
-                    "line_style": "solid"
-                }
+    indicators = [
+        {
+            "id": spec.id,
+            "name": spec.name,
+            "description": spec.description,
+            "params": spec.params,
+            "outputs": list(spec.outputs),
+        }
+        for spec in INDICATORS.values()
+    ]
+    for ind in indicators:
+        if ind["id"] == "cpr":
+            ind["settings"] = {
+                "pivot_color": "#FFEB3B",
+                "bc_color": "#FF5722", 
+                "tc_color": "#4CAF50",
+                "resistance_color": "#2196F3",
+                "support_color": "#FF9800",
+                "line_width": 1,
+                "line_style": "solid"
             }
-        ]
-    }
\ No newline at end of file
+    return {"indicators": indicators}
+
+# Upper bound on bars fetched for one indicator request (a year of 1min bars is ~94k)
+MAX_INDICATOR_BARS = 200000
+
+def _bar_minutes(resolution: str) -> int:
+    """Bar length in minutes for a UI resolution ('5', '60', '1D', ...)."""
+    return TIMEFRAME_MINUTES.get(_normalize_timeframe(resolution), 1440)
+
+# Upper bound on studies in one batch request
+MAX_BATCH_INDICATORS = 20
+
+@router.post("/batch")
+async def get_indicator_batch(
+    batch: BatchIndicatorRequest,
+    data_manager: DataManager = Depends(get_data_manager)
+):
+    """
+    Compute several indicators from a single candle fetch.
+    Candles are fetched once, reaching back as far as the longest warm-up requested.
+
+    Body: {"symbol", "resolution", "from", "to",
+           "indicators": [{"id": "ema", "params": {"period": 50}}, {"id": "rsi"}, ...]}
+    Returns {"s", "t", "series": {key: {output: [...]}}, "params": {key: {...}}}
+    with one shared time axis for every study.
+    """
+    if not batch.indicators:
+        raise HTTPException(status_code=422, detail="No indicators requested")
+    if len(batch.indicators) > MAX_BATCH_INDICATORS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_INDICATORS} indicators per batch")
+
+    studies = []
+    for item in batch.indicators:
+        spec = INDICATORS.get(item.id)
+        if spec is None:
+            raise HTTPException(status_code=404, detail=f"Unknown indicator: {item.id}")
+        try:
+            params = spec.parse_params(item.params)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        key = item.key or "_".join([spec.id, *(str(v) for v in params.values())])
+        if any(key == k for k, _, _ in studies):
+            raise HTTPException(status_code=422, detail=f"Duplicate indicator key: {key}")
+        studies.append((key, spec, params))
+
+    from_ts, to_ts = _as_epoch_seconds(batch.from_timestamp, batch.to_timestamp)
+    bar_minutes = _bar_minutes(batch.resolution)
+    fetch_from = from_ts - max(lookback_seconds(spec, params, bar_minutes) for _, spec, params in studies)
+
+    try:
+        history = await data_manager.get_history(
+            batch.symbol, fetch_from, to_ts, batch.resolution, limit=MAX_INDICATOR_BARS
+        )
+        if history.get("s") != "ok":
+            return {"s": "no_data"}
+
+        bars = Bars.from_history(history)
+        keep = bars.t >= from_ts
+        series = {}
+        for key, spec, params in studies:
+            outputs = compute(spec.id, bars, params)
+            series[key] = {name: series_to_json(values[keep]) for name, values in outputs.items()}
+        return {
+            "s": "ok",
+            "t": bars.t[keep].tolist(),
+            "series": series,
+            "params": {key: params for key, _, params in studies},
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Indicator batch error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Keep this route last: it would otherwise shadow /cpr and /available
+@router.get("/{indicator_id}")
+async def get_indicator(
+    indicator_id: str,
+    request: Request,
+    symbol: str = Query("NIFTY50", description="Symbol"),
+    from_timestamp: int = Query(..., alias="from", description="Start timestamp"),
+    to_timestamp: int = Query(..., alias="to", description="End timestamp"),
+    resolution: str = Query("5", description="Timeframe resolution"),
+    data_manager: DataManager = Depends(get_data_manager)
+):
+    """
+    Compute any registered indicator over the requested window.
+    Indicator parameters are passed as extra query params, e.g.
+    /indicators/ema?from=...&to=...&resolution=5&period=50
+
+    Returns a columnar payload like /history: {"s", "t", "series": {output: [...]}}
+    with null for bars still inside the indicator's warm-up.
+    With the cache enabled only bars after the last checkpoint are computed.
+    """
+    spec = INDICATORS.get(indicator_id)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown indicator: {indicator_id}")
+    try:
+        params = spec.parse_params(request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    from_ts, to_ts = _as_epoch_seconds(from_timestamp, to_timestamp)
+    fetch_from = from_ts - lookback_seconds(spec, params, _bar_minutes(resolution))
+
+    try:
+        if _checkpoints is not None:
+            result = await _checkpoints.series(
+                data_manager, spec, params, symbol, resolution, from_ts, to_ts, limit=MAX_INDICATOR_BARS
+            )
+            if result is None:
+                return {"s": "no_data", "id": spec.id, "params": params}
+            return {"s": "ok", "id": spec.id, "params": params, **result}
+
+        history = await data_manager.get_history(
+            symbol, fetch_from, to_ts, resolution, limit=MAX_INDICATOR_BARS
+        )
+        if history.get("s") != "ok":
+            return {"s": "no_data", "id": spec.id, "params": params}
+
+        bars = Bars.from_history(history)
+        outputs = compute(spec.id, bars, params)
+        keep = bars.t >= from_ts
+        return {
+            "s": "ok",
+            "id": spec.id,
+            "params": params,
+            "t": bars.t[keep].tolist(),
+            "series": {name: series_to_json(values[keep]) for name, values in outputs.items()},
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Indicator {indicator_id} error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
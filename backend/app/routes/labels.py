@@ -6,6 +6,10 @@ import asyncpg
 import logging
 from datetime import datetime, timezone, timedelta
 
+from app.database import _normalize_timeframe
+from app.label_propagation import propagate_bar_label, publish_label_changes
+from app.streaming import publish_label_event
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -90,19 +94,29 @@ async def create_label(
                 # Update existing label
                 await conn.execute("""
                     UPDATE ml_labeled_data
-                    SET label = $4, label_confidence = 1.0, updated_at = NOW()
+                    SET label = $4, label_confidence = 1.0,
+                        label_source = 'user',
+                        updated_at = NOW()
                     WHERE symbol = $1 AND timeframe = $2 AND time = $3
                 """, symbol_normalized, timeframe, timestamp, label_data.label)
                 message = f"Updated label to {label_data.label}"
             else:
                 # Insert new label
                 await conn.execute("""
-                    INSERT INTO ml_labeled_data (symbol, timeframe, time, label, label_confidence, created_at)
-                    VALUES ($1, $2, $3, $4, 1.0, NOW())
+                    INSERT INTO ml_labeled_data (symbol, timeframe, time, label, label_confidence, label_source, created_at)
+                    VALUES ($1, $2, $3, $4, 1.0, 'user', NOW())
                 """, symbol_normalized, timeframe, timestamp, label_data.label)
                 message = f"Created new {label_data.label} label"
+
+            # Project the label onto finer/coarser timeframes
+            changes = await propagate_bar_label(conn, symbol_normalized, _normalize_timeframe(timeframe), timestamp)
         
         logger.info(f"Label operation: {message} for {label_data.symbol} at {timestamp}")
+        await publish_label_event(
+            "created", symbol_normalized, _normalize_timeframe(timeframe),
+            label_data.timestamp, label_data.label, 1.0
+        )
+        await publish_label_changes(symbol_normalized, changes)
         return LabelResponse(success=True, message=message)
         
     except Exception as e:
@@ -144,14 +158,23 @@ async def delete_label(
             """, symbol_normalized, timeframe, timestamp)
             
             rows_deleted = int(result.split()[-1])
+            changes = []
+            if rows_deleted > 0:
+                changes = await propagate_bar_label(conn, symbol_normalized, _normalize_timeframe(timeframe), timestamp)
             
         if rows_deleted > 0:
             message = f"Deleted label for {label_data.symbol} at {timestamp}"
             logger.info(message)
+            await publish_label_event(
+                "deleted", symbol_normalized, _normalize_timeframe(timeframe), label_data.timestamp
+            )
+            await publish_label_changes(symbol_normalized, changes)
             return LabelResponse(success=True, message=message)
         else:
-            return LabelResponse(success=False, message="No label found to delete")
+            raise HTTPException(status_code=404, detail="No label found to delete")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to delete label: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete label: {str(e)}")
\ No newline at end of file
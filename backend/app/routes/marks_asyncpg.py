@@ -5,6 +5,8 @@ from pydantic import BaseModel, field_validator
 import asyncpg
 import os
 
+from ..database import create_pool
+
 router = APIRouter()
 
 # ---------- Pydantic ----------
@@ -79,7 +81,7 @@ async def get_pool(request: Request) -> asyncpg.Pool:
         )
         if not dsn:
             raise RuntimeError("DATABASE_URL/TIMESCALE_DATABASE_URL/POSTGRES_URL not set")
-        request.app.state.__dict__[POOL_KEY] = await asyncpg.create_pool(dsn=dsn, min_size=1, max_size=5)
+        request.app.state.__dict__[POOL_KEY] = await create_pool(dsn=dsn, min_size=1, max_size=5)
         pool = request.app.state.__dict__[POOL_KEY]
     return pool
 
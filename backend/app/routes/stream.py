@@ -0,0 +1,218 @@
+# app/routes/stream.py
+"""
+Server push endpoints so charts receive changes instead of re-polling.
+Label events and live bars (for TradingView subscribeBars) are available as
+Server-Sent Events and over a WebSocket.
+"""
+
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from ..config import get_settings
+from ..database import _normalize_symbol, _normalize_timeframe
+from ..live_bars import bar_channel, decode_bar, read_recent
+from ..streaming import CoalescingSubscription, RedisFanout, get_bar_events, get_label_events, label_event_key
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["stream"])
+
+HEARTBEAT_SECONDS = 15.0
+
+
+def _require_label_events() -> RedisFanout:
+    hub = get_label_events()
+    if hub is None:
+        raise HTTPException(status_code=503, detail="Label event stream not available")
+    return hub
+
+
+@router.get("/stream/labels")
+async def stream_labels(
+    request: Request,
+    symbol: str = Query(..., description="Symbol to follow, e.g. NIFTY50"),
+    resolution: str = Query(..., description="Chart resolution, e.g. 5"),
+):
+    """
+    Server-Sent Events stream of label create/delete events for one symbol/timeframe.
+    Sends a comment line every 15s so proxies keep the connection open.
+    """
+    hub = _require_label_events()
+    sub = hub.subscribe(label_event_key(_normalize_symbol(symbol), _normalize_timeframe(resolution)))
+    logger.info(f"[LABEL STREAM] SSE subscribe {sub.key} ({hub.subscriber_count()} local subscribers)")
+
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                event = await sub.get(timeout=HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            hub.unsubscribe(sub)
+            logger.info(f"[LABEL STREAM] SSE unsubscribe {sub.key}")
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws/labels")
+async def websocket_labels(
+    websocket: WebSocket,
+    symbol: str = Query(...),
+    resolution: str = Query(...),
+):
+    """WebSocket variant of /stream/labels; events are sent as JSON text frames."""
+    hub: Optional[RedisFanout] = get_label_events()
+    if hub is None:
+        await websocket.close(code=1013)  # try again later
+        return
+
+    await websocket.accept()
+    sub = hub.subscribe(label_event_key(_normalize_symbol(symbol), _normalize_timeframe(resolution)))
+    logger.info(f"[LABEL STREAM] WS subscribe {sub.key} ({hub.subscriber_count()} local subscribers)")
+    try:
+        while True:
+            event = await sub.get(timeout=HEARTBEAT_SECONDS)
+            if event is None:
+                await websocket.send_json({"type": "heartbeat"})
+                continue
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"[LABEL STREAM] WS error: {e}")
+    finally:
+        hub.unsubscribe(sub)
+        logger.info(f"[LABEL STREAM] WS unsubscribe {sub.key}")
+
+
+# -----------------------------
+# Live bars
+# -----------------------------
+def _require_bar_events() -> RedisFanout:
+    hub = get_bar_events()
+    if hub is None:
+        raise HTTPException(status_code=503, detail="Live bar stream not available")
+    return hub
+
+
+def _bar_subscription(hub: RedisFanout, symbol: str, resolution: str, max_rate: Optional[float]) -> CoalescingSubscription:
+    limit = get_settings().bar_stream_max_rate
+    rate = min(max_rate, limit) if max_rate else limit
+    key = f"{_normalize_symbol(symbol)}:{_normalize_timeframe(resolution)}"
+    return hub.add(CoalescingSubscription(key, rate))
+
+
+async def _initial_bars(hub: RedisFanout, key: str, since: Optional[int]) -> list:
+    """
+    Stored bars after `since` (from the recent-bar set, for reconnecting clients),
+    then the current forming bar, so a new subscriber does not wait for the next tick.
+    """
+    symbol, timeframe = key.split(":", 1)
+    bars = []
+    try:
+        if since is not None:
+            bars = await read_recent(hub.redis, symbol, timeframe, since + 1)
+        payload = await hub.redis.get(f"{bar_channel(symbol, timeframe)}:forming")
+    except Exception as e:
+        logger.warning(f"[BAR STREAM] snapshot failed for {key}: {e}")
+        return bars
+    if payload:
+        forming = decode_bar(payload)
+        bars = [b for b in bars if b["time"] != forming["time"]] + [forming]
+    return bars
+
+
+def _bar_event(message: dict) -> dict:
+    return {k: v for k, v in message.items() if k != "key"}
+
+
+@router.get("/stream/bars")
+async def stream_bars(
+    request: Request,
+    symbol: str = Query(..., description="Symbol to follow, e.g. NIFTY50"),
+    resolution: str = Query(..., description="Chart resolution, e.g. 1"),
+    max_rate: Optional[float] = Query(None, gt=0, description="Max updates/sec (capped by BAR_STREAM_MAX_RATE)"),
+    since: Optional[int] = Query(None, description="Replay bars after this UTC epoch (last bar the client has)"),
+):
+    """
+    Server-Sent Events stream of live bars for one symbol/resolution: the forming
+    bar as it changes (coalesced to max_rate) and every bar as it closes.
+    With `since`, bars stored after that time are replayed first (bounded by the
+    recent-bar cache), so a reconnecting chart fills the gap without /history.
+    Bar times are UTC epochs, like /history.
+    """
+    hub = _require_bar_events()
+    sub = _bar_subscription(hub, symbol, resolution, max_rate)
+    logger.info(f"[BAR STREAM] SSE subscribe {sub.key} ({hub.subscriber_count()} local subscribers)")
+
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            for bar in await _initial_bars(hub, sub.key, since):
+                yield f"event: bar\ndata: {json.dumps(bar)}\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                batch = await sub.get_batch(timeout=HEARTBEAT_SECONDS)
+                if batch is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(f"event: bar\ndata: {json.dumps(_bar_event(m))}\n\n" for m in batch)
+        finally:
+            hub.unsubscribe(sub)
+            logger.info(f"[BAR STREAM] SSE unsubscribe {sub.key} ({sub.coalesced} updates coalesced)")
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws/bars")
+async def websocket_bars(
+    websocket: WebSocket,
+    symbol: str = Query(...),
+    resolution: str = Query(...),
+    max_rate: Optional[float] = Query(None),
+    since: Optional[int] = Query(None),
+):
+    """WebSocket variant of /stream/bars; each bar is a JSON text frame with type "bar"."""
+    hub: Optional[RedisFanout] = get_bar_events()
+    if hub is None:
+        await websocket.close(code=1013)  # try again later
+        return
+
+    await websocket.accept()
+    sub = _bar_subscription(hub, symbol, resolution, max_rate if max_rate and max_rate > 0 else None)
+    logger.info(f"[BAR STREAM] WS subscribe {sub.key} ({hub.subscriber_count()} local subscribers)")
+    try:
+        for bar in await _initial_bars(hub, sub.key, since):
+            await websocket.send_json({"type": "bar", **bar})
+        while True:
+            batch = await sub.get_batch(timeout=HEARTBEAT_SECONDS)
+            if batch is None:
+                await websocket.send_json({"type": "heartbeat"})
+                continue
+            for message in batch:
+                await websocket.send_json({"type": "bar", **_bar_event(message)})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"[BAR STREAM] WS error: {e}")
+    finally:
+        hub.unsubscribe(sub)
+        logger.info(f"[BAR STREAM] WS unsubscribe {sub.key} ({sub.coalesced} updates coalesced)")
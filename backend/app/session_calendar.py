@@ -0,0 +1,238 @@
+# app/session_calendar.py
+"""
+NSE trading session calendar.
+
+Intraday bars are aligned to the session open (09:15 IST), not to the epoch or
+the clock hour: a 1hour bar covers 09:15-10:15, ..., 15:15-15:30. Daily bars are
+IST calendar days. Special sessions (e.g. Muhurat trading) are aligned to their
+own open. Holidays have no session; half-days keep the normal open and close
+early, so they only change which buckets are expected, not where they start.
+
+The same rules are exposed three ways so every path agrees:
+
+  bucket_sql()        SQL expression used by app.aggregation for every roll-up
+  bucket_start()      one naive IST datetime (watermarks, gap checks)
+  resample_history()  on-the-fly resampling of a get_history() payload
+
+All times here are naive IST, the clock ml_labeled_data.time uses.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+IST_OFFSET_SECONDS = 19800
+SECONDS_PER_DAY = 86400
+
+# Exchange holidays (weekday closures). Extend via SESSION_HOLIDAYS when the
+# yearly NSE circular is published; a year with no entries here or in
+# SESSION_HOLIDAYS logs a warning, since every weekday would count as a session.
+NSE_HOLIDAYS = {
+    # 2024
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29", "2024-04-11",
+    "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17", "2024-07-17", "2024-08-15",
+    "2024-10-02", "2024-11-01", "2024-11-15", "2024-11-20", "2024-12-25",
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18",
+    "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
+    "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03", "2026-04-14",
+    "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02", "2026-10-20",
+    "2026-11-10", "2026-11-24", "2026-12-25",
+}
+
+# Sessions outside the regular hours (Muhurat trading): date -> (open, close)
+NSE_SPECIAL_SESSIONS = {
+    "2024-11-01": ("18:00", "19:00"),
+    "2025-10-21": ("13:45", "14:45"),
+}
+
+
+def _parse_time(value: str) -> time:
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+
+def _seconds(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+@dataclass
+class SessionCalendar:
+    open_time: time = time(9, 15)
+    close_time: time = time(15, 30)
+    holidays: set = field(default_factory=set)                 # {date}
+    half_days: Dict[date, time] = field(default_factory=dict)  # date -> early close
+    special_sessions: Dict[date, Tuple[time, time]] = field(default_factory=dict)
+    holiday_years: Optional[set] = None   # years the holiday list covers (default: years in `holidays`)
+
+    def __post_init__(self):
+        if self.holiday_years is None:
+            self.holiday_years = {d.year for d in self.holidays}
+        self._warned_years: set = set()
+
+    def _check_year(self, year: int):
+        if year not in self.holiday_years and year not in self._warned_years:
+            self._warned_years.add(year)
+            logger.warning(f"[SESSION CALENDAR] no exchange holidays known for {year}; "
+                           f"every weekday is treated as a session (set SESSION_HOLIDAYS)")
+
+    @classmethod
+    def from_settings(cls) -> "SessionCalendar":
+        s = get_settings()
+        holidays = {date.fromisoformat(d) for d in NSE_HOLIDAYS | set(s.session_holidays)}
+        special = {**NSE_SPECIAL_SESSIONS, **s.session_special_sessions}
+        special_sessions = {
+            date.fromisoformat(d): (_parse_time(o), _parse_time(c)) for d, (o, c) in special.items()
+        }
+        return cls(
+            open_time=_parse_time(s.session_open),
+            close_time=_parse_time(s.session_close),
+            # a special session overrides a holiday on the same date
+            holidays=holidays - set(special_sessions),
+            half_days={date.fromisoformat(d): _parse_time(c) for d, c in s.session_half_days.items()},
+            special_sessions=special_sessions,
+        )
+
+    # ---------- sessions ----------
+    def is_trading_day(self, day: date) -> bool:
+        if day in self.special_sessions:
+            return True
+        self._check_year(day.year)
+        return day.weekday() < 5 and day not in self.holidays
+
+    def session_hours(self, day: date) -> Optional[Tuple[time, time]]:
+        """(open, close) for `day`, or None if the market is closed."""
+        if day in self.special_sessions:
+            return self.special_sessions[day]
+        if not self.is_trading_day(day):
+            return None
+        return self.open_time, self.half_days.get(day, self.close_time)
+
+    def session_bounds(self, day: date) -> Optional[Tuple[datetime, datetime]]:
+        hours = self.session_hours(day)
+        if hours is None:
+            return None
+        return datetime.combine(day, hours[0]), datetime.combine(day, hours[1])
+
+    def trading_days(self, start: date, end: date) -> List[date]:
+        days = []
+        day = start
+        while day <= end:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def anchor_seconds(self, day: date) -> int:
+        """Seconds after midnight that intraday buckets on `day` are aligned to."""
+        if day in self.special_sessions:
+            return _seconds(self.special_sessions[day][0])
+        return _seconds(self.open_time)
+
+    # ---------- bucketing ----------
+    def bucket_start(self, value: datetime, minutes: int) -> datetime:
+        """Start of the `minutes` bar containing `value` (naive IST)."""
+        midnight = datetime.combine(value.date(), time())
+        if minutes >= 1440:
+            return midnight
+        anchor = self.anchor_seconds(value.date())
+        size = minutes * 60
+        offset = int((value - midnight).total_seconds()) - anchor
+        return midnight + timedelta(seconds=anchor + (offset // size) * size)
+
+    def bucket_sql(self, minutes: int, column: str = "time") -> str:
+        """SQL for the start of the `minutes` bar containing `column` (naive IST timestamp)."""
+        day = f"date_trunc('day', {column})"
+        if minutes >= 1440:
+            return day
+        size = int(minutes) * 60
+        anchor = str(_seconds(self.open_time))
+        if self.special_sessions:
+            cases = " ".join(
+                f"WHEN DATE '{d.isoformat()}' THEN {_seconds(hours[0])}"
+                for d, hours in sorted(self.special_sessions.items())
+            )
+            anchor = f"(CASE {day}::date {cases} ELSE {anchor} END)"
+        return (
+            f"({day} + make_interval(secs => {anchor} + "
+            f"FLOOR((EXTRACT(EPOCH FROM {column} - {day}) - {anchor}) / {size}) * {size}))"
+        )
+
+    def bucket_epochs(self, t: np.ndarray, minutes: int) -> np.ndarray:
+        """Vectorized bucket_start over UTC epoch seconds; returns UTC epochs."""
+        ist = np.asarray(t, dtype=np.int64) + IST_OFFSET_SECONDS
+        day = (ist // SECONDS_PER_DAY) * SECONDS_PER_DAY
+        if minutes >= 1440:
+            return day - IST_OFFSET_SECONDS
+        anchor = np.full(len(ist), _seconds(self.open_time), dtype=np.int64)
+        for d, hours in self.special_sessions.items():
+            d_epoch = (d - date(1970, 1, 1)).days * SECONDS_PER_DAY
+            anchor[day == d_epoch] = _seconds(hours[0])
+        size = minutes * 60
+        return day + anchor + ((ist - day - anchor) // size) * size - IST_OFFSET_SECONDS
+
+
+@lru_cache()
+def get_calendar() -> SessionCalendar:
+    return SessionCalendar.from_settings()
+
+
+def resample_history(history: Mapping[str, Any], minutes: int,
+                     calendar: Optional[SessionCalendar] = None) -> Dict[str, Any]:
+    """
+    Roll a get_history() payload ({"s", "t", "o", "h", "l", "c", "v"}, UTC epochs,
+    ascending) up to `minutes` bars on the session grid.
+    """
+    if history.get("s") != "ok" or not history.get("t"):
+        return dict(history)
+    calendar = calendar or get_calendar()
+
+    t = np.asarray(history["t"], dtype=np.int64)
+    buckets = calendar.bucket_epochs(t, minutes)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(t)] - 1
+
+    o = np.asarray(history["o"], dtype=np.float64)
+    h = np.asarray(history["h"], dtype=np.float64)
+    l = np.asarray(history["l"], dtype=np.float64)
+    c = np.asarray(history["c"], dtype=np.float64)
+    v = np.asarray(history.get("v") or np.zeros(len(t)), dtype=np.float64)
+    return {
+        "s": "ok",
+        "t": buckets[starts].tolist(),
+        "o": o[starts].tolist(),
+        "h": np.maximum.reduceat(h, starts).tolist(),
+        "l": np.minimum.reduceat(l, starts).tolist(),
+        "c": c[ends].tolist(),
+        "v": [int(x) for x in np.add.reduceat(v, starts)],
+    }
+
+
+def expected_buckets(day: date, minutes: int, calendar: Optional[SessionCalendar] = None) -> List[datetime]:
+    """Bar start times a complete `minutes` series has on `day` (naive IST)."""
+    calendar = calendar or get_calendar()
+    bounds = calendar.session_bounds(day)
+    if bounds is None:
+        return []
+    open_dt, close_dt = bounds
+    if minutes >= 1440:
+        return [datetime.combine(day, time())]
+    out = []
+    current = calendar.bucket_start(open_dt, minutes)
+    step = timedelta(minutes=minutes)
+    while current < close_dt:
+        out.append(current)
+        current += step
+    return out
+
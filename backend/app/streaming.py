@@ -0,0 +1,256 @@
+# app/streaming.py
+"""
+Redis pub/sub fan-out for server push channels.
+
+Every API worker keeps a single Redis subscription per channel and fans the
+messages out to its own connected clients, so an event published by any
+worker reaches every subscriber regardless of which worker it is attached to.
+
+A hub can also follow a channel pattern (psubscribe), e.g. every live bar
+channel bars:*, so one Redis subscription per worker serves any number of
+symbols and timeframes.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import redis.asyncio as redis
+
+from .live_bars import decode_bar
+
+logger = logging.getLogger(__name__)
+
+# Redis channel carrying label create/delete events
+LABEL_EVENTS_CHANNEL = "label_events"
+
+# Live bar channels published by the ingestion service (app/live_bars.py)
+BAR_CHANNEL_PATTERN = "bars:*"
+
+
+class Subscription:
+    """A single client's bounded inbox on a fan-out channel."""
+
+    def __init__(self, key: str, maxsize: int = 256):
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def push(self, message: Dict[str, Any]) -> None:
+        """Enqueue without blocking; a slow client loses its oldest events."""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to `timeout` seconds for the next message (None on timeout)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class CoalescingSubscription(Subscription):
+    """
+    Inbox that keeps only the newest message per `coalesce_field` value and is
+    drained at most `max_rate` times a second. A forming bar updated on every tick
+    reaches the client as its latest state, while a bar that closed between two
+    sends is still delivered (it has a different bar time).
+    """
+
+    def __init__(self, key: str, max_rate: float, coalesce_field: str = "time"):
+        super().__init__(key, maxsize=1)
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.coalesce_field = coalesce_field
+        self.pending: Dict[Any, Dict[str, Any]] = {}
+        self.ready = asyncio.Event()
+        self.last_sent = 0.0
+        self.coalesced = 0
+
+    def push(self, message: Dict[str, Any]) -> None:
+        slot = message.get(self.coalesce_field)
+        if slot in self.pending:
+            self.coalesced += 1
+        self.pending[slot] = message
+        self.ready.set()
+
+    async def get_batch(self, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Pending messages oldest first, no sooner than 1/max_rate after the last batch (None on timeout)."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        wait = self.last_sent + self.interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)  # more updates coalesce meanwhile
+        batch = [self.pending[k] for k in sorted(self.pending, key=lambda k: (k is None, k))]
+        self.pending.clear()
+        self.ready.clear()
+        self.last_sent = time.monotonic()
+        return batch
+
+
+class RedisFanout:
+    """Publish JSON messages to a Redis channel and dispatch them to local subscribers by key."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        channel: str,
+        key_func: Callable[[Dict[str, Any]], str],
+        pattern: bool = False,
+        parse: Optional[Callable[[str, Any], Dict[str, Any]]] = None,
+    ):
+        """
+        pattern  treat `channel` as a glob and psubscribe to it
+        parse    (channel, raw data) -> message; default is json.loads(data)
+        """
+        self.redis = redis_client
+        self.channel = channel
+        self.key_func = key_func
+        self.pattern = pattern
+        self.parse = parse or (lambda channel, data: json.loads(data))
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        await self.redis.publish(self.channel, json.dumps(message, default=str))
+
+    def subscribe(self, key: str, maxsize: int = 256) -> Subscription:
+        return self.add(Subscription(key, maxsize))
+
+    def add(self, sub: Subscription) -> Subscription:
+        self.subscribers.setdefault(sub.key, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self.subscribers.get(sub.key)
+        if not subs:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self.subscribers[sub.key]
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self.subscribers.values())
+
+    def dispatch(self, message: Dict[str, Any]) -> None:
+        """Deliver a message to every local subscriber of its key."""
+        for sub in list(self.subscribers.get(self.key_func(message), ())):
+            sub.push(message)
+
+    async def run(self) -> None:
+        """Listen on the Redis channel and dispatch until cancelled (supervised by main.py)."""
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        if self.pattern:
+            await pubsub.psubscribe(self.channel)
+        else:
+            await pubsub.subscribe(self.channel)
+        logger.info(f"Subscribed to Redis channel {self.channel}")
+        try:
+            while True:
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if msg is None:
+                    continue
+                # Nobody on this worker follows the channel: skip decoding entirely
+                if self.pattern and not self.subscribers:
+                    continue
+                try:
+                    self.dispatch(self.parse(msg["channel"], msg["data"]))
+                except Exception as e:
+                    logger.error(f"Bad message on {msg.get('channel', self.channel)}: {e}")
+        finally:
+            if self.pattern:
+                await pubsub.punsubscribe(self.channel)
+            else:
+                await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
+
+
+# -----------------------------
+# Label events
+# -----------------------------
+def label_event_key(symbol: str, timeframe: str) -> str:
+    """Subscription key for a (DB-normalized symbol, DB-normalized timeframe) pair."""
+    return f"{symbol}:{timeframe}"
+
+
+def _label_message_key(message: Dict[str, Any]) -> str:
+    return label_event_key(message.get("symbol", ""), message.get("timeframe", ""))
+
+
+# Global label event hub (set by main.py)
+_label_events: Optional[RedisFanout] = None
+
+
+def create_label_events(redis_client: redis.Redis) -> RedisFanout:
+    return RedisFanout(redis_client, LABEL_EVENTS_CHANNEL, _label_message_key)
+
+
+def set_label_events(hub: Optional[RedisFanout]):
+    """Set the label event hub instance from main.py"""
+    global _label_events
+    _label_events = hub
+
+
+def get_label_events() -> Optional[RedisFanout]:
+    return _label_events
+
+
+async def publish_label_event(
+    action: str,                     # "created" | "deleted"
+    symbol: str,                     # DB-normalized symbol ('NIFTY')
+    timeframe: str,                  # DB-normalized timeframe ('5min')
+    time: int,                       # bar time (epoch seconds, UTC)
+    label: Optional[str] = None,
+    confidence: Optional[float] = None,
+) -> None:
+    """
+    Broadcast a label change to subscribed clients.
+    Never raises: a missing hub or Redis error must not fail the label write.
+    """
+    if _label_events is None:
+        return
+    try:
+        await _label_events.publish({
+            "type": f"label.{action}",
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "time": int(time),
+            "label": label,
+            "confidence": confidence,
+        })
+    except Exception as e:
+        logger.error(f"Failed to publish label event: {e}")
+
+
+# -----------------------------
+# Live bars
+# -----------------------------
+def _bar_message(channel: str, data: Any) -> Dict[str, Any]:
+    # channel is bars:{symbol}:{timeframe}; the key is what follows the prefix
+    return {"key": channel.split(":", 1)[1], **decode_bar(data)}
+
+
+# Global live bar hub (set by main.py)
+_bar_events: Optional[RedisFanout] = None
+
+
+def create_bar_events(redis_client: redis.Redis) -> RedisFanout:
+    return RedisFanout(redis_client, BAR_CHANNEL_PATTERN, lambda m: m["key"], pattern=True, parse=_bar_message)
+
+
+def set_bar_events(hub: Optional[RedisFanout]):
+    """Set the live bar hub instance from main.py"""
+    global _bar_events
+    _bar_events = hub
+
+
+def get_bar_events() -> Optional[RedisFanout]:
+    return _bar_events
@@ -0,0 +1,23 @@
+-- Queued repairs for gaps in 1min data
+-- Filled by the gap scanner (POST /admin/gaps/repair, app/gap_scanner.py) and
+-- drained by the real-time sync service: each pending range is re-copied from
+-- nifty50_ohlc, its days are released for the next backfill run when
+-- needs_backfill is set, and only the buckets that contain it are
+-- re-aggregated for every timeframe.
+
+CREATE TABLE IF NOT EXISTS aggregation_dirty_ranges (
+    id             BIGSERIAL PRIMARY KEY,
+    symbol         TEXT NOT NULL,
+    range_start    TIMESTAMP NOT NULL,        -- naive IST, same clock as ml_labeled_data.time
+    range_end      TIMESTAMP NOT NULL,        -- inclusive
+    needs_backfill BOOLEAN NOT NULL DEFAULT TRUE,
+    status         TEXT NOT NULL DEFAULT 'pending',   -- pending | done | failed
+    attempts       INTEGER NOT NULL DEFAULT 0,
+    error          TEXT,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    processed_at   TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_aggregation_dirty_ranges_pending
+    ON aggregation_dirty_ranges (symbol, range_start)
+    WHERE status = 'pending';
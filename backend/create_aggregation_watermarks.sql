@@ -0,0 +1,23 @@
+-- Incremental aggregation watermarks
+-- One row per symbol and timeframe: the latest source row time already folded
+-- into that timeframe (nifty50_ohlc for 1min, the TimeframeConfig.source level
+-- of ml_labeled_data otherwise). The sync path in data_transformation_pipeline.py
+-- re-aggregates from the bucket containing the watermark up to the newest source
+-- row, so each run touches only the open bar and anything after it.
+
+CREATE TABLE IF NOT EXISTS aggregation_watermarks (
+    symbol       TEXT NOT NULL,
+    timeframe    TEXT NOT NULL,
+    watermark    TIMESTAMP NOT NULL,        -- same clock as ml_labeled_data.time
+    rows_written BIGINT NOT NULL DEFAULT 0, -- rows upserted by the last advance
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (symbol, timeframe)
+);
+
+-- Late rows: 1min source rows written or rewritten behind the 1min watermark
+-- (late ticks, corrections) are found by nifty50_ohlc.updated_at and queued in
+-- aggregation_dirty_ranges. source_updated_at on the 1min row is the
+-- updated_at up to which nifty50_ohlc has been checked.
+ALTER TABLE aggregation_watermarks ADD COLUMN IF NOT EXISTS source_updated_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_nifty50_ohlc_updated_at ON nifty50_ohlc (updated_at);
@@ -0,0 +1,16 @@
+-- Historical backfill checkpoints
+-- One row per symbol, timeframe and trading day that backfill_nifty_history.py
+-- has fully fetched and loaded. Re-runs skip these days (and days that already
+-- hold a complete session of bars), so an interrupted backfill resumes where it
+-- stopped instead of starting over.
+
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    symbol      TEXT NOT NULL,
+    timeframe   TEXT NOT NULL,
+    trade_date  DATE NOT NULL,
+    candles     INTEGER NOT NULL,           -- candles returned by the ticker service
+    written     INTEGER NOT NULL,           -- new rows in ml_labeled_data
+    status      TEXT NOT NULL,              -- 'done' | 'empty' (no session, e.g. unlisted holiday)
+    fetched_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (symbol, timeframe, trade_date)
+);
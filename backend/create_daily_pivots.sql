@@ -0,0 +1,129 @@
+-- Materialized daily pivot levels (CPR, Camarilla, Fibonacci)
+-- One row per symbol and trading day, computed from the previous trading day's
+-- 1day bar in ml_labeled_data. Filled by data_transformation_pipeline.py right
+-- after the 1day timeframe is aggregated; read by /indicators/cpr.
+
+CREATE TABLE IF NOT EXISTS daily_pivots (
+    symbol       TEXT NOT NULL,
+    trade_date   DATE NOT NULL,             -- day the levels apply to (IST)
+    basis_date   DATE NOT NULL,             -- day whose HLC they come from
+    projected    BOOLEAN NOT NULL DEFAULT FALSE,  -- next session, no 1day bar yet
+    prev_high    DOUBLE PRECISION NOT NULL,
+    prev_low     DOUBLE PRECISION NOT NULL,
+    prev_close   DOUBLE PRECISION NOT NULL,
+    -- Central Pivot Range / floor pivots
+    pivot DOUBLE PRECISION, bc DOUBLE PRECISION, tc DOUBLE PRECISION,
+    r1 DOUBLE PRECISION, r2 DOUBLE PRECISION, r3 DOUBLE PRECISION,
+    s1 DOUBLE PRECISION, s2 DOUBLE PRECISION, s3 DOUBLE PRECISION,
+    -- Camarilla
+    cam_r1 DOUBLE PRECISION, cam_r2 DOUBLE PRECISION, cam_r3 DOUBLE PRECISION, cam_r4 DOUBLE PRECISION,
+    cam_s1 DOUBLE PRECISION, cam_s2 DOUBLE PRECISION, cam_s3 DOUBLE PRECISION, cam_s4 DOUBLE PRECISION,
+    -- Fibonacci
+    fib_r1 DOUBLE PRECISION, fib_r2 DOUBLE PRECISION, fib_r3 DOUBLE PRECISION,
+    fib_s1 DOUBLE PRECISION, fib_s2 DOUBLE PRECISION, fib_s3 DOUBLE PRECISION,
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (symbol, trade_date)
+);
+
+-- Recompute pivots for trade dates in [p_from, p_to] with one set-based upsert.
+-- Each 1day bar takes its levels from the previous 1day bar (LAG), so holidays
+-- need no calendar. The day after the latest bar gets a projected row (next
+-- weekday) so levels are available before its first bar prints; stale
+-- projections (e.g. a holiday) are removed once real bars arrive.
+CREATE OR REPLACE FUNCTION refresh_daily_pivots(p_symbol TEXT, p_from DATE, p_to DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written INTEGER;
+    last_day DATE;
+BEGIN
+    -- Latest 1day bar overall; only it gets a projected successor
+    SELECT MAX(time)::date INTO last_day
+    FROM ml_labeled_data
+    WHERE symbol = p_symbol AND timeframe = '1day';
+
+    -- Rows for days with no 1day bar (earlier projections that turned out to be holidays)
+    DELETE FROM daily_pivots p
+    WHERE p.symbol = p_symbol
+      AND p.trade_date BETWEEN p_from AND p_to
+      AND NOT EXISTS (
+            SELECT 1 FROM ml_labeled_data d
+            WHERE d.symbol = p_symbol
+              AND d.timeframe = '1day'
+              AND d.time >= p.trade_date AND d.time < p.trade_date + 1
+      );
+
+    WITH days AS (
+        SELECT
+            time::date AS trade_date,
+            LAG(time::date) OVER w AS basis_date,
+            LAG(high) OVER w AS h,
+            LAG(low) OVER w AS l,
+            LAG(close) OVER w AS c,
+            time::date = last_day AS is_last,
+            high AS today_high, low AS today_low, close AS today_close
+        FROM ml_labeled_data
+        -- reach back far enough to find the bar before p_from across long holidays
+        WHERE symbol = p_symbol
+          AND timeframe = '1day'
+          AND time >= p_from - 10
+          AND time < p_to + 1
+          AND high IS NOT NULL AND low IS NOT NULL AND close IS NOT NULL
+        WINDOW w AS (ORDER BY time)
+    ),
+    basis AS (
+        SELECT trade_date, basis_date, h, l, c, FALSE AS projected
+        FROM days
+        WHERE basis_date IS NOT NULL AND trade_date >= p_from
+        UNION ALL
+        -- next weekday after the latest bar
+        SELECT
+            trade_date + CASE EXTRACT(ISODOW FROM trade_date) WHEN 5 THEN 3 WHEN 6 THEN 2 ELSE 1 END,
+            trade_date, today_high, today_low, today_close, TRUE
+        FROM days
+        WHERE is_last
+    ),
+    levels AS (
+        SELECT b.*, (h + l + c) / 3.0 AS p, h - l AS rng
+        FROM basis b
+        WHERE trade_date BETWEEN p_from AND p_to + 7
+    )
+    INSERT INTO daily_pivots (
+        symbol, trade_date, basis_date, projected, prev_high, prev_low, prev_close,
+        pivot, bc, tc, r1, r2, r3, s1, s2, s3,
+        cam_r1, cam_r2, cam_r3, cam_r4, cam_s1, cam_s2, cam_s3, cam_s4,
+        fib_r1, fib_r2, fib_r3, fib_s1, fib_s2, fib_s3,
+        updated_at
+    )
+    SELECT
+        p_symbol, trade_date, basis_date, projected, h, l, c,
+        p, (h + l) / 2.0, 2.0 * p - (h + l) / 2.0,
+        2.0 * p - l, p + rng, h + 2.0 * (p - l),
+        2.0 * p - h, p - rng, l - 2.0 * (h - p),
+        c + rng * 1.1 / 12, c + rng * 1.1 / 6, c + rng * 1.1 / 4, c + rng * 1.1 / 2,
+        c - rng * 1.1 / 12, c - rng * 1.1 / 6, c - rng * 1.1 / 4, c - rng * 1.1 / 2,
+        p + 0.382 * rng, p + 0.618 * rng, p + rng,
+        p - 0.382 * rng, p - 0.618 * rng, p - rng,
+        NOW()
+    FROM levels
+    ON CONFLICT (symbol, trade_date) DO UPDATE SET
+        basis_date = EXCLUDED.basis_date, projected = EXCLUDED.projected,
+        prev_high = EXCLUDED.prev_high, prev_low = EXCLUDED.prev_low, prev_close = EXCLUDED.prev_close,
+        pivot = EXCLUDED.pivot, bc = EXCLUDED.bc, tc = EXCLUDED.tc,
+        r1 = EXCLUDED.r1, r2 = EXCLUDED.r2, r3 = EXCLUDED.r3,
+        s1 = EXCLUDED.s1, s2 = EXCLUDED.s2, s3 = EXCLUDED.s3,
+        cam_r1 = EXCLUDED.cam_r1, cam_r2 = EXCLUDED.cam_r2, cam_r3 = EXCLUDED.cam_r3, cam_r4 = EXCLUDED.cam_r4,
+        cam_s1 = EXCLUDED.cam_s1, cam_s2 = EXCLUDED.cam_s2, cam_s3 = EXCLUDED.cam_s3, cam_s4 = EXCLUDED.cam_s4,
+        fib_r1 = EXCLUDED.fib_r1, fib_r2 = EXCLUDED.fib_r2, fib_r3 = EXCLUDED.fib_r3,
+        fib_s1 = EXCLUDED.fib_s1, fib_s2 = EXCLUDED.fib_s2, fib_s3 = EXCLUDED.fib_s3,
+        updated_at = NOW();
+    GET DIAGNOSTICS written = ROW_COUNT;
+
+    -- A projection is only valid beyond the latest bar
+    DELETE FROM daily_pivots
+    WHERE symbol = p_symbol AND projected AND trade_date <= last_day;
+
+    RETURN written;
+END;
+$$;
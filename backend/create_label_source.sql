@@ -0,0 +1,18 @@
+-- Origin of each label in ml_labeled_data
+-- 'user' for labels set through the API, 'propagated' for labels copied across
+-- timeframes by app/label_propagation.py, NULL for model or legacy labels.
+-- Kept apart from labeling_version, which the aggregation pipeline rewrites on
+-- every bar it touches.
+
+ALTER TABLE ml_labeled_data ADD COLUMN IF NOT EXISTS label_source TEXT;
+
+-- Rows tagged by earlier versions of the propagation code
+UPDATE ml_labeled_data
+SET label_source = 'propagated',
+    labeling_version = NULL
+WHERE labeling_version = 'propagated';
+
+UPDATE ml_labeled_data
+SET label_source = 'user'
+WHERE label_source IS NULL
+  AND labeling_version = 'user';
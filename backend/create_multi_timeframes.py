@@ -5,6 +5,11 @@ import asyncio
 import asyncpg
 import os
 
+from app.aggregation import aggregate_upsert_sql
+
+# Source rows are selected with epoch-second bounds
+EPOCH_RANGE_SQL = "time >= to_timestamp($2) AND time < to_timestamp($3)"
+
 async def create_multi_timeframes():
     # Database configuration
     db_config = {
@@ -22,101 +27,29 @@ async def create_multi_timeframes():
         
         # Create 2-minute data
         print("\nCreating 2-minute data...")
-        create_2min = """
-            INSERT INTO ml_labeled_data (
-                symbol, timeframe, time, open, high, low, close, volume, created_at
-            )
-            WITH grouped_data AS (
-                SELECT 
-                    symbol,
-                    timestamp 'epoch' + interval '1 second' * (EXTRACT(EPOCH FROM time)::integer / 120 * 120) as bucket_time,
-                    time, open, high, low, close, volume,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, EXTRACT(EPOCH FROM time)::integer / 120 ORDER BY time) as rn_first,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, EXTRACT(EPOCH FROM time)::integer / 120 ORDER BY time DESC) as rn_last
-                FROM ml_labeled_data
-                WHERE 
-                    symbol = 'NIFTY' AND timeframe = '1min'
-                    AND time >= to_timestamp(1729500000) AND time < to_timestamp(1729540000)
-                    AND open IS NOT NULL AND high IS NOT NULL AND low IS NOT NULL AND close IS NOT NULL
-            )
-            SELECT 
-                symbol, '2min' as timeframe, bucket_time as time,
-                MAX(CASE WHEN rn_first = 1 THEN open END) as open,
-                MAX(high) as high, MIN(low) as low,
-                MAX(CASE WHEN rn_last = 1 THEN close END) as close,
-                SUM(volume) as volume, NOW() as created_at
-            FROM grouped_data
-            GROUP BY symbol, bucket_time
-            ORDER BY bucket_time
-            ON CONFLICT (symbol, timeframe, time) DO NOTHING
-        """
-        result = await conn.execute(create_2min)
+        create_2min = aggregate_upsert_sql(
+            '2min', 2, source='1min', mode="window",
+            range_sql=EPOCH_RANGE_SQL, derived=False, on_conflict="nothing",
+        )
+        result = await conn.execute(create_2min, 'NIFTY', 1729500000, 1729540000)
         print(f"Created 2-minute data: {result}")
         
-        # Create 1-hour data
+        # Create 1-hour data from 15min only (mixing 5min and 15min rows double-counted volume)
         print("\nCreating 1-hour data...")
-        create_1hour = """
-            INSERT INTO ml_labeled_data (
-                symbol, timeframe, time, open, high, low, close, volume, created_at
-            )
-            WITH grouped_data AS (
-                SELECT 
-                    symbol,
-                    timestamp 'epoch' + interval '1 second' * (EXTRACT(EPOCH FROM time)::integer / 3600 * 3600) as bucket_time,
-                    time, open, high, low, close, volume,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, EXTRACT(EPOCH FROM time)::integer / 3600 ORDER BY time) as rn_first,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, EXTRACT(EPOCH FROM time)::integer / 3600 ORDER BY time DESC) as rn_last
-                FROM ml_labeled_data
-                WHERE 
-                    symbol = 'NIFTY' AND timeframe IN ('5min', '15min')
-                    AND time >= to_timestamp(1729000000) AND time < to_timestamp(1730000000)
-                    AND open IS NOT NULL AND high IS NOT NULL AND low IS NOT NULL AND close IS NOT NULL
-            )
-            SELECT 
-                symbol, '1hour' as timeframe, bucket_time as time,
-                MAX(CASE WHEN rn_first = 1 THEN open END) as open,
-                MAX(high) as high, MIN(low) as low,
-                MAX(CASE WHEN rn_last = 1 THEN close END) as close,
-                SUM(volume) as volume, NOW() as created_at
-            FROM grouped_data
-            GROUP BY symbol, bucket_time
-            ORDER BY bucket_time
-            ON CONFLICT (symbol, timeframe, time) DO NOTHING
-        """
-        result = await conn.execute(create_1hour)
+        create_1hour = aggregate_upsert_sql(
+            '1hour', 60, source='15min', mode="window",
+            range_sql=EPOCH_RANGE_SQL, derived=False, on_conflict="nothing",
+        )
+        result = await conn.execute(create_1hour, 'NIFTY', 1729000000, 1730000000)
         print(f"Created 1-hour data: {result}")
         
         # Create 1-day data
         print("\nCreating 1-day data...")
-        create_1day = """
-            INSERT INTO ml_labeled_data (
-                symbol, timeframe, time, open, high, low, close, volume, created_at
-            )
-            WITH grouped_data AS (
-                SELECT 
-                    symbol,
-                    date_trunc('day', time) as bucket_time,
-                    time, open, high, low, close, volume,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, date_trunc('day', time) ORDER BY time) as rn_first,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, date_trunc('day', time) ORDER BY time DESC) as rn_last
-                FROM ml_labeled_data
-                WHERE 
-                    symbol = 'NIFTY' AND timeframe = '30min'
-                    AND time >= to_timestamp(1700000000) AND time < to_timestamp(1730000000)
-                    AND open IS NOT NULL AND high IS NOT NULL AND low IS NOT NULL AND close IS NOT NULL
-            )
-            SELECT 
-                symbol, '1day' as timeframe, bucket_time as time,
-                MAX(CASE WHEN rn_first = 1 THEN open END) as open,
-                MAX(high) as high, MIN(low) as low,
-                MAX(CASE WHEN rn_last = 1 THEN close END) as close,
-                SUM(volume) as volume, NOW() as created_at
-            FROM grouped_data
-            GROUP BY symbol, bucket_time
-            ORDER BY bucket_time
-            ON CONFLICT (symbol, timeframe, time) DO NOTHING
-        """
-        result = await conn.execute(create_1day)
+        create_1day = aggregate_upsert_sql(
+            '1day', 1440, source='30min', mode="window",
+            range_sql=EPOCH_RANGE_SQL, derived=False, on_conflict="nothing",
+        )
+        result = await conn.execute(create_1day, 'NIFTY', 1700000000, 1730000000)
         print(f"Created 1-day data: {result}")
         
         # Verify the results
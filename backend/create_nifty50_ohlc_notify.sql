@@ -0,0 +1,28 @@
+-- Change notifications for nifty50_ohlc
+-- Every insert or update pings the 'nifty50_ohlc_changed' channel so the
+-- real-time sync service (frontend/real_time_sync_service.py) aggregates as soon
+-- as a bar lands instead of waiting for its polling interval.
+--
+-- The trigger is row-level (statement triggers with transition tables are not
+-- available on hypertables), but Postgres folds identical payloads raised in one
+-- transaction into a single notification, so a bulk load sends one message per
+-- trading day it touches. txn_at is the inserting transaction's start time and
+-- lets the listener measure insert-to-aggregated-bar latency.
+
+CREATE OR REPLACE FUNCTION notify_nifty50_ohlc_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'nifty50_ohlc_changed',
+        json_build_object(
+            'day', NEW.time::date,
+            'txn_at', extract(epoch FROM now())
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS nifty50_ohlc_notify ON nifty50_ohlc;
+CREATE TRIGGER nifty50_ohlc_notify
+    AFTER INSERT OR UPDATE ON nifty50_ohlc
+    FOR EACH ROW EXECUTE FUNCTION notify_nifty50_ohlc_changed();
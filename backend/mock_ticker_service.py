@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for ticker_service's /history endpoint, for exercising
+backfill_nifty_history.py without the real service.
+
+Serves deterministic 1-minute NIFTY candles for every session in the NSE
+calendar (app/session_calendar.py) and can misbehave on purpose:
+
+  MOCK_RATE_LIMIT     requests/sec before answering 429 with Retry-After (0 = off)
+  MOCK_FAILURE_RATE   fraction of requests answered with 500 (default 0)
+  MOCK_LATENCY_MS     added delay per request (default 50)
+
+Run: python mock_ticker_service.py  (port 8080, same as TICKER_SERVICE_URL)
+"""
+import asyncio
+import hashlib
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from app.session_calendar import get_calendar
+
+RATE_LIMIT = float(os.getenv("MOCK_RATE_LIMIT", "5"))
+FAILURE_RATE = float(os.getenv("MOCK_FAILURE_RATE", "0"))
+LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "50"))
+
+app = FastAPI()
+
+_window_start = time.monotonic()
+_window_count = 0
+stats = {"requests": 0, "throttled": 0, "failed": 0}
+
+
+def _session_candles(day) -> list:
+    """Random-walk candles for one session, seeded by the date so every call agrees"""
+    bounds = get_calendar().session_bounds(day)
+    if bounds is None:
+        return []
+    open_dt, close_dt = bounds
+    seed = int(hashlib.md5(day.isoformat().encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    price = 24000 + (seed % 2000)
+    candles = []
+    current = open_dt
+    while current < close_dt:
+        o = price
+        c = o + rng.gauss(0, 6)
+        candles.append({
+            "date": current.isoformat() + "+05:30",
+            "open": round(o, 2),
+            "high": round(max(o, c) + rng.random() * 4, 2),
+            "low": round(min(o, c) - rng.random() * 4, 2),
+            "close": round(c, 2),
+            "volume": rng.randint(1000, 50000),
+        })
+        price = c
+        current += timedelta(minutes=1)
+    return candles
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", **stats}
+
+
+@app.get("/history")
+async def history(
+    instrument_token: int = Query(...),
+    from_ts: datetime = Query(...),
+    to_ts: datetime = Query(...),
+    interval: str = Query("minute"),
+):
+    global _window_start, _window_count
+    stats["requests"] += 1
+
+    now = time.monotonic()
+    if now - _window_start >= 1.0:
+        _window_start, _window_count = now, 0
+    _window_count += 1
+    if RATE_LIMIT and _window_count > RATE_LIMIT:
+        stats["throttled"] += 1
+        retry_after = max(0.1, 1.0 - (now - _window_start))
+        return JSONResponse({"error": "Too many requests"}, status_code=429,
+                            headers={"Retry-After": f"{retry_after:.2f}"})
+
+    await asyncio.sleep(LATENCY_MS / 1000)
+    if random.random() < FAILURE_RATE:
+        stats["failed"] += 1
+        return JSONResponse({"error": "Injected failure"}, status_code=500)
+
+    if interval != "minute":
+        return JSONResponse({"error": f"Unsupported interval: {interval}"}, status_code=400)
+
+    from_naive, to_naive = from_ts.replace(tzinfo=None), to_ts.replace(tzinfo=None)
+    candles = []
+    day = from_naive.date()
+    while day <= to_naive.date():
+        candles.extend(
+            c for c in _session_candles(day)
+            if from_naive <= datetime.fromisoformat(c["date"][:19]) <= to_naive
+        )
+        day += timedelta(days=1)
+    return {"instrument_token": instrument_token, "interval": interval, "candles": candles}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("MOCK_TICKER_PORT", "8080")))
@@ -5,6 +5,8 @@ import asyncio
 import asyncpg
 import os
 
+from app.aggregation import aggregate_upsert_sql
+
 async def create_3min_data():
     # Database configuration
     db_config = {
@@ -43,59 +45,13 @@ async def create_3min_data():
             return
         
         # Create 3-minute data using standard aggregation (no TimescaleDB dependency)
-        create_query = """
-            INSERT INTO ml_labeled_data (
-                symbol,
-                timeframe,
-                time,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                created_at
-            )
-            WITH grouped_data AS (
-                SELECT 
-                    symbol,
-                    -- Group into 3-minute buckets
-                    timestamp 'epoch' + interval '1 second' * (EXTRACT(EPOCH FROM time)::integer / 180 * 180) as bucket_time,
-                    time,
-                    open,
-                    high,
-                    low,
-                    close,
-                    volume,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, EXTRACT(EPOCH FROM time)::integer / 180 ORDER BY time) as rn_first,
-                    ROW_NUMBER() OVER (PARTITION BY symbol, EXTRACT(EPOCH FROM time)::integer / 180 ORDER BY time DESC) as rn_last
-                FROM ml_labeled_data
-                WHERE 
-                    symbol = 'NIFTY'
-                    AND timeframe = '1min'
-                    AND time >= to_timestamp(1729500000)
-                    AND time < to_timestamp(1729540000)
-                    AND open IS NOT NULL
-                    AND high IS NOT NULL
-                    AND low IS NOT NULL
-                    AND close IS NOT NULL
-            )
-            SELECT 
-                symbol,
-                '3min' as timeframe,
-                bucket_time as time,
-                MAX(CASE WHEN rn_first = 1 THEN open END) as open,
-                MAX(high) as high,
-                MIN(low) as low,
-                MAX(CASE WHEN rn_last = 1 THEN close END) as close,
-                SUM(volume) as volume,
-                NOW() as created_at
-            FROM grouped_data
-            GROUP BY symbol, bucket_time
-            ORDER BY bucket_time
-            ON CONFLICT (symbol, timeframe, time) DO NOTHING
-        """
+        create_query = aggregate_upsert_sql(
+            '3min', 3, source='1min', mode="window",
+            range_sql="time >= to_timestamp($2) AND time < to_timestamp($3)",
+            derived=False, on_conflict="nothing",
+        )
         
-        result = await conn.execute(create_query)
+        result = await conn.execute(create_query, 'NIFTY', 1729500000, 1729540000)
         print(f"Created 3-minute data: {result}")
         
         # Verify the results
@@ -0,0 +1,154 @@
+"""
+Shared fixtures.
+
+Database tests run against the server named by the DB_* settings (the CI
+service container) inside a throwaway schema, and are skipped when it cannot
+be reached. ml_labeled_data and nifty50_ohlc are created here; the tables
+the code owns come from the backend/create_*.sql files.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import asyncpg
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "..", "frontend"))
+
+from app.config import get_settings  # noqa: E402
+
+SCHEMA_SQL = """
+    CREATE TABLE nifty50_ohlc (
+        time       TIMESTAMP PRIMARY KEY,
+        open       DOUBLE PRECISION,
+        high       DOUBLE PRECISION,
+        low        DOUBLE PRECISION,
+        close      DOUBLE PRECISION,
+        volume     BIGINT,
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+
+    CREATE TABLE ml_labeled_data (
+        id                  BIGSERIAL,
+        symbol              TEXT NOT NULL,
+        timeframe           TEXT NOT NULL,
+        time                TIMESTAMP NOT NULL,
+        open                DOUBLE PRECISION,
+        high                DOUBLE PRECISION,
+        low                 DOUBLE PRECISION,
+        close               DOUBLE PRECISION,
+        volume              BIGINT,
+        price_change_pct    NUMERIC,
+        body_size_pct       NUMERIC,
+        close_position      NUMERIC,
+        label               TEXT,
+        label_confidence    DOUBLE PRECISION,
+        labeling_version    TEXT,
+        labeling_rules_used TEXT[],
+        created_at          TIMESTAMPTZ DEFAULT NOW(),
+        updated_at          TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (symbol, timeframe, time)
+    );
+"""
+
+# TimescaleDB's first()/last() for servers without the extension
+FIRST_LAST_SQL = """
+    CREATE TYPE first_last_state AS (value DOUBLE PRECISION, at TIMESTAMP);
+
+    CREATE FUNCTION first_step(s first_last_state, v DOUBLE PRECISION, t TIMESTAMP)
+    RETURNS first_last_state LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE WHEN s IS NULL OR t < (s).at THEN ROW(v, t)::first_last_state ELSE s END
+    $$;
+
+    CREATE FUNCTION last_step(s first_last_state, v DOUBLE PRECISION, t TIMESTAMP)
+    RETURNS first_last_state LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE WHEN s IS NULL OR t >= (s).at THEN ROW(v, t)::first_last_state ELSE s END
+    $$;
+
+    CREATE FUNCTION first_last_value(s first_last_state)
+    RETURNS DOUBLE PRECISION LANGUAGE sql IMMUTABLE AS $$ SELECT (s).value $$;
+
+    CREATE AGGREGATE first(DOUBLE PRECISION, TIMESTAMP) (
+        SFUNC = first_step, STYPE = first_last_state, FINALFUNC = first_last_value
+    );
+
+    CREATE AGGREGATE last(DOUBLE PRECISION, TIMESTAMP) (
+        SFUNC = last_step, STYPE = first_last_state, FINALFUNC = first_last_value
+    );
+"""
+
+# Applied in this order on top of SCHEMA_SQL
+SQL_FILES = [
+    "create_label_source.sql",
+    "create_aggregation_watermarks.sql",
+    "create_aggregation_dirty_ranges.sql",
+    "create_daily_pivots.sql",
+]
+
+
+def _dsn(**server_settings) -> str:
+    s = get_settings()
+    query = "&".join(f"{k}={quote(v)}" for k, v in
+                     {"host": s.db_host, "port": str(s.db_port), **server_settings}.items())
+    return f"postgresql://{quote(s.db_user)}:{quote(s.db_password)}@/{quote(s.db_name)}?{query}"
+
+
+async def _ping() -> None:
+    conn = await asyncpg.connect(_dsn(), timeout=5)
+    await conn.close()
+
+
+async def _create_schema(schema: str) -> None:
+    conn = await asyncpg.connect(_dsn(search_path=f"{schema},public"))
+    try:
+        await conn.execute(f"CREATE SCHEMA {schema}")
+        await conn.execute(SCHEMA_SQL)
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS timescaledb SCHEMA public")
+        except asyncpg.PostgresError:
+            await conn.execute(FIRST_LAST_SQL)
+        for name in SQL_FILES:
+            with open(os.path.join(BACKEND_DIR, name)) as f:
+                await conn.execute(f.read())
+    finally:
+        await conn.close()
+
+
+async def _drop_schema(schema: str) -> None:
+    conn = await asyncpg.connect(_dsn())
+    try:
+        await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+    finally:
+        await conn.close()
+
+
+@pytest.fixture
+def db_dsn():
+    """DSN of a fresh schema holding the tables above; the session clock is IST like production."""
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    try:
+        asyncio.run(_ping())
+    except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+        pytest.skip(f"database unavailable: {e}")
+    asyncio.run(_create_schema(schema))
+    yield _dsn(search_path=f"{schema},public", timezone="Asia/Kolkata")
+    asyncio.run(_drop_schema(schema))
+
+
+async def seed_session(conn: asyncpg.Connection, day: datetime, minutes: int = 375, base: float = 24000.0) -> None:
+    """One session of deterministic 1min bars in nifty50_ohlc, starting 09:15 IST on `day`."""
+    start = day.replace(hour=9, minute=15, second=0, microsecond=0)
+    rows = []
+    for i in range(minutes):
+        o = base + (i * 7919 % 61) - 30
+        c = o + (i * 104729 % 21) - 10
+        rows.append((start + timedelta(minutes=i), o, max(o, c) + 3, min(o, c) - 3, c, 1000 + i))
+    await conn.executemany(
+        "INSERT INTO nifty50_ohlc (time, open, high, low, close, volume) VALUES ($1, $2, $3, $4, $5, $6)",
+        rows,
+    )
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import asyncpg
+import pytest
+
+from app.bulk_load import bulk_upsert
+
+T0 = datetime(2025, 11, 3, 9, 15)
+COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+
+def _row(minute: int, close: float):
+    return (T0 + timedelta(minutes=minute), close, close, close, close, 1)
+
+
+async def _closes(conn: asyncpg.Connection):
+    return [r["close"] for r in await conn.fetch("SELECT close FROM nifty50_ohlc ORDER BY time")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("reuse_stage", [False, True])
+async def test_last_duplicate_in_a_load_wins(db_dsn, reuse_stage):
+    conn = await asyncpg.connect(db_dsn)
+    try:
+        rows = [_row(0, 1.0), _row(1, 10.0), _row(0, 2.0), _row(0, 3.0), _row(1, 11.0)]
+        result = await bulk_upsert(conn, "nifty50_ohlc", COLUMNS, rows, ["time"],
+                                   on_conflict="update", reuse_stage=reuse_stage)
+        assert (result.rows, result.written) == (5, 2)
+        assert await _closes(conn) == [3.0, 11.0]
+
+        # A second load through the same (possibly kept) stage starts empty
+        await bulk_upsert(conn, "nifty50_ohlc", COLUMNS, [_row(1, 12.0), _row(1, 13.0)], ["time"],
+                          on_conflict="update", reuse_stage=reuse_stage)
+        assert await _closes(conn) == [3.0, 13.0]
+    finally:
+        await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_on_conflict_nothing_keeps_existing_rows(db_dsn):
+    conn = await asyncpg.connect(db_dsn)
+    try:
+        await bulk_upsert(conn, "nifty50_ohlc", COLUMNS, [_row(0, 1.0)], ["time"])
+        result = await bulk_upsert(conn, "nifty50_ohlc", COLUMNS, [_row(0, 5.0), _row(2, 7.0)], ["time"])
+        assert result.written == 1
+        assert await _closes(conn) == [1.0, 7.0]
+    finally:
+        await conn.close()
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import asyncpg
+import pytest
+
+from conftest import seed_session
+from data_transformation_pipeline import TIMEFRAMES, DataTransformationPipeline
+
+# Monday, Tuesday, (Wednesday holiday), Thursday and a partly loaded Friday
+SESSIONS = [(datetime(2025, 11, 3), 375), (datetime(2025, 11, 4), 375),
+            (datetime(2025, 11, 6), 375), (datetime(2025, 11, 7), 190)]
+
+
+@pytest.mark.asyncio
+async def test_cascade_matches_direct_aggregation(db_dsn):
+    conn = await asyncpg.connect(db_dsn)
+    pipeline = DataTransformationPipeline(db_dsn, max_parallel=4)
+    await pipeline.connect()
+    try:
+        for i, (day, minutes) in enumerate(SESSIONS):
+            await seed_session(conn, day, minutes, base=24000.0 + 100 * i)
+        start, end = SESSIONS[0][0], SESSIONS[-1][0].replace(hour=23, minute=59, second=59)
+        await pipeline.process_historical_data_range(start, end)
+
+        results = await pipeline.verify_cascade(start, end)
+        cascaded = {tf.name for tf in TIMEFRAMES if tf.source != "1min"}
+        assert set(results) == cascaded
+        for name, result in results.items():
+            assert result["expected"] > 0, name
+            assert (result["missing"], result["extra"], result["mismatched"]) == (0, 0, 0), (name, result)
+        assert results["1day"]["expected"] == len(SESSIONS)
+    finally:
+        await pipeline.close()
+        await conn.close()
@@ -0,0 +1,70 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.routes import indicators
+from app.routes.indicators import _day_time, get_cpr_data
+
+# 2025-11-05 is an NSE holiday
+BAR_DAYS = [date(2025, 10, 31), date(2025, 11, 3), date(2025, 11, 4), date(2025, 11, 6), date(2025, 11, 7)]
+FROM_TS, TO_TS = _day_time(date(2025, 11, 3)), _day_time(date(2025, 11, 7)) + 86399
+
+
+class FakeDataManager:
+    def __init__(self, pivot_days, bar_days=BAR_DAYS):
+        self.pivot_days = pivot_days
+        self.bar_days = bar_days
+
+    async def get_daily_pivots(self, symbol, from_ts, to_ts):
+        return [{"time": _day_time(d), "pivot": 1.0, "bc": 1.0, "tc": 1.0, "r1": 1.0, "r2": 1.0, "r3": 1.0,
+                 "s1": 1.0, "s2": 1.0, "s3": 1.0, "prev_high": 1.0, "prev_close": 1.0}
+                for d in self.pivot_days]
+
+    async def get_history(self, symbol, from_ts, to_ts, resolution):
+        t = [_day_time(d) for d in self.bar_days if from_ts <= _day_time(d) <= to_ts]
+        base = [24000.0 + 10 * i for i in range(len(t))]
+        return {"s": "ok", "t": t, "o": base, "h": [b + 50 for b in base], "l": [b - 50 for b in base],
+                "c": [b + 5 for b in base], "v": [0] * len(t)}
+
+
+class FakeCache:
+    settings = SimpleNamespace(cache_ttl_5m=300)
+
+    def __init__(self):
+        self.store = {}
+
+    def get_cache_key(self, prefix, **kwargs):
+        return ":".join([prefix] + [f"{k}:{v}" for k, v in sorted(kwargs.items())])
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ttl):
+        self.store[key] = value
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FakeCache()
+    monkeypatch.setattr(indicators, "_cache_manager", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_partial_daily_pivots_are_filled_from_bars(cache):
+    points = await get_cpr_data(FakeDataManager([date(2025, 11, 3)]), "NIFTY", FROM_TS, TO_TS, "5")
+
+    assert [p.time for p in points] == [_day_time(d) for d in BAR_DAYS[1:]]
+    assert points[0].pivot == 1.0          # materialized row wins where present
+    assert points[1].pivot != 1.0          # computed from the 11-03 bar
+    assert len(cache.store) == 1
+
+
+@pytest.mark.asyncio
+async def test_incomplete_response_is_not_cached(cache):
+    dm = FakeDataManager([date(2025, 11, 3)], bar_days=BAR_DAYS[:3])
+    points = await get_cpr_data(dm, "NIFTY", FROM_TS, TO_TS, "5")
+
+    assert [p.time for p in points] == [_day_time(date(2025, 11, 3)), _day_time(date(2025, 11, 4))]
+    assert cache.store == {}
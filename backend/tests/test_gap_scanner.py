@@ -0,0 +1,44 @@
+from datetime import date, datetime
+
+import asyncpg
+import pytest
+
+from app.gap_scanner import scan_gaps, summarize
+from conftest import seed_session
+
+DAY = datetime(2025, 11, 3)
+
+
+@pytest.mark.asyncio
+async def test_missing_minutes_are_grouped_into_runs(db_dsn):
+    conn = await asyncpg.connect(db_dsn)
+    try:
+        await seed_session(conn, DAY)
+        missing = [DAY.replace(hour=9, minute=15),                                  # session open
+                   *(DAY.replace(hour=10, minute=m) for m in (0, 1, 2)),            # one three-minute run
+                   DAY.replace(hour=11, minute=30),                                 # isolated minute
+                   DAY.replace(hour=15, minute=28), DAY.replace(hour=15, minute=29)]  # run up to the close
+        await conn.execute("DELETE FROM nifty50_ohlc WHERE time = ANY($1::timestamp[])", missing)
+
+        gaps = await scan_gaps(conn, "NIFTY", date(2025, 11, 3), date(2025, 11, 3), source="nifty50_ohlc")
+        assert [(g.start.strftime("%H:%M"), g.end.strftime("%H:%M"), g.minutes) for g in gaps] == [
+            ("09:15", "09:15", 1), ("10:00", "10:02", 3), ("11:30", "11:30", 1), ("15:28", "15:29", 2),
+        ]
+
+        summary = summarize(gaps, date(2025, 11, 3), date(2025, 11, 3))
+        assert (summary["expected_minutes"], summary["missing_minutes"], summary["gaps"]) == (375, 7, 4)
+    finally:
+        await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_days_without_a_session_are_not_gaps(db_dsn):
+    conn = await asyncpg.connect(db_dsn)
+    try:
+        await seed_session(conn, DAY)
+        await seed_session(conn, datetime(2025, 11, 6))
+        gaps = await scan_gaps(conn, "NIFTY", date(2025, 11, 3), date(2025, 11, 9), source="nifty50_ohlc")
+        # 11-04 and 11-07 are trading days with no rows; the holiday and the weekend are not
+        assert [(g.start.date(), g.minutes) for g in gaps] == [(date(2025, 11, 4), 375), (date(2025, 11, 7), 375)]
+    finally:
+        await conn.close()
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.indicator_cache import IndicatorCheckpoints
+from app.indicator_engine import INDICATORS
+from app.live_bars import bar_epoch
+
+# 1min chunks are four days long; 2025-11-20 (Thu) starts one that ends on the Sunday
+SESSIONS = [datetime(2025, 11, d) for d in (19, 20, 21, 24, 25)]
+BARS = [bar_epoch(day.replace(hour=9, minute=15) + timedelta(minutes=i)) for day in SESSIONS for i in range(375)]
+
+
+class FakeCache:
+    settings = SimpleNamespace(cache_ttl_1d=86400)
+
+    def __init__(self):
+        self.store = {}
+
+    def get_cache_key(self, prefix, **kwargs):
+        return ":".join([prefix] + [f"{k}:{v}" for k, v in sorted(kwargs.items())])
+
+    def get_hash_key(self, data):
+        return str(abs(hash(data)))
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ttl):
+        self.store[key] = value
+
+
+class FakeDataManager:
+    def __init__(self):
+        self.calls = []
+
+    async def get_history(self, symbol, from_ts, to_ts, resolution, limit=None):
+        self.calls.append((from_ts, to_ts))
+        t = [x for x in BARS if from_ts <= x <= to_ts]
+        c = [24000.0 + (i % 37) for i in range(len(t))]
+        return {"s": "ok", "t": t, "o": c, "h": [x + 5 for x in c], "l": [x - 5 for x in c], "c": c,
+                "v": [1000] * len(t)}
+
+
+@pytest.mark.asyncio
+async def test_window_starting_after_the_last_session_of_a_chunk_is_served_from_cache():
+    checkpoints = IndicatorCheckpoints(FakeCache())
+    dm = FakeDataManager()
+    spec = INDICATORS["ema"]
+    params = spec.parse_params({})
+    from_ts = bar_epoch(datetime(2025, 11, 21, 16, 0))
+    to_ts = BARS[-1]
+
+    first = await checkpoints.series(dm, spec, params, "NIFTY", "1", from_ts, to_ts, 100000)
+    second = await checkpoints.series(dm, spec, params, "NIFTY", "1", from_ts, to_ts, 100000)
+
+    assert first["t"][0] == bar_epoch(datetime(2025, 11, 24, 9, 15))
+    assert second == first
+    assert len(dm.calls) == 1
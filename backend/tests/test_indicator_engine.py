@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.indicator_engine import INDICATORS, Bars, compute, init_state, step_bars
+from app.live_bars import bar_epoch
+
+SESSIONS = [datetime(2025, 11, 3), datetime(2025, 11, 4), datetime(2025, 11, 6)]
+
+
+def _bars(minutes: int = 5) -> Bars:
+    """Three sessions of deterministic bars on the NSE grid (09:15-15:30 IST)."""
+    t = [bar_epoch(day.replace(hour=9, minute=15) + timedelta(minutes=minutes * i))
+         for day in SESSIONS for i in range(375 // minutes)]
+    rng = np.random.default_rng(33)
+    c = 24000 + np.cumsum(rng.normal(0, 8, len(t)))
+    o = np.r_[c[0], c[:-1]]
+    h = np.maximum(o, c) + rng.uniform(0, 5, len(t))
+    l = np.minimum(o, c) - rng.uniform(0, 5, len(t))
+    v = rng.integers(1_000, 50_000, len(t)).astype(np.float64)
+    return Bars(np.asarray(t, dtype=np.int64), o, h, l, c, v)
+
+
+# Split points: mid-session, right at a session boundary, and one bar before the end
+@pytest.mark.parametrize("split", [40, 75, 224])
+@pytest.mark.parametrize("indicator_id", sorted(INDICATORS))
+def test_streaming_matches_vectorized(indicator_id, split):
+    bars = _bars()
+    params = INDICATORS[indicator_id].parse_params({})
+    expected = compute(indicator_id, bars)
+
+    state = init_state(indicator_id, bars.slice(0, split), params)
+    streamed = step_bars(indicator_id, state, bars.slice(split), params)
+
+    for name, values in expected.items():
+        np.testing.assert_allclose(streamed[name], values[split:], rtol=1e-9, atol=1e-9, equal_nan=True,
+                                   err_msg=f"{indicator_id}.{name}")
+
+
+def test_uncommitted_step_leaves_state_alone():
+    bars = _bars()
+    params = INDICATORS["ema"].parse_params({})
+    state = init_state("ema", bars.slice(0, 100), params)
+    before = dict(state)
+    step_bars("ema", state, bars.slice(100, 101), params, commit=False)
+    assert state == before
@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import asyncpg
+import pytest
+
+from app.config import get_settings
+from app.database import DataManager
+from app.label_propagation import PropagationRules, propagate_range
+from app.live_bars import bar_epoch
+from app.streaming import set_label_events
+from conftest import seed_session
+from data_transformation_pipeline import DataTransformationPipeline
+
+DAY = datetime(2025, 11, 3)
+
+
+async def _run_pipeline(dsn: str) -> None:
+    pipeline = DataTransformationPipeline(dsn, max_parallel=2)
+    await pipeline.connect()
+    try:
+        await pipeline.process_historical_data_range(DAY, DAY.replace(hour=23, minute=59, second=59))
+    finally:
+        await pipeline.close()
+
+
+async def _labels(conn: asyncpg.Connection, timeframe: str, start: datetime, end: datetime):
+    return await conn.fetch("""
+        SELECT time, label, label_source, labeling_version
+        FROM ml_labeled_data
+        WHERE symbol = 'NIFTY' AND timeframe = $1 AND time >= $2 AND time < $3
+        ORDER BY time
+    """, timeframe, start, end)
+
+
+@pytest.fixture
+def up_last(monkeypatch):
+    # One 5min label is a minority of its 15min bar; 'last' carries it up regardless
+    monkeypatch.setenv("LABEL_PROPAGATION_UP", "last")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+class RecordingHub:
+    def __init__(self):
+        self.messages = []
+
+    async def publish(self, message):
+        self.messages.append(message)
+
+    def events(self, action: str):
+        return {(m["timeframe"], m["time"]) for m in self.messages if m["type"] == f"label.{action}"}
+
+
+@pytest.fixture
+def label_events():
+    hub = RecordingHub()
+    set_label_events(hub)
+    yield hub
+    set_label_events(None)
+
+
+@pytest.mark.asyncio
+async def test_label_reaches_pipeline_bars(db_dsn, up_last, label_events):
+    pool = await asyncpg.create_pool(db_dsn, min_size=1, max_size=2)
+    try:
+        async with pool.acquire() as conn:
+            await seed_session(conn, DAY)
+        await _run_pipeline(db_dsn)
+
+        labelled = DAY.replace(hour=10)
+        assert await DataManager(pool).set_bar_label("NIFTY", "5", bar_epoch(labelled), "Bullish", 1.0)
+
+        async with pool.acquire() as conn:
+            minutes = await _labels(conn, "1min", labelled, labelled.replace(minute=5))
+            quarter = await _labels(conn, "15min", labelled, labelled.replace(minute=15))
+            source = await _labels(conn, "5min", labelled, labelled.replace(minute=1))
+
+        assert source[0]["label_source"] == "user"
+        assert len(minutes) == 5
+        # Bars written by the pipeline carry its labeling_version and still take the label
+        for row in minutes + quarter:
+            assert row["labeling_version"] == "4"
+            assert (row["label"], row["label_source"]) == ("Bullish", "propagated")
+
+        # Every row that took the label is announced, not just the one that was clicked
+        propagated = {(tf, bar_epoch(row["time"])) for tf, rows in (("1min", minutes), ("15min", quarter))
+                      for row in rows}
+        assert propagated <= label_events.events("created")
+        assert ("5min", bar_epoch(labelled)) in label_events.events("created")
+
+        # Re-aggregation must not turn propagated labels into source labels
+        await _run_pipeline(db_dsn)
+        assert await DataManager(pool).delete_bar_label("NIFTY", "5", bar_epoch(labelled))
+        async with pool.acquire() as conn:
+            remaining = await conn.fetchval(
+                "SELECT COUNT(*) FROM ml_labeled_data WHERE label IS NOT NULL AND time::date = $1", DAY.date()
+            )
+        assert remaining == 0
+        assert propagated <= label_events.events("deleted")
+
+        # Nothing left to delete: no change reported, no events
+        published = len(label_events.messages)
+        assert not await DataManager(pool).delete_bar_label("NIFTY", "5", bar_epoch(labelled))
+        assert len(label_events.messages) == published
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_majority_counts_unlabelled_source_bars(db_dsn):
+    rules = PropagationRules(timeframes=["5min", "15min"], down=False, up="majority")
+    bar = DAY.replace(hour=10)
+    conn = await asyncpg.connect(db_dsn)
+    try:
+        await seed_session(conn, DAY)
+        await _run_pipeline(db_dsn)
+
+        async def label(minute: int) -> None:
+            await conn.execute("""
+                UPDATE ml_labeled_data SET label = 'Bearish', label_confidence = 1.0, label_source = 'user'
+                WHERE symbol = 'NIFTY' AND timeframe = '5min' AND time = $1
+            """, bar.replace(minute=minute))
+            await propagate_range(conn, "NIFTY", bar, bar, rules)
+
+        await label(0)
+        assert (await _labels(conn, "15min", bar, bar.replace(minute=1)))[0]["label"] is None
+
+        await label(5)
+        row = (await _labels(conn, "15min", bar, bar.replace(minute=1)))[0]
+        assert (row["label"], row["label_source"]) == ("Bearish", "propagated")
+    finally:
+        await conn.close()
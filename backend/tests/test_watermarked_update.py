@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import asyncpg
+import pytest
+
+from conftest import seed_session
+from data_transformation_pipeline import DataTransformationPipeline
+
+DAY = datetime(2025, 11, 3)
+
+
+@pytest.mark.asyncio
+async def test_late_row_behind_watermark_is_reaggregated(db_dsn):
+    conn = await asyncpg.connect(db_dsn)
+    pipeline = DataTransformationPipeline(db_dsn, max_parallel=2)
+    pipeline.late_row_settle = timedelta(0)
+    await pipeline.connect()
+    try:
+        await seed_session(conn, DAY)
+        await pipeline.process_historical_data_range(DAY, DAY.replace(hour=23, minute=59, second=59))
+        await pipeline.process_watermarked_update()   # creates the watermarks
+        await pipeline.process_watermarked_update()   # starts the late-row cursor
+        assert (await pipeline.get_watermarks())["1min"] == DAY.replace(hour=15, minute=29)
+
+        # A correction to a bar whose 1min, 5min and 15min buckets closed long ago
+        late = DAY.replace(hour=10, minute=2)
+        await conn.execute("UPDATE nifty50_ohlc SET high = 30000, updated_at = NOW() WHERE time = $1", late)
+        await pipeline.process_watermarked_update()
+
+        highs = dict(await conn.fetch("""
+            SELECT timeframe, high FROM ml_labeled_data
+            WHERE symbol = 'NIFTY'
+              AND timeframe IN ('1min', '5min', '15min', '1day')
+              AND time = CASE timeframe WHEN '1min' THEN $1::timestamp WHEN '1day' THEN $3 ELSE $2 END
+        """, late, DAY.replace(hour=10), DAY))
+        assert highs == {"1min": 30000, "5min": 30000, "15min": 30000, "1day": 30000}
+        assert await conn.fetchval("SELECT COUNT(*) FROM aggregation_dirty_ranges WHERE status = 'done'") == 1
+    finally:
+        await pipeline.close()
+        await conn.close()
@@ -11,9 +11,17 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Tuple
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import sys
 import os
+import time
+
+# Shared aggregation SQL lives with the backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from app.aggregation import aggregate_select_sql, aggregate_upsert_sql  # noqa: E402
+from app.cache_invalidation import invalidate_ranges  # noqa: E402
+from app.live_bars import bar_epoch  # noqa: E402
+from app.session_calendar import get_calendar  # noqa: E402
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -26,25 +34,55 @@ class TimeframeConfig:
     minutes: int
     batch_size: int  # Number of days to process in each batch
     is_active: bool = True
+    source: str = "1min"  # Finer timeframe this one is aggregated from
 
-# Define all supported timeframes with their configurations
+# Define all supported timeframes with their configurations.
+# Each level is built from the nearest finer level whose buckets nest inside its own,
+# so it scans a fraction of the rows; TIMEFRAMES order guarantees sources are built first.
 TIMEFRAMES = [
-    TimeframeConfig("1min", 1, 30),      # 30 days per batch
-    TimeframeConfig("2min", 2, 30),      # 30 days per batch
-    TimeframeConfig("3min", 3, 30),      # 30 days per batch
-    TimeframeConfig("5min", 5, 30),      # 30 days per batch
-    TimeframeConfig("15min", 15, 90),    # 90 days per batch
-    TimeframeConfig("30min", 30, 180),   # 180 days per batch
-    TimeframeConfig("1hour", 60, 365),   # 365 days per batch
-    TimeframeConfig("1day", 1440, 365),  # 365 days per batch
+    TimeframeConfig("1min", 1, 30),                    # 30 days per batch
+    TimeframeConfig("2min", 2, 30),                    # 30 days per batch
+    TimeframeConfig("3min", 3, 30),                    # 30 days per batch
+    TimeframeConfig("5min", 5, 30),                    # 30 days per batch
+    TimeframeConfig("15min", 15, 90, source="5min"),   # 90 days per batch
+    TimeframeConfig("30min", 30, 180, source="15min"), # 180 days per batch
+    TimeframeConfig("1hour", 60, 365, source="30min"), # 365 days per batch
+    TimeframeConfig("1day", 1440, 365, source="1hour"),# 365 days per batch
 ]
 
+# Work units the range rebuild runs at once (each holds one pool connection)
+DEFAULT_MAX_PARALLEL = int(os.getenv("PIPELINE_MAX_PARALLEL", "4"))
+# API cache to invalidate after repairs (indicator checkpoints, CPR, recent bars); unset disables it
+CACHE_REDIS_URL = os.getenv("REDIS_URL")
+POOL_MAX_SIZE = 20
+# Late-row checks only look at nifty50_ohlc rows updated at least this long ago,
+# so rows from transactions still in flight are caught by a later run
+LATE_ROW_SETTLE = timedelta(seconds=60)
+
+@dataclass
+class WorkUnit:
+    """One (timeframe, chunk of days) statement in a range rebuild"""
+    timeframe: TimeframeConfig
+    start: datetime
+    end: datetime
+    depends_on: List["WorkUnit"] = field(default_factory=list)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    ok: bool = False
+    records: int = 0
+    
+    @property
+    def label(self) -> str:
+        return f"{self.timeframe.name} {self.start.date()} - {self.end.date()}"
+
 class DataTransformationPipeline:
     """Main pipeline for data transformation"""
     
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, max_parallel: int = DEFAULT_MAX_PARALLEL):
         self.database_url = database_url
         self.pool: Optional[asyncpg.Pool] = None
+        self.max_parallel = max(1, min(max_parallel, POOL_MAX_SIZE))
+        self.redis_client = None
+        self.late_row_settle = LATE_ROW_SETTLE
         
     async def connect(self):
         """Initialize database connection pool"""
@@ -52,19 +90,24 @@ class DataTransformationPipeline:
             self.pool = await asyncpg.create_pool(
                 self.database_url,
                 min_size=5,
-                max_size=20,
+                max_size=POOL_MAX_SIZE,
                 command_timeout=300  # 5 minutes for large operations
             )
             logger.info("Database connection pool created")
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
+        if CACHE_REDIS_URL:
+            import redis.asyncio as redis
+            self.redis_client = redis.from_url(CACHE_REDIS_URL)
     
     async def close(self):
         """Close database connections"""
         if self.pool:
             await self.pool.close()
             logger.info("Database connections closed")
+        if self.redis_client:
+            await self.redis_client.close()
     
     async def get_data_range(self) -> Tuple[datetime, datetime]:
         """Get the full data range from nifty50_ohlc table"""
@@ -114,12 +157,20 @@ class DataTransformationPipeline:
         
         return boundaries
     
+    def get_range_chunks(self, start_date: datetime, end_date: datetime, days_per_chunk: int) -> List[Tuple[datetime, datetime]]:
+        """Group day boundaries into chunks of whole days (no bucket ever straddles a chunk edge)"""
+        days = self.get_day_boundaries(start_date, end_date)
+        return [
+            (days[i][0], days[min(i + days_per_chunk, len(days)) - 1][1])
+            for i in range(0, len(days), max(1, days_per_chunk))
+        ]
+    
     async def transform_timeframe_for_day(self, 
                                         conn: asyncpg.Connection,
                                         timeframe: TimeframeConfig, 
                                         day_start: datetime, 
                                         day_end: datetime) -> int:
-        """Transform data for a specific timeframe and day"""
+        """Transform data for a specific timeframe and day (or any range of whole days)"""
         
         if timeframe.name == "1min":
             # For 1min, copy directly from source with minimal transformation
@@ -190,68 +241,14 @@ class DataTransformationPipeline:
                                       timeframe: TimeframeConfig, 
                                       day_start: datetime, 
                                       day_end: datetime) -> int:
-        """Aggregate data for non-1min timeframes from ml_labeled_data"""
+        """Aggregate data for non-1min timeframes from their source timeframe in ml_labeled_data"""
         
-        # Calculate the interval for time_bucket
-        interval = f"{timeframe.minutes} minutes"
-        
-        upsert_sql = f"""
-            INSERT INTO ml_labeled_data (
-                symbol, timeframe, time, open, high, low, close, volume,
-                price_change_pct, body_size_pct, close_position,
-                created_at, updated_at, labeling_version
-            )
-            SELECT 
-                'NIFTY' as symbol,
-                '{timeframe.name}' as timeframe,
-                time_bucket(INTERVAL '{interval}', time) as bucket_time,
-                
-                -- OHLC aggregation
-                (array_agg(open ORDER BY time ASC))[1] as open,  -- First open
-                MAX(high) as high,
-                MIN(low) as low,
-                (array_agg(close ORDER BY time DESC))[1] as close, -- Last close
-                SUM(volume) as volume,
-                
-                -- Recalculate technical indicators for aggregated data
-                ROUND((((array_agg(close ORDER BY time DESC))[1] - (array_agg(open ORDER BY time ASC))[1]) / 
-                       NULLIF((array_agg(open ORDER BY time ASC))[1], 0) * 100)::numeric, 4) as price_change_pct,
-                ROUND((ABS((array_agg(close ORDER BY time DESC))[1] - (array_agg(open ORDER BY time ASC))[1]) / 
-                       NULLIF((MAX(high) - MIN(low)), 0) * 100)::numeric, 4) as body_size_pct,
-                ROUND((((array_agg(close ORDER BY time DESC))[1] - MIN(low)) / 
-                       NULLIF((MAX(high) - MIN(low)), 0))::numeric, 4) as close_position,
-                
-                NOW() as created_at,
-                NOW() as updated_at,
-                4 as labeling_version
-                
-            FROM ml_labeled_data
-            WHERE timeframe = '1min'
-              AND symbol = 'NIFTY'
-              AND time >= $1 AND time <= $2
-              AND open IS NOT NULL 
-              AND high IS NOT NULL 
-              AND low IS NOT NULL 
-              AND close IS NOT NULL
-            GROUP BY bucket_time
-            HAVING COUNT(*) > 0  -- Ensure we have data for aggregation
-            ORDER BY bucket_time
-            
-            ON CONFLICT (symbol, timeframe, time) 
-            DO UPDATE SET
-                open = EXCLUDED.open,
-                high = EXCLUDED.high,
-                low = EXCLUDED.low,
-                close = EXCLUDED.close,
-                volume = EXCLUDED.volume,
-                price_change_pct = EXCLUDED.price_change_pct,
-                body_size_pct = EXCLUDED.body_size_pct,
-                close_position = EXCLUDED.close_position,
-                updated_at = NOW(),
-                labeling_version = EXCLUDED.labeling_version
-        """
+        # One ordered first/last pass per bucket; derived columns computed once from the OHLC
+        upsert_sql = aggregate_upsert_sql(
+            timeframe.name, timeframe.minutes, source=timeframe.source, labeling_version=4
+        )
         
-        result = await conn.execute(upsert_sql, day_start, day_end)
+        result = await conn.execute(upsert_sql, "NIFTY", day_start, day_end)
         count = int(result.split()[-1])
         return count
     
@@ -295,6 +292,96 @@ class DataTransformationPipeline:
                             continue
             
             logger.info(f"Completed {timeframe.name}: {total_records} total records")
+            
+            if timeframe.name == "1day":
+                await self.refresh_daily_pivots(start_date, end_date)
+    
+    def plan_work_units(self, start_date: datetime, end_date: datetime) -> List[WorkUnit]:
+        """
+        Split a rebuild into (timeframe, chunk) units. Chunks are TimeframeConfig.batch_size days;
+        every unit depends on the units of its source timeframe whose chunks overlap its own,
+        so a cascaded level only starts once the rows it reads have been written.
+        """
+        units: List[WorkUnit] = []
+        by_timeframe: Dict[str, List[WorkUnit]] = {}
+        for timeframe in TIMEFRAMES:
+            if not timeframe.is_active:
+                continue
+            
+            sources = by_timeframe.get(timeframe.source, []) if timeframe.name != "1min" else []
+            tf_units = []
+            for chunk_start, chunk_end in self.get_range_chunks(start_date, end_date, timeframe.batch_size):
+                depends_on = [u for u in sources if u.start <= chunk_end and u.end >= chunk_start]
+                tf_units.append(WorkUnit(timeframe, chunk_start, chunk_end, depends_on))
+            by_timeframe[timeframe.name] = tf_units
+            units.extend(tf_units)
+        return units
+    
+    async def _run_work_unit(self, unit: WorkUnit, semaphore: asyncio.Semaphore):
+        """Wait for the unit's sources, then run it in its own transaction on a pooled connection"""
+        try:
+            # Wait outside the semaphore so blocked units never hold a connection slot
+            for dep in unit.depends_on:
+                await dep.done.wait()
+            failed = [dep.label for dep in unit.depends_on if not dep.ok]
+            if failed:
+                logger.error(f"Skipping {unit.label}: source units failed ({', '.join(failed)})")
+                return
+            
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with self.pool.acquire() as conn:
+                        async with conn.transaction():
+                            unit.records = await self.transform_timeframe_for_day(conn, unit.timeframe, unit.start, unit.end)
+                except Exception as e:
+                    logger.error(f"Failed to process {unit.label}: {e}")
+                    return
+                
+                unit.ok = True
+                elapsed = time.perf_counter() - started
+                logger.info(f"  {unit.label}: {unit.records} records in {elapsed:.1f}s "
+                            f"({unit.records / max(elapsed, 1e-6):,.0f} rows/s)")
+        finally:
+            unit.done.set()
+    
+    async def process_historical_data_range(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+        """
+        Rebuild all timeframes with one set-based statement per chunk of days instead of one per day.
+        Chunks are TimeframeConfig.batch_size days long and each commits in its own transaction,
+        so progress survives a failure and no single transaction spans the whole history.
+        Up to max_parallel chunks run at once across the pool; cascaded levels wait for their source.
+        """
+        logger.info("Starting range-mode historical transformation...")
+        
+        if not start_date or not end_date:
+            data_start, data_end = await self.get_data_range()
+            start_date = start_date or data_start
+            end_date = end_date or data_end
+        
+        units = self.plan_work_units(start_date, end_date)
+        logger.info(f"Processing data from {start_date} to {end_date}: "
+                    f"{len(units)} work units, up to {self.max_parallel} in parallel")
+        run_started = time.perf_counter()
+        
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        await asyncio.gather(*(self._run_work_unit(unit, semaphore) for unit in units))
+        
+        for timeframe in TIMEFRAMES:
+            tf_units = [u for u in units if u.timeframe is timeframe]
+            if not tf_units:
+                continue
+            failed = sum(1 for u in tf_units if not u.ok)
+            logger.info(f"Completed {timeframe.name}: {sum(u.records for u in tf_units)} total records"
+                        + (f", {failed}/{len(tf_units)} chunks failed" if failed else ""))
+        
+        if any(u.timeframe.name == "1day" and u.ok for u in units):
+            await self.refresh_daily_pivots(start_date, end_date)
+        
+        elapsed = time.perf_counter() - run_started
+        total = sum(u.records for u in units)
+        logger.info(f"Range-mode transformation finished in {elapsed:.1f}s "
+                    f"({total} records, {total / max(elapsed, 1e-6):,.0f} rows/s)")
     
     async def process_incremental_update(self, since_datetime: datetime):
         """Process incremental updates for new data since specified datetime"""
@@ -322,6 +409,295 @@ class DataTransformationPipeline:
                         total_records += count
             
             logger.info(f"Incremental update {timeframe.name}: {total_records} records")
+            
+            if timeframe.name == "1day":
+                await self.refresh_daily_pivots(since_datetime, end_time)
+    
+    @staticmethod
+    def _naive_utc(value: datetime) -> datetime:
+        """Drop tzinfo the way get_day_boundaries does (database expects naive timestamps)"""
+        if value.tzinfo is not None:
+            return datetime(*value.utctimetuple()[:6], value.microsecond)
+        return value
+    
+    @staticmethod
+    def bucket_start(value: datetime, minutes: int) -> datetime:
+        """Start of the session-aligned timeframe bucket containing value"""
+        return get_calendar().bucket_start(value, minutes)
+    
+    async def get_watermarks(self, symbol: str = "NIFTY") -> Dict[str, datetime]:
+        """Last aggregated source time per timeframe (see backend/create_aggregation_watermarks.sql)"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT timeframe, watermark FROM aggregation_watermarks WHERE symbol = $1", symbol
+            )
+        return {row['timeframe']: row['watermark'] for row in rows}
+    
+    async def _source_high(self, conn: asyncpg.Connection, timeframe: TimeframeConfig,
+                           since: datetime, symbol: str) -> Optional[datetime]:
+        """Newest source row at or after `since` for a timeframe"""
+        if timeframe.name == "1min":
+            value = await conn.fetchval("""
+                SELECT MAX(time) FROM nifty50_ohlc
+                WHERE time >= $1
+                  AND open IS NOT NULL AND high IS NOT NULL
+                  AND low IS NOT NULL AND close IS NOT NULL
+            """, since)
+        else:
+            value = await conn.fetchval("""
+                SELECT MAX(time) FROM ml_labeled_data
+                WHERE symbol = $1 AND timeframe = $2 AND time >= $3
+            """, symbol, timeframe.source, since)
+        return self._naive_utc(value) if value else None
+    
+    async def _initial_watermark(self, conn: asyncpg.Connection, timeframe: TimeframeConfig, symbol: str) -> datetime:
+        """Start point for a timeframe without a watermark: its latest bar, else the start of yesterday"""
+        last_bar = await conn.fetchval(
+            "SELECT MAX(time) FROM ml_labeled_data WHERE symbol = $1 AND timeframe = $2",
+            symbol, timeframe.name
+        )
+        if last_bar:
+            return self._naive_utc(last_bar)
+        today = self._naive_utc(datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=1)
+    
+    async def _queue_late_rows(self, symbol: str, before: datetime) -> int:
+        """
+        Queue 1min source rows written or rewritten since the last check that lie before
+        `before` (the 1min watermark), one aggregation_dirty_ranges entry per day, and move
+        the check cursor (aggregation_watermarks.source_updated_at) forward. The first call
+        only sets the cursor. Returns the number of ranges queued.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow("""
+                    SELECT source_updated_at, NOW() - $2::interval AS upto
+                    FROM aggregation_watermarks
+                    WHERE symbol = $1 AND timeframe = '1min'
+                    FOR UPDATE
+                """, symbol, self.late_row_settle)
+                if row is None:
+                    return 0
+                
+                ranges = []
+                if row['source_updated_at'] is not None:
+                    ranges = await conn.fetch("""
+                        SELECT MIN(time) AS range_start, MAX(time) AS range_end
+                        FROM nifty50_ohlc
+                        WHERE updated_at > $1 AND updated_at <= $2
+                          AND time < $3
+                          AND open IS NOT NULL AND high IS NOT NULL
+                          AND low IS NOT NULL AND close IS NOT NULL
+                        GROUP BY time::date
+                    """, row['source_updated_at'], row['upto'], before)
+                    await conn.executemany("""
+                        INSERT INTO aggregation_dirty_ranges (symbol, range_start, range_end, needs_backfill)
+                        VALUES ($1, $2, $3, FALSE)
+                    """, [(symbol, r['range_start'], r['range_end']) for r in ranges])
+                
+                await conn.execute("""
+                    UPDATE aggregation_watermarks SET source_updated_at = $2
+                    WHERE symbol = $1 AND timeframe = '1min'
+                """, symbol, row['upto'])
+        
+        if ranges:
+            logger.info(f"Queued {len(ranges)} range(s) of late 1min rows behind the watermark")
+        return len(ranges)
+    
+    async def process_watermarked_update(self, symbol: str = "NIFTY") -> Dict[str, int]:
+        """
+        Aggregate only what changed since the last run. For each timeframe (in cascade order)
+        re-aggregate from the bucket containing its watermark up to the newest source row,
+        then advance the watermark in the same transaction. A run normally rewrites the open
+        bar of each timeframe plus any bars that closed since; the open bucket is always
+        redone so in-place updates of the latest source rows are picked up.
+        
+        Source rows that land behind the 1min watermark (late ticks, corrections to bars
+        that already closed) are found by nifty50_ohlc.updated_at and repaired first
+        through the dirty-range queue (see _queue_late_rows and process_dirty_ranges).
+        """
+        watermarks = await self.get_watermarks(symbol)
+        if watermarks.get('1min'):
+            try:
+                if await self._queue_late_rows(symbol, watermarks['1min']):
+                    await self.process_dirty_ranges(symbol)
+            except (asyncpg.UndefinedColumnError, asyncpg.UndefinedTableError) as e:
+                logger.warning(f"Late 1min rows not tracked ({e}); apply backend/create_aggregation_watermarks.sql "
+                               "and backend/create_aggregation_dirty_ranges.sql")
+        written: Dict[str, int] = {}
+        daily_from: Optional[datetime] = None
+        daily_to: Optional[datetime] = None
+        
+        for timeframe in TIMEFRAMES:
+            if not timeframe.is_active:
+                continue
+            
+            try:
+                async with self.pool.acquire() as conn:
+                    watermark = watermarks.get(timeframe.name) or await self._initial_watermark(conn, timeframe, symbol)
+                    start = self.bucket_start(watermark, timeframe.minutes)
+                    high = await self._source_high(conn, timeframe, start, symbol)
+                    if high is None:
+                        continue
+                    
+                    async with conn.transaction():
+                        count = await self.transform_timeframe_for_day(conn, timeframe, start, high)
+                        await conn.execute("""
+                            INSERT INTO aggregation_watermarks (symbol, timeframe, watermark, rows_written, updated_at)
+                            VALUES ($1, $2, $3, $4, NOW())
+                            ON CONFLICT (symbol, timeframe) DO UPDATE SET
+                                watermark = EXCLUDED.watermark,
+                                rows_written = EXCLUDED.rows_written,
+                                updated_at = NOW()
+                        """, symbol, timeframe.name, high, count)
+            except Exception as e:
+                # Later levels still run; they re-read whatever their source level has
+                logger.error(f"Watermarked update failed for {timeframe.name}: {e}")
+                continue
+            
+            written[timeframe.name] = count
+            logger.debug(f"Watermarked update {timeframe.name}: {count} records from {start} to {high}")
+            if timeframe.name == "1day":
+                daily_from, daily_to = start, high
+        
+        if daily_from is not None:
+            await self.refresh_daily_pivots(daily_from, daily_to, symbol)
+        
+        logger.info("Watermarked update: " + ", ".join(f"{tf}={n}" for tf, n in written.items()))
+        return written
+    
+    async def process_dirty_ranges(self, symbol: str = "NIFTY", limit: int = 50, max_attempts: int = 3) -> int:
+        """
+        Drain repair ranges queued by the gap scanner (aggregation_dirty_ranges). Each range
+        is re-copied from nifty50_ohlc and only the buckets containing it are re-aggregated,
+        in cascade order. With needs_backfill the range's days are released from
+        backfill_checkpoints so the next backfill run refetches them (and queues them again).
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT id, range_start, range_end, needs_backfill
+                FROM aggregation_dirty_ranges
+                WHERE symbol = $1 AND status = 'pending'
+                ORDER BY range_start
+                LIMIT $2
+            """, symbol, limit)
+        
+        repaired = 0
+        for row in rows:
+            start, end = row['range_start'], row['range_end']
+            try:
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        for timeframe in TIMEFRAMES:
+                            if not timeframe.is_active:
+                                continue
+                            bucket_from = self.bucket_start(start, timeframe.minutes)
+                            bucket_to = self.bucket_start(end, timeframe.minutes) + timedelta(minutes=timeframe.minutes, microseconds=-1)
+                            await self.transform_timeframe_for_day(conn, timeframe, bucket_from, bucket_to)
+                        
+                        if row['needs_backfill'] and await conn.fetchval("SELECT to_regclass('backfill_checkpoints') IS NOT NULL"):
+                            await conn.execute("""
+                                DELETE FROM backfill_checkpoints
+                                WHERE symbol = $1 AND timeframe = '1min'
+                                  AND trade_date BETWEEN $2 AND $3
+                            """, symbol, start.date(), end.date())
+                        
+                        await conn.execute("""
+                            UPDATE aggregation_dirty_ranges
+                            SET status = 'done', attempts = attempts + 1, error = NULL, processed_at = NOW()
+                            WHERE id = $1
+                        """, row['id'])
+            except Exception as e:
+                logger.error(f"Repair of {start} - {end} failed: {e}")
+                async with self.pool.acquire() as conn:
+                    await conn.execute("""
+                        UPDATE aggregation_dirty_ranges
+                        SET attempts = attempts + 1,
+                            error = $2,
+                            status = CASE WHEN attempts + 1 >= $3 THEN 'failed' ELSE 'pending' END,
+                            processed_at = NOW()
+                        WHERE id = $1
+                    """, row['id'], str(e)[:500], max_attempts)
+                continue
+            
+            repaired += 1
+            await self.refresh_daily_pivots(start, end, symbol)
+            await self.invalidate_cache(start, end, symbol)
+            logger.info(f"Repaired {start} - {end}")
+        
+        return repaired
+    
+    async def invalidate_cache(self, start: datetime, end: datetime, symbol: str = "NIFTY"):
+        """Drop API cache entries (indicator checkpoints/chunks, CPR, recent bars) covering a rewritten range"""
+        if self.redis_client is None:
+            return
+        try:
+            await invalidate_ranges(self.redis_client, {symbol}, [(bar_epoch(start), bar_epoch(end) + 1)])
+        except Exception as e:
+            logger.error(f"Cache invalidation for {start} - {end} failed: {e}")
+    
+    async def refresh_daily_pivots(self, start_date: datetime, end_date: datetime, symbol: str = "NIFTY") -> int:
+        """
+        Recompute the materialized daily_pivots rows (CPR, Camarilla, Fibonacci) for trade
+        dates in the range, plus the projected next session. Runs right after 1day bars are
+        aggregated; see backend/create_daily_pivots.sql for the set-based refresh function.
+        """
+        try:
+            async with self.pool.acquire() as conn:
+                count = await conn.fetchval(
+                    "SELECT refresh_daily_pivots($1, $2::date, $3::date)",
+                    symbol, start_date.date(), end_date.date()
+                )
+            logger.info(f"Daily pivots refreshed: {count} trading days ({start_date.date()} to {end_date.date()})")
+            return count or 0
+        except Exception as e:
+            logger.error(f"Failed to refresh daily pivots: {e}")
+            return 0
+    
+    async def verify_cascade(self, start_date: datetime, end_date: datetime) -> Dict[str, Dict]:
+        """
+        Compare every cascaded timeframe with a direct aggregation of 1min rows over the range.
+        Returns per timeframe: buckets missing from the table, extra buckets, and buckets whose
+        OHLCV differs. All zeros means the cascade is equivalent to building from 1min.
+        """
+        days = self.get_day_boundaries(start_date, end_date)
+        if not days:
+            return {}
+        range_start, range_end = days[0][0], days[-1][1]
+        results = {}
+        
+        async with self.pool.acquire() as conn:
+            for timeframe in TIMEFRAMES:
+                if timeframe.name == "1min" or timeframe.source == "1min":
+                    continue
+                
+                verify_sql = f"""
+                    WITH direct AS ({aggregate_select_sql("1min", timeframe.minutes)}),
+                    stored AS (
+                        SELECT time AS bucket_time, open, high, low, close, volume
+                        FROM ml_labeled_data
+                        WHERE timeframe = '{timeframe.name}'
+                          AND symbol = $1
+                          AND time >= $2 AND time <= $3
+                          AND open IS NOT NULL AND high IS NOT NULL
+                          AND low IS NOT NULL AND close IS NOT NULL
+                    )
+                    SELECT
+                        COUNT(*) FILTER (WHERE s.bucket_time IS NULL) AS missing,
+                        COUNT(*) FILTER (WHERE d.bucket_time IS NULL) AS extra,
+                        COUNT(*) FILTER (
+                            WHERE d.bucket_time IS NOT NULL AND s.bucket_time IS NOT NULL
+                              AND (d.open, d.high, d.low, d.close, d.volume)
+                                  IS DISTINCT FROM (s.open, s.high, s.low, s.close, s.volume)
+                        ) AS mismatched,
+                        COUNT(d.bucket_time) AS expected
+                    FROM direct d
+                    FULL OUTER JOIN stored s ON s.bucket_time = d.bucket_time
+                """
+                row = await conn.fetchrow(verify_sql, "NIFTY", range_start, range_end)
+                results[timeframe.name] = {"source": timeframe.source, **dict(row)}
+        
+        return results
     
     async def get_transformation_stats(self) -> Dict:
         """Get statistics about the transformation"""
@@ -402,10 +778,46 @@ async def main():
                 since = datetime.now(timezone.utc) - timedelta(days=1)
                 await pipeline.process_incremental_update(since)
                 
+            elif command == "sync":
+                # Aggregate only the buckets touched since the stored watermarks
+                await pipeline.process_watermarked_update()
+                
+            elif command == "repair":
+                # Drain gap repairs queued via POST /admin/gaps/repair
+                await pipeline.process_dirty_ranges()
+                
             elif command == "full":
                 # Process all historical data
                 await pipeline.process_historical_data()
                 
+            elif command == "rebuild" or command.startswith("rebuild:"):
+                # Set-based historical rebuild, one statement per chunk (format: rebuild or rebuild:2024-01-01)
+                # Parallelism comes from PIPELINE_MAX_PARALLEL (default 4)
+                start = datetime.fromisoformat(command.split(":", 1)[1]) if ":" in command else None
+                await pipeline.process_historical_data_range(start_date=start)
+                
+            elif command == "verify" or command.startswith("verify:"):
+                # Check cascaded timeframes against direct 1min aggregation (default: last 30 days)
+                end = datetime.now()
+                start = datetime.fromisoformat(command.split(":", 1)[1]) if ":" in command else end - timedelta(days=30)
+                results = await pipeline.verify_cascade(start, end)
+                print(f"\n=== Cascade Verification ({start.date()} to {end.date()}) ===")
+                failed = False
+                for tf, r in results.items():
+                    ok = r["missing"] == 0 and r["extra"] == 0 and r["mismatched"] == 0
+                    failed = failed or not ok
+                    print(f"  {tf:6s} <- {r['source']:6s}: {'OK' if ok else 'MISMATCH'} "
+                          f"(expected={r['expected']}, missing={r['missing']}, extra={r['extra']}, mismatched={r['mismatched']})")
+                if failed:
+                    sys.exit(1)
+                
+            elif command == "pivots" or command.startswith("pivots:"):
+                # Rebuild daily pivots only (format: pivots or pivots:2024-01-01)
+                data_start, data_end = await pipeline.get_data_range()
+                if ":" in command:
+                    data_start = datetime.fromisoformat(command.split(":", 1)[1])
+                await pipeline.refresh_daily_pivots(data_start, data_end)
+                
             elif command.startswith("since:"):
                 # Process since specific date (format: since:2024-01-01)
                 date_str = command.split(":", 1)[1]
@@ -413,7 +825,7 @@ async def main():
                 await pipeline.process_incremental_update(since)
                 
             else:
-                print("Usage: python data_transformation_pipeline.py [stats|incremental|full|since:YYYY-MM-DD]")
+                print("Usage: python data_transformation_pipeline.py [stats|incremental|sync|repair|full|rebuild[:YYYY-MM-DD]|since:YYYY-MM-DD|pivots[:YYYY-MM-DD]|verify[:YYYY-MM-DD]]")
                 sys.exit(1)
         else:
             # Default: show stats
@@ -3,29 +3,49 @@
 Real-time Data Synchronization Service
 Monitors for new data in nifty50_ohlc and automatically updates ml_labeled_data
 Supports both periodic syncing and event-driven updates
+
+Event-driven mode LISTENs on 'nifty50_ohlc_changed' (backend/create_nifty50_ohlc_notify.sql):
+a notification wakes the loop, a short debounce folds a burst of inserts into one
+incremental aggregation, and the sync interval remains as a polling fallback for
+missed notifications or a lost listener connection.
 """
 
 import asyncio
 import asyncpg
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional, Set
 import os
 import json
+import time
+from collections import deque
 from data_transformation_pipeline import DataTransformationPipeline, TIMEFRAMES
+from app.session_calendar import get_calendar  # backend/ is on sys.path via the pipeline
 
 logger = logging.getLogger(__name__)
 
+NOTIFY_CHANNEL = "nifty50_ohlc_changed"
+
 class RealTimeSyncService:
     """Service to sync new data from nifty50_ohlc to ml_labeled_data in real-time"""
     
-    def __init__(self, database_url: str, sync_interval_seconds: int = 60):
+    def __init__(self, database_url: str, sync_interval_seconds: int = 60,
+                 debounce_seconds: float = 0.25, listen: bool = True):
         self.database_url = database_url
         self.sync_interval = sync_interval_seconds
+        self.debounce = debounce_seconds
+        self.listen = listen
         self.pipeline = DataTransformationPipeline(database_url)
         self.last_sync_time: Optional[datetime] = None
         self.running = False
         
+        # Notification state: set by the asyncpg listener callback, consumed by the loop
+        self._listener: Optional[asyncpg.Connection] = None
+        self._wakeup = asyncio.Event()
+        self._pending_days: Set[date] = set()
+        self._pending_txn_at: Optional[float] = None
+        self.latencies = deque(maxlen=500)  # seconds from inserting transaction to aggregated bars
+        
     async def start(self):
         """Start the real-time sync service"""
         logger.info("Starting real-time sync service...")
@@ -36,11 +56,17 @@ class RealTimeSyncService:
         # Initialize last sync time
         await self._initialize_last_sync_time()
         
-        # Start the sync loop
+        # Start the sync loop: wake on a notification, or poll after sync_interval
         while self.running:
             try:
-                await self._sync_new_data()
-                await asyncio.sleep(self.sync_interval)
+                if self.listen and self._listener is None:
+                    await self._start_listener()
+                
+                notified = await self._wait_for_change()
+                if notified:
+                    await self._sync_notified()
+                else:
+                    await self._sync_new_data()
             except Exception as e:
                 logger.error(f"Sync error: {e}")
                 await asyncio.sleep(self.sync_interval)
@@ -49,20 +75,140 @@ class RealTimeSyncService:
         """Stop the real-time sync service"""
         logger.info("Stopping real-time sync service...")
         self.running = False
+        self._wakeup.set()
+        await self._close_listener()
         await self.pipeline.close()
     
+    async def _start_listener(self):
+        """Open a dedicated connection for LISTEN; on failure stay in polling mode until the next loop"""
+        try:
+            conn = await asyncpg.connect(self.database_url)
+            await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+            conn.add_termination_listener(self._on_listener_lost)
+        except Exception as e:
+            logger.warning(f"LISTEN {NOTIFY_CHANNEL} unavailable, polling every {self.sync_interval}s: {e}")
+            return
+        self._listener = conn
+        logger.info(f"Listening on {NOTIFY_CHANNEL} (debounce {self.debounce}s, polling fallback {self.sync_interval}s)")
+    
+    async def _close_listener(self):
+        if self._listener is not None:
+            conn, self._listener = self._listener, None
+            try:
+                await conn.remove_listener(NOTIFY_CHANNEL, self._on_notify)
+                await conn.close()
+            except Exception:
+                conn.terminate()
+    
+    def _on_listener_lost(self, conn):
+        logger.warning("Listener connection lost; polling until it reconnects")
+        self._listener = None
+        self._wakeup.set()
+    
+    def _on_notify(self, conn, pid, channel, payload):
+        """asyncpg callback: remember what changed and wake the loop"""
+        try:
+            event = json.loads(payload)
+            self._pending_days.add(date.fromisoformat(event['day']))
+            txn_at = float(event['txn_at'])
+            # Keep the oldest unsynced insert so latency is measured from the earliest waiting bar
+            if self._pending_txn_at is None or txn_at < self._pending_txn_at:
+                self._pending_txn_at = txn_at
+        except (ValueError, KeyError, TypeError):
+            logger.debug(f"Ignoring malformed notification: {payload!r}")
+        self._wakeup.set()
+    
+    async def _wait_for_change(self) -> bool:
+        """True when woken by notifications (after debouncing), False on the polling timeout"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.sync_interval)
+        except asyncio.TimeoutError:
+            return False
+        
+        # Let the rest of a burst arrive before aggregating once
+        await asyncio.sleep(self.debounce)
+        self._wakeup.clear()
+        return bool(self._pending_days)
+    
+    async def _sync_notified(self):
+        """Aggregate after notifications: no source scan, just the watermarked update"""
+        days, self._pending_days = self._pending_days, set()
+        txn_at, self._pending_txn_at = self._pending_txn_at, None
+        
+        await self._drain_repairs()
+        
+        # Rows landing on earlier sessions are behind every watermark; re-aggregate those sessions
+        synced_day = self.last_sync_time.date() if self.last_sync_time else None
+        late_days = sorted(d for d in days if synced_day and d < synced_day)
+        if late_days:
+            await self._queue_late_days(late_days)
+        
+        await self.pipeline.process_watermarked_update()
+        
+        watermarks = await self.pipeline.get_watermarks()
+        if watermarks.get('1min'):
+            self.last_sync_time = watermarks['1min']
+        
+        if txn_at is not None:
+            latency = time.time() - txn_at
+            self.latencies.append(latency)
+            logger.info(f"Synced {len(days)} notified day(s) in {latency * 1000:.0f} ms from insert")
+    
+    async def _queue_late_days(self, days):
+        """Queue whole sessions for process_dirty_ranges (aggregation_dirty_ranges)"""
+        calendar = get_calendar()
+        ranges = [calendar.session_bounds(d) for d in days]
+        ranges = [(o, c - timedelta(microseconds=1)) for o, c in (r for r in ranges if r)]
+        if not ranges:
+            return
+        try:
+            async with self.pipeline.pool.acquire() as conn:
+                await conn.executemany("""
+                    INSERT INTO aggregation_dirty_ranges (symbol, range_start, range_end, needs_backfill)
+                    VALUES ('NIFTY', $1, $2, FALSE)
+                """, ranges)
+        except asyncpg.UndefinedTableError:
+            logger.warning(f"Late rows for {days} not re-aggregated; apply backend/create_aggregation_dirty_ranges.sql")
+            return
+        await self._drain_repairs()
+    
+    def latency_stats(self) -> dict:
+        """p50/p95/max insert-to-aggregate latency (ms) over recent notified syncs"""
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {
+            "samples": len(ordered),
+            "p50_ms": round(pick(0.50) * 1000, 1),
+            "p95_ms": round(pick(0.95) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+    
     async def _initialize_last_sync_time(self):
-        """Initialize the last sync time from database or use a recent time"""
+        """Initialize the last sync time from the 1min watermark, the database, or a recent time"""
+        try:
+            watermarks = await self.pipeline.get_watermarks()
+        except asyncpg.UndefinedTableError:
+            logger.warning("aggregation_watermarks table missing; run backend/create_aggregation_watermarks.sql. "
+                           "Falling back to the latest 1min bar")
+            watermarks = {}
+        
+        if watermarks.get('1min'):
+            self.last_sync_time = watermarks['1min']
+            logger.info(f"Initialized last sync time from 1min watermark: {self.last_sync_time}")
+            return
+        
         async with self.pipeline.pool.acquire() as conn:
-            # Get the latest timestamp from ml_labeled_data
+            # Get the latest 1min bar from ml_labeled_data
             result = await conn.fetchrow("""
-                SELECT MAX(updated_at) as last_update
+                SELECT MAX(time) as last_bar
                 FROM ml_labeled_data
-                WHERE symbol = 'NIFTY'
+                WHERE symbol = 'NIFTY' AND timeframe = '1min'
             """)
             
-            if result and result['last_update']:
-                self.last_sync_time = result['last_update']
+            if result and result['last_bar']:
+                self.last_sync_time = result['last_bar']
                 logger.info(f"Initialized last sync time from database: {self.last_sync_time}")
             else:
                 # If no data exists, start from 24 hours ago
@@ -93,6 +239,8 @@ class RealTimeSyncService:
     
     async def _sync_new_data(self):
         """Sync new data for all timeframes"""
+        await self._drain_repairs()
+        
         new_data_range = await self._get_new_source_data_range()
         
         if not new_data_range:
@@ -103,8 +251,8 @@ class RealTimeSyncService:
         
         logger.info(f"Syncing new data from {min_time} to {max_time}")
         
-        # Update data using the pipeline's incremental update method
-        await self.pipeline.process_incremental_update(min_time)
+        # Re-aggregate only the buckets after each timeframe's watermark
+        await self.pipeline.process_watermarked_update()
         
         # Update last sync time
         self.last_sync_time = max_time
@@ -112,6 +260,15 @@ class RealTimeSyncService:
         # Log sync statistics
         await self._log_sync_stats()
     
+    async def _drain_repairs(self):
+        """Re-aggregate ranges queued by the gap scanner (aggregation_dirty_ranges)"""
+        try:
+            repaired = await self.pipeline.process_dirty_ranges()
+        except asyncpg.UndefinedTableError:
+            return  # backend/create_aggregation_dirty_ranges.sql not applied
+        if repaired:
+            logger.info(f"Repaired {repaired} queued gap ranges")
+    
     async def _log_sync_stats(self):
         """Log statistics about the sync operation"""
         async with self.pipeline.pool.acquire() as conn:
@@ -125,6 +282,10 @@ class RealTimeSyncService:
             
             if result:
                 logger.info(f"Sync stats: {result['total_records']} total records, {result['recent_updates']} updated in last hour")
+        
+        latency = self.latency_stats()
+        if latency:
+            logger.info(f"Insert-to-aggregate latency: {latency}")
 
 class DataRefreshIntegration:
     """Integration with the existing data refresh mechanism in the backend"""
@@ -138,9 +299,8 @@ class DataRefreshIntegration:
         await self.pipeline.connect()
         
         try:
-            # Run incremental sync for the last hour
-            since_time = datetime.now(timezone.utc) - timedelta(hours=1)
-            await self.pipeline.process_incremental_update(since_time)
+            # Catch every timeframe up from its watermark
+            await self.pipeline.process_watermarked_update()
             
             # Get and log refresh statistics
             stats = await self.pipeline.get_transformation_stats()
@@ -161,8 +321,10 @@ async def run_sync_service():
     
     # Configure sync interval (default 60 seconds, can be overridden)
     sync_interval = int(os.getenv('SYNC_INTERVAL_SECONDS', '60'))
+    debounce = float(os.getenv('SYNC_DEBOUNCE_MS', '250')) / 1000
+    listen = os.getenv('SYNC_LISTEN', 'true').lower() not in ('0', 'false', 'no')
     
-    service = RealTimeSyncService(database_url, sync_interval)
+    service = RealTimeSyncService(database_url, sync_interval, debounce_seconds=debounce, listen=listen)
     
     try:
         await service.start()
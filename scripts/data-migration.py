@@ -6,17 +6,41 @@ This script handles data migration between environments:
 - Production -> Staging (subset of data)
 - Production -> Development (sample data)
 - Backup creation and restoration
+
+Tables are copied one date range at a time. The default method streams
+COPY ... TO STDOUT from the source straight into COPY ... FROM STDIN on the
+target, so rows are never materialized in Python and both servers work at
+once. The keyset method (for targets whose column types differ) pages on the
+table key instead of OFFSET and writes each page while the next is read.
+
+run_migration splits the range into day-aligned partitions handled by
+--workers concurrent workers. Each partition's checksum (row count plus an
+order-independent sum of per-row md5 hashes) is compared on both sides, and
+only partitions that differ are re-copied and verified again, so a rerun of an
+interrupted or already complete sync only moves what is missing.
+
+Afterwards only cache entries overlapping the re-copied partitions are
+invalidated (app.cache_invalidation), so charts outside the migrated ranges
+stay cached; --rewarm-url re-requests the dropped CPR windows from the API.
 """
 
 import asyncio
 import asyncpg
+import httpx
 import redis.asyncio as redis
 import logging
 import argparse
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Sequence
 import os
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from app.cache_invalidation import invalidate_ranges  # noqa: E402
+from app.database import _normalize_symbol  # noqa: E402
+from app.live_bars import bar_epoch  # noqa: E402
 
 
 @dataclass
@@ -35,6 +59,62 @@ class MigrationConfig:
     redis_url: str
     days_to_migrate: int = 90
     batch_size: int = 10000
+    method: str = "copy"         # copy | keyset
+    copy_format: str = "binary"  # binary needs identical column types on both sides; text does not
+    prefetch: int = 4            # chunks/pages buffered between reader and writer
+    workers: int = 4             # partitions migrated concurrently
+    partition_days: int = 7
+    verify_only: bool = False    # report mismatched partitions without copying
+    force: bool = False          # copy every partition, even when checksums match
+    invalidate_dry_run: bool = False  # report the cache keys that would be dropped
+    rewarm_url: Optional[str] = None  # API base URL to re-request dropped CPR windows from
+
+
+@dataclass
+class TableSpec:
+    table: str
+    columns: Sequence[str]
+    key: Sequence[str]           # unique, ordered; also the keyset pagination key
+    time_column: str = "timestamp"
+
+
+@dataclass
+class PartitionResult:
+    start: datetime
+    end: datetime
+    source: tuple                # (rows, hash)
+    target: tuple
+    copied: int = 0
+    verified: Optional[bool] = None
+
+    @property
+    def matched(self) -> bool:
+        return self.source == self.target
+
+    @property
+    def changed(self) -> bool:
+        """Target rows were replaced (possibly by zero rows when the target had extras)"""
+        return bool(self.copied) or self.verified is not None
+
+
+@dataclass
+class SyncReport:
+    table: str
+    partitions: List[PartitionResult] = field(default_factory=list)
+
+    def summary(self) -> str:
+        copied = [p for p in self.partitions if p.changed]
+        failed = [p for p in self.partitions if p.verified is False or (not p.matched and p.verified is None)]
+        return (f"{self.table}: {len(self.partitions)} partitions, {len(copied)} re-copied "
+                f"({sum(p.copied for p in copied)} rows), {len(failed)} still mismatched")
+
+
+OHLC_TABLE = TableSpec("nifty50_ohlc", ["timestamp", "open", "high", "low", "close", "volume"], ["timestamp"])
+ML_LABELS_TABLE = TableSpec(
+    "ml_labeled_data",
+    ["timestamp", "symbol", "prediction", "confidence", "model_version", "features"],
+    ["timestamp", "symbol"],
+)
 
 
 class DataMigrator:
@@ -62,133 +142,248 @@ class DataMigrator:
         
         self.redis_conn = redis.from_url(self.config.redis_url)
         
+        # One connection per partition worker on each side
+        self.source_pool = await asyncpg.create_pool(
+            host=self.config.source.host,
+            port=self.config.source.port,
+            database=self.config.source.database,
+            user=self.config.source.username,
+            password=self.config.source.password,
+            min_size=1,
+            max_size=self.config.workers,
+            server_settings={'timezone': 'UTC'}  # checksums compare timestamp text across servers
+        )
+        self.target_pool = await asyncpg.create_pool(
+            host=self.config.target.host,
+            port=self.config.target.port,
+            database=self.config.target.database,
+            user=self.config.target.username,
+            password=self.config.target.password,
+            min_size=1,
+            max_size=self.config.workers,
+            server_settings={'timezone': 'UTC'}  # checksums compare timestamp text across servers
+        )
+        
     async def close_connections(self):
         """Close all database connections"""
         await self.source_conn.close()
         await self.target_conn.close()
+        await self.source_pool.close()
+        await self.target_pool.close()
         await self.redis_conn.close()
         
     async def migrate_ohlc_data(self, start_date: datetime, end_date: datetime):
         """Migrate OHLC data from source to target"""
-        self.logger.info(f"Migrating OHLC data from {start_date} to {end_date}")
+        await self.migrate_table(OHLC_TABLE, start_date, end_date)
         
-        # Get total count for progress tracking
-        count_query = """
-        SELECT COUNT(*) FROM nifty50_ohlc 
-        WHERE timestamp BETWEEN $1 AND $2
+    async def migrate_ml_labels(self, start_date: datetime, end_date: datetime):
+        """Migrate ML labels from source to target"""
+        await self.migrate_table(ML_LABELS_TABLE, start_date, end_date)
+    
+    async def migrate_table(self, spec: TableSpec, start_date: datetime, end_date: datetime,
+                            source_conn: Optional[asyncpg.Connection] = None,
+                            target_conn: Optional[asyncpg.Connection] = None) -> int:
         """
-        total_records = await self.source_conn.fetchval(count_query, start_date, end_date)
-        self.logger.info(f"Total records to migrate: {total_records}")
+        Replace the target's rows in [start_date, end_date] with the source's.
+        The delete and the load share one transaction, so a failure leaves the
+        target range as it was.
+        """
+        source_conn = source_conn or self.source_conn
+        target_conn = target_conn or self.target_conn
+        self.logger.info(f"Migrating {spec.table} from {start_date} to {end_date} ({self.config.method})")
+        started = datetime.now()
         
-        # Clear existing data in target for the date range
-        await self.target_conn.execute(
-            "DELETE FROM nifty50_ohlc WHERE timestamp BETWEEN $1 AND $2",
-            start_date, end_date
-        )
+        async with target_conn.transaction():
+            await target_conn.execute(
+                f"DELETE FROM {spec.table} WHERE {spec.time_column} BETWEEN $1 AND $2",
+                start_date, end_date
+            )
+            if self.config.method == "copy":
+                migrated = await self._stream_copy(spec, start_date, end_date, source_conn, target_conn)
+            else:
+                migrated = await self._keyset_copy(spec, start_date, end_date, source_conn, target_conn)
         
-        # Migrate data in batches
-        offset = 0
-        migrated = 0
+        elapsed = (datetime.now() - started).total_seconds()
+        rate = migrated / elapsed if elapsed > 0 else 0
+        self.logger.info(f"{spec.table} migration completed: {migrated} records in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+        return migrated
+    
+    async def _stream_copy(self, spec: TableSpec, start_date: datetime, end_date: datetime,
+                           source_conn: asyncpg.Connection, target_conn: asyncpg.Connection) -> int:
+        """Pipe COPY TO STDOUT on the source into COPY FROM STDIN on the target through a bounded queue"""
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.config.prefetch)
+        done = object()
+        copied_bytes = 0
         
-        while offset < total_records:
-            query = """
-            SELECT timestamp, open, high, low, close, volume
-            FROM nifty50_ohlc 
-            WHERE timestamp BETWEEN $1 AND $2
-            ORDER BY timestamp
-            LIMIT $3 OFFSET $4
-            """
-            
-            rows = await self.source_conn.fetch(
-                query, start_date, end_date, self.config.batch_size, offset
-            )
-            
-            if not rows:
-                break
-                
-            # Insert batch into target
-            await self.target_conn.executemany(
-                """
-                INSERT INTO nifty50_ohlc (timestamp, open, high, low, close, volume)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                ON CONFLICT (timestamp) DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume,
-                    updated_at = NOW()
-                """,
-                rows
-            )
-            
-            migrated += len(rows)
-            offset += self.config.batch_size
-            
-            progress = (migrated / total_records) * 100
-            self.logger.info(f"Progress: {progress:.1f}% ({migrated}/{total_records})")
-            
-        self.logger.info(f"OHLC data migration completed: {migrated} records")
+        failures: List[BaseException] = []
         
-    async def migrate_ml_labels(self, start_date: datetime, end_date: datetime):
-        """Migrate ML labels from source to target"""
-        self.logger.info(f"Migrating ML labels from {start_date} to {end_date}")
+        async def read():
+            try:
+                await source_conn.copy_from_query(
+                    f"""
+                    SELECT {', '.join(spec.columns)} FROM {spec.table}
+                    WHERE {spec.time_column} BETWEEN $1 AND $2
+                    """,
+                    start_date, end_date,
+                    output=chunks.put,
+                    format=self.config.copy_format,
+                )
+            except Exception as e:
+                failures.append(e)  # end the target COPY, then fail so the transaction rolls back
+            await chunks.put(done)
+        
+        async def chunk_source():
+            nonlocal copied_bytes
+            while True:
+                chunk = await chunks.get()
+                if chunk is done:
+                    return
+                copied_bytes += len(chunk)
+                yield chunk
+        
+        reader = asyncio.create_task(read())
+        try:
+            status = await target_conn.copy_to_table(
+                spec.table, source=chunk_source(), columns=list(spec.columns), format=self.config.copy_format
+            )
+        except BaseException:
+            reader.cancel()
+            raise
+        await reader
+        if failures:
+            raise failures[0]
         
-        # Get total count
-        count_query = """
-        SELECT COUNT(*) FROM ml_labeled_data 
-        WHERE timestamp BETWEEN $1 AND $2
+        migrated = int(status.split()[-1])
+        self.logger.info(f"Streamed {copied_bytes / 1e6:.1f} MB into {spec.table}")
+        return migrated
+    
+    async def _keyset_copy(self, spec: TableSpec, start_date: datetime, end_date: datetime,
+                           source_conn: asyncpg.Connection, target_conn: asyncpg.Connection) -> int:
+        """Page on the key (no OFFSET) and write page N while page N+1 is being read"""
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.config.prefetch)
+        cols = ", ".join(spec.columns)
+        keys = ", ".join(spec.key)
+        after = ", ".join(f"${i + 3}" for i in range(len(spec.key)))
+        first_page = f"""
+            SELECT {cols} FROM {spec.table}
+            WHERE {spec.time_column} BETWEEN $1 AND $2
+            ORDER BY {keys}
+            LIMIT {int(self.config.batch_size)}
+        """
+        next_page = f"""
+            SELECT {cols} FROM {spec.table}
+            WHERE {spec.time_column} BETWEEN $1 AND $2 AND ({keys}) > ({after})
+            ORDER BY {keys}
+            LIMIT {int(self.config.batch_size)}
         """
-        total_records = await self.source_conn.fetchval(count_query, start_date, end_date)
-        self.logger.info(f"Total ML labels to migrate: {total_records}")
         
-        # Clear existing data
-        await self.target_conn.execute(
-            "DELETE FROM ml_labeled_data WHERE timestamp BETWEEN $1 AND $2",
-            start_date, end_date
-        )
+        failures: List[BaseException] = []
         
-        # Migrate in batches
-        offset = 0
+        async def read():
+            last: Optional[List] = None
+            try:
+                while True:
+                    if last is None:
+                        rows = await source_conn.fetch(first_page, start_date, end_date)
+                    else:
+                        rows = await source_conn.fetch(next_page, start_date, end_date, *last)
+                    if not rows:
+                        break
+                    await pages.put(rows)
+                    last = [rows[-1][k] for k in spec.key]
+                    if len(rows) < self.config.batch_size:
+                        break
+            except Exception as e:
+                failures.append(e)
+            await pages.put(None)
+        
+        reader = asyncio.create_task(read())
         migrated = 0
+        try:
+            while True:
+                rows = await pages.get()
+                if rows is None:
+                    break
+                await target_conn.copy_records_to_table(spec.table, records=rows, columns=list(spec.columns))
+                migrated += len(rows)
+                self.logger.info(f"{spec.table}: {migrated} records copied")
+        except BaseException:
+            reader.cancel()
+            raise
+        await reader
+        if failures:
+            raise failures[0]
+        return migrated
         
-        while offset < total_records:
-            query = """
-            SELECT timestamp, symbol, prediction, confidence, model_version, features
-            FROM ml_labeled_data 
-            WHERE timestamp BETWEEN $1 AND $2
-            ORDER BY timestamp
-            LIMIT $3 OFFSET $4
-            """
-            
-            rows = await self.source_conn.fetch(
-                query, start_date, end_date, self.config.batch_size, offset
-            )
-            
-            if not rows:
-                break
-                
-            await self.target_conn.executemany(
-                """
-                INSERT INTO ml_labeled_data (timestamp, symbol, prediction, confidence, model_version, features)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                ON CONFLICT (timestamp, symbol) DO UPDATE SET
-                    prediction = EXCLUDED.prediction,
-                    confidence = EXCLUDED.confidence,
-                    model_version = EXCLUDED.model_version,
-                    features = EXCLUDED.features,
-                    updated_at = NOW()
-                """,
-                rows
-            )
-            
-            migrated += len(rows)
-            offset += self.config.batch_size
-            
-            progress = (migrated / total_records) * 100
-            self.logger.info(f"Progress: {progress:.1f}% ({migrated}/{total_records})")
-            
-        self.logger.info(f"ML labels migration completed: {migrated} records")
+    def partitions(self, start_date: datetime, end_date: datetime):
+        """Day-aligned [start, end] ranges so reruns over a moving window produce the same partitions"""
+        step = timedelta(days=self.config.partition_days)
+        # Boundaries sit on multiples of `step` from a fixed Monday, not on start_date
+        anchor = datetime(2000, 1, 3)
+        upper = anchor + ((start_date - anchor) // step + 1) * step
+        bounds = []
+        lower = start_date
+        while lower <= end_date:
+            bounds.append((lower, min(upper - timedelta(microseconds=1), end_date)))
+            lower, upper = upper, upper + step
+        return bounds
+    
+    @staticmethod
+    async def checksum(conn: asyncpg.Connection, spec: TableSpec, start: datetime, end: datetime) -> tuple:
+        """
+        (rows, sum of the first 60 bits of each row's md5); order-independent, so no sort is needed.
+        ROW(...)::text keeps NULLs distinct from empty strings and positional; timestamptz text
+        depends on the session TimeZone, which the pools pin to UTC.
+        """
+        row_text = "ROW(" + ", ".join(spec.columns) + ")::text"
+        row = await conn.fetchrow(f"""
+            SELECT COUNT(*) AS rows,
+                   COALESCE(SUM(('x' || LEFT(md5({row_text}), 15))::bit(60)::bigint), 0) AS hash
+            FROM {spec.table}
+            WHERE {spec.time_column} BETWEEN $1 AND $2
+        """, start, end)
+        return row['rows'], int(row['hash'])
+    
+    async def _checksums(self, spec: TableSpec, start: datetime, end: datetime):
+        async with self.source_pool.acquire() as source, self.target_pool.acquire() as target:
+            return await asyncio.gather(self.checksum(source, spec, start, end),
+                                        self.checksum(target, spec, start, end))
+    
+    async def sync_partition(self, spec: TableSpec, start: datetime, end: datetime) -> PartitionResult:
+        """Compare one partition and re-copy it if it differs (or always, with force)"""
+        source_sum, target_sum = await self._checksums(spec, start, end)
+        result = PartitionResult(start, end, source_sum, target_sum)
+        if self.config.verify_only or (result.matched and not self.config.force):
+            return result
+        
+        async with self.source_pool.acquire() as source, self.target_pool.acquire() as target:
+            result.copied = await self.migrate_table(spec, start, end, source, target)
+            result.target = await self.checksum(target, spec, start, end)
+        result.verified = result.matched
+        if not result.verified:
+            # e.g. source rows written during the copy; the next run picks it up
+            self.logger.warning(f"{spec.table} {start} - {end}: still differs after copy "
+                                f"(source {result.source[0]} rows, target {result.target[0]} rows)")
+        return result
+    
+    async def sync_table(self, spec: TableSpec, start_date: datetime, end_date: datetime) -> SyncReport:
+        """Run sync_partition over every partition with at most `workers` at a time"""
+        bounds = self.partitions(start_date, end_date)
+        semaphore = asyncio.Semaphore(self.config.workers)
+        report = SyncReport(spec.table)
+        
+        async def worker(start: datetime, end: datetime):
+            async with semaphore:
+                result = await self.sync_partition(spec, start, end)
+            report.partitions.append(result)
+            state = "match" if result.matched else ("copied" if result.changed else "DIFFERS")
+            self.logger.info(f"{spec.table} {start:%Y-%m-%d} - {end:%Y-%m-%d}: {state} "
+                             f"({result.source[0]} rows) [{len(report.partitions)}/{len(bounds)}]")
+        
+        await asyncio.gather(*(worker(start, end) for start, end in bounds))
+        report.partitions.sort(key=lambda p: p.start)
+        self.logger.info(report.summary())
+        return report
         
     async def refresh_continuous_aggregates(self):
         """Refresh continuous aggregates after data migration"""
@@ -202,11 +397,70 @@ class DataMigrator:
             
         self.logger.info("Continuous aggregates refreshed")
         
-    async def clear_cache(self):
-        """Clear Redis cache after migration"""
-        self.logger.info("Clearing Redis cache...")
-        await self.redis_conn.flushdb()
-        self.logger.info("Redis cache cleared")
+    async def affected_symbols(self, spec: TableSpec, start: datetime, end: datetime) -> set:
+        """API symbols whose cached data a re-copied partition can change"""
+        if "symbol" not in spec.columns:
+            return {"NIFTY"}  # nifty50_ohlc holds the index only
+        rows = await self.target_conn.fetch(
+            f"SELECT DISTINCT symbol FROM {spec.table} "
+            f"WHERE {spec.time_column} >= $1 AND {spec.time_column} < $2",
+            start, end
+        )
+        return {_normalize_symbol(r["symbol"]) for r in rows}
+
+    async def clear_cache(self, reports: Sequence[SyncReport]):
+        """Invalidate cache entries overlapping the re-copied partitions instead of flushing Redis"""
+        specs = {spec.table: spec for spec in (OHLC_TABLE, ML_LABELS_TABLE)}
+        ranges, symbols = [], set()
+        for report in reports:
+            for p in report.partitions:
+                if p.changed:
+                    ranges.append((bar_epoch(p.start), bar_epoch(p.end)))
+                    symbols |= await self.affected_symbols(specs[report.table], p.start, p.end)
+
+        self.logger.info(f"Invalidating cache for {sorted(symbols)} over {len(ranges)} partitions...")
+        result = await invalidate_ranges(self.redis_conn, symbols, ranges, dry_run=self.config.invalidate_dry_run)
+        self.logger.info(f"Cache invalidation: {result}")
+        if self.config.invalidate_dry_run:
+            for key in result.deleted:
+                self.logger.info(f"  would delete {key}")
+        elif self.config.rewarm_url:
+            await self.rewarm(result.deleted)
+
+    async def rewarm(self, keys: Sequence[str], concurrency: int = 8):
+        """
+        Re-request dropped CPR windows so the first chart load after the migration
+        is a cache hit. Indicator entries are left to refill on demand: their
+        keys only carry a hash of the parameters.
+        """
+        urls = []
+        for key in keys:
+            parts = key.split(":")
+            if parts[0] == "cpr":
+                fields = dict(zip(parts[1::2], parts[2::2]))
+                urls.append(f"{self.config.rewarm_url}/indicators/cpr?symbol={fields['symbol']}"
+                            f"&from={fields['start']}&to={fields['end']}")
+        if not urls:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+        warmed = 0
+
+        async def fetch(client: httpx.AsyncClient, url: str):
+            nonlocal warmed
+            async with semaphore:
+                try:
+                    response = await client.get(url)
+                    if response.status_code == 200:
+                        warmed += 1
+                    else:
+                        self.logger.warning(f"Re-warm {url}: HTTP {response.status_code}")
+                except httpx.HTTPError as e:
+                    self.logger.warning(f"Re-warm {url} failed: {e}")
+
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            await asyncio.gather(*(fetch(client, url) for url in urls))
+        self.logger.info(f"Re-warmed {warmed}/{len(urls)} CPR windows")
         
     async def create_backup(self, backup_path: str):
         """Create a backup of the target database"""
@@ -233,11 +487,18 @@ class DataMigrator:
             self.logger.info(f"Starting migration for {environment} environment")
             self.logger.info(f"Date range: {start_date} to {end_date}")
             
-            # Run migrations
-            await self.migrate_ohlc_data(start_date, end_date)
-            await self.migrate_ml_labels(start_date, end_date)
+            # Run migrations: only partitions whose checksums differ are copied
+            reports = [
+                await self.sync_table(OHLC_TABLE, start_date, end_date),
+                await self.sync_table(ML_LABELS_TABLE, start_date, end_date),
+            ]
+            if self.config.verify_only:
+                return
+            if not any(p.changed for r in reports for p in r.partitions):
+                self.logger.info("Target already matches source; nothing to refresh")
+                return
             await self.refresh_continuous_aggregates()
-            await self.clear_cache()
+            await self.clear_cache(reports)
             
             self.logger.info("Migration completed successfully")
             
@@ -262,7 +523,18 @@ def main():
     parser.add_argument('--target-password', required=True, help='Target database password')
     parser.add_argument('--redis-url', required=True, help='Redis connection URL')
     parser.add_argument('--days', type=int, default=90, help='Number of days to migrate')
-    parser.add_argument('--batch-size', type=int, default=10000, help='Batch size for migration')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Page size for --method keyset')
+    parser.add_argument('--method', choices=['copy', 'keyset'], default='copy',
+                       help='copy: stream COPY between servers; keyset: paged reads with overlapped writes')
+    parser.add_argument('--copy-format', choices=['binary', 'text'], default='binary',
+                       help='COPY format (text tolerates differing column types)')
+    parser.add_argument('--workers', type=int, default=4, help='Partitions migrated concurrently')
+    parser.add_argument('--partition-days', type=int, default=7, help='Days per partition')
+    parser.add_argument('--verify-only', action='store_true', help='Compare checksums without copying')
+    parser.add_argument('--force', action='store_true', help='Re-copy every partition, even matching ones')
+    parser.add_argument('--invalidate-dry-run', action='store_true',
+                        help='List the cache keys a migration would invalidate without deleting them')
+    parser.add_argument('--rewarm-url', help='API base URL; re-request invalidated CPR windows after the migration')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], 
                        default='INFO', help='Log level')
     
@@ -296,7 +568,15 @@ def main():
         target=target_config,
         redis_url=args.redis_url,
         days_to_migrate=args.days,
-        batch_size=args.batch_size
+        batch_size=args.batch_size,
+        method=args.method,
+        copy_format=args.copy_format,
+        workers=max(1, args.workers),
+        partition_days=max(1, args.partition_days),
+        verify_only=args.verify_only,
+        force=args.force,
+        invalidate_dry_run=args.invalidate_dry_run,
+        rewarm_url=args.rewarm_url.rstrip('/') if args.rewarm_url else None
     )
     
     # Run migration
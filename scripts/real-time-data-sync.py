@@ -4,6 +4,14 @@ Real-time Data Synchronization Service
 
 This service handles real-time data updates from external sources
 and synchronizes them across development and production environments.
+
+Raw ticks are folded into live bars (app.live_bars): forming bars go to Redis on
+every tick, closed 1min bars join the OHLC stream.
+
+Feed messages pass through bounded queues (see RealTimeDataSync) and are
+flushed in batches with binary COPY into a per-connection staging table and
+merged with one INSERT ... ON CONFLICT (app.bulk_load), so a burst costs two
+round trips rather than one upsert per row.
 """
 
 import asyncio
@@ -12,13 +20,32 @@ import redis.asyncio as redis
 import logging
 import json
 import aiohttp
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
 import os
+import sys
+import time
+from collections import deque
 from dataclasses import dataclass, asdict
 from enum import Enum
 import websockets
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from app.bulk_load import bulk_upsert  # noqa: E402
+from app.database import _normalize_symbol  # noqa: E402
+from app.config import TIMEFRAME_MINUTES  # noqa: E402
+from app.live_bars import (  # noqa: E402
+    CLOSE_GRACE_SECONDS, LIVE_TIMEFRAMES, BarBuilder, LiveBar, bar_channel, bar_epoch, encode_bar,
+    read_recent, rollup, store_recent,
+)
+from app.session_calendar import get_calendar  # noqa: E402
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+OHLC_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+ML_COLUMNS = ["timestamp", "symbol", "prediction", "confidence", "model_version", "features"]
+
 
 class DataSource(Enum):
     WEBSOCKET = "websocket"
@@ -38,6 +65,14 @@ class OHLCData:
     source: str = "external_api"
 
 
+@dataclass
+class Tick:
+    timestamp: datetime  # naive IST
+    symbol: str
+    price: float
+    quantity: int = 0
+
+
 @dataclass
 class MLLabel:
     timestamp: datetime
@@ -48,7 +83,56 @@ class MLLabel:
     features: Optional[Dict[str, Any]] = None
 
 
+def to_message(record) -> Dict[str, Any]:
+    """Feed-format message for a record, so spilled batches replay through the decoder"""
+    message = asdict(record)
+    message['timestamp'] = record.timestamp.isoformat()
+    message['type'] = 'ohlc' if isinstance(record, OHLCData) else 'ml_prediction'
+    message.pop('source', None)
+    return message
+
+
+class IngestMetrics:
+    """Counters plus recent flush latencies for the ingest pipeline"""
+    
+    def __init__(self, window: int = 500):
+        self.counters: Dict[str, int] = {
+            'received': 0, 'invalid': 0, 'dropped': 0, 'spilled': 0, 'replayed': 0,
+            'flushed': 0, 'flush_retries': 0, 'flush_failures': 0, 'cache_dropped': 0,
+        }
+        self.flush_ms = deque(maxlen=window)
+    
+    def incr(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+    
+    def snapshot(self, depths: Dict[str, int]) -> Dict[str, Any]:
+        ordered = sorted(self.flush_ms)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1) if ordered else None
+        return {
+            **self.counters,
+            **{f'queue_{name}': depth for name, depth in depths.items()},
+            'flush_p50_ms': pick(0.50),
+            'flush_p95_ms': pick(0.95),
+            'flush_max_ms': round(ordered[-1], 1) if ordered else None,
+        }
+
+
 class RealTimeDataSync:
+    """
+    Ingest pipeline:
+    
+        feed -> raw queue -> decode/validate -> ohlc / ml queues -> batcher -> flush (COPY)
+    
+    Every stage is a bounded asyncio.Queue, so memory stays capped and a slow
+    database never stalls the socket reader directly. When the raw queue is full
+    the overflow policy decides: 'block' (stop reading; TCP pushes back on the
+    feed), 'drop_oldest' (keep the freshest data) or 'spill' (append to a JSONL
+    file under spill_dir, replayed once the queue has room). Batches that still
+    fail after flush_retries are spilled too rather than held in memory.
+    """
+    
+    OVERFLOW_POLICIES = ('block', 'drop_oldest', 'spill')
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
@@ -56,11 +140,36 @@ class RealTimeDataSync:
         self.redis_client = None
         self.running = False
         
-        # Data buffers for batch processing
-        self.ohlc_buffer: List[OHLCData] = []
-        self.ml_buffer: List[MLLabel] = []
+        # Batching: flush at buffer_size records or flush_interval seconds after the first one
         self.buffer_size = config.get('buffer_size', 100)
         self.flush_interval = config.get('flush_interval', 10)  # seconds
+        self.flush_retries = config.get('flush_retries', 3)
+        self.flush_workers = config.get('flush_workers', 1)
+        
+        # Backpressure
+        self.overflow_policy = config.get('overflow_policy', 'block')
+        if self.overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {self.OVERFLOW_POLICIES}")
+        queue_size = config.get('queue_size', 10000)
+        self.raw_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.ohlc_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.ml_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.spill_dir = config.get('spill_dir', 'spill')
+        self._spill_lock = asyncio.Lock()
+        
+        # Live bars: ticks -> forming bars in Redis, closed 1min bars -> ohlc_queue
+        self.bar_builder = BarBuilder(config.get('live_timeframes', LIVE_TIMEFRAMES),
+                                      grace_seconds=config.get('bar_close_grace', CLOSE_GRACE_SECONDS))
+        self.forming_ttl = config.get('forming_bar_ttl', 300)  # seconds
+        
+        # Recent-bar cache: capped sorted set per timeframe, appended after each OHLC flush
+        self.cache_queue: asyncio.Queue = asyncio.Queue(maxsize=config.get('cache_queue_size', 1000))
+        self.cache_timeframes = config.get('cache_timeframes', LIVE_TIMEFRAMES)
+        self.recent_cap = config.get('recent_bars_cap', 1000)  # bars kept per timeframe
+        self.calendar = get_calendar()
+        
+        self.metrics = IngestMetrics()
+        self.metrics_interval = config.get('metrics_interval', 60)  # seconds
         
     async def initialize(self):
         """Initialize database connections and Redis client"""
@@ -97,19 +206,29 @@ class RealTimeDataSync:
         tasks = [
             asyncio.create_task(self.websocket_listener()),
             asyncio.create_task(self.rest_api_poller()),
-            asyncio.create_task(self.buffer_flusher()),
+            asyncio.create_task(self.decoder()),
+            asyncio.create_task(self.spill_replayer()),
+            asyncio.create_task(self.bar_closer()),
+            asyncio.create_task(self.metrics_reporter()),
             asyncio.create_task(self.cache_updater())
         ]
+        for _ in range(self.flush_workers):
+            tasks.append(asyncio.create_task(self.batcher('ohlc', self.ohlc_queue, self.flush_ohlc_batch)))
+            tasks.append(asyncio.create_task(self.batcher('ml', self.ml_queue, self.flush_ml_batch)))
         
         try:
             await asyncio.gather(*tasks)
         except Exception as e:
             self.logger.error(f"Service error: {str(e)}")
         finally:
+            # One task failing must not leave the others running against a closed pool
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             await self.cleanup()
     
     async def stop(self):
-        """Stop the service gracefully"""
+        """Stop the service gracefully (queued records are still flushed)"""
         self.running = False
         self.logger.info("Stopping real-time data sync service")
     
@@ -135,9 +254,9 @@ class RealTimeDataSync:
                     async for message in websocket:
                         if not self.running:
                             break
-                            
-                        data = json.loads(message)
-                        await self.process_websocket_data(data)
+                        
+                        # Only enqueue here: decoding and database work happen downstream
+                        await self.enqueue_raw(message)
                         
             except Exception as e:
                 self.logger.error(f"WebSocket error: {str(e)}")
@@ -181,11 +300,61 @@ class RealTimeDataSync:
                 self.logger.error(f"API polling error: {str(e)}")
                 await asyncio.sleep(30)
     
+    async def enqueue_raw(self, message: str):
+        """Hand a raw feed message to the decoder, applying the overflow policy when full"""
+        self.metrics.incr('received')
+        if self.overflow_policy == 'block' or not self.raw_queue.full():
+            await self.raw_queue.put(message)
+        elif self.overflow_policy == 'drop_oldest':
+            self.raw_queue.get_nowait()
+            self.raw_queue.put_nowait(message)
+            self.metrics.incr('dropped')
+        else:
+            await self.spill([message])
+    
+    async def decoder(self):
+        """Decode and validate raw messages into the typed batch queues"""
+        while self.running or not self.raw_queue.empty():
+            try:
+                message = await asyncio.wait_for(self.raw_queue.get(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            try:
+                await self.process_websocket_data(json.loads(message))
+            except Exception as e:
+                # One bad message must never take the decoder down
+                self.metrics.incr('invalid')
+                self.logger.debug(f"Undecodable message: {e}")
+    
     async def process_websocket_data(self, data: Dict[str, Any]):
-        """Process incoming WebSocket data"""
+        """Process one decoded WebSocket message"""
+        if not isinstance(data, dict):
+            raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+        record = self.parse_record(data.get('type'), data, source='websocket')
+        if isinstance(record, Tick):
+            await self.process_tick(record)
+        elif isinstance(record, OHLCData):
+            await self.ohlc_queue.put(record)
+        elif isinstance(record, MLLabel):
+            await self.ml_queue.put(record)
+    
+    async def process_api_data(self, data: Dict[str, Any]):
+        """Process data from REST API"""
+        for item in data.get('ohlc_data', []):
+            record = self.parse_record('ohlc', item, source='rest_api')
+            if record:
+                await self.ohlc_queue.put(record)
+        
+        for item in data.get('ml_predictions', []):
+            record = self.parse_record('ml_prediction', item, source='rest_api')
+            if record:
+                await self.ml_queue.put(record)
+    
+    def parse_record(self, kind: Optional[str], data: Dict[str, Any], source: str):
+        """Build and validate an OHLCData / MLLabel; None (counted as invalid) when it fails"""
         try:
-            if data.get('type') == 'ohlc':
-                ohlc = OHLCData(
+            if kind == 'ohlc':
+                record = OHLCData(
                     timestamp=datetime.fromisoformat(data['timestamp']),
                     symbol=data['symbol'],
                     open=float(data['open']),
@@ -193,12 +362,27 @@ class RealTimeDataSync:
                     low=float(data['low']),
                     close=float(data['close']),
                     volume=int(data['volume']),
-                    source='websocket'
+                    source=source
                 )
-                self.ohlc_buffer.append(ohlc)
-                
-            elif data.get('type') == 'ml_prediction':
-                ml_label = MLLabel(
+                valid = (
+                    min(record.open, record.high, record.low, record.close) > 0
+                    and record.high >= max(record.open, record.close, record.low)
+                    and record.low <= min(record.open, record.close)
+                    and record.volume >= 0
+                )
+            elif kind == 'tick':
+                timestamp = datetime.fromisoformat(data['timestamp'])
+                if timestamp.tzinfo is not None:
+                    timestamp = timestamp.astimezone(IST).replace(tzinfo=None)
+                record = Tick(
+                    timestamp=timestamp,
+                    symbol=_normalize_symbol(data['symbol']),  # same key the API subscribes with
+                    price=float(data.get('price', data.get('last_price'))),
+                    quantity=int(data.get('quantity', 0))
+                )
+                valid = record.price > 0 and record.quantity >= 0
+            elif kind == 'ml_prediction':
+                record = MLLabel(
                     timestamp=datetime.fromisoformat(data['timestamp']),
                     symbol=data['symbol'],
                     prediction=int(data['prediction']),
@@ -206,191 +390,289 @@ class RealTimeDataSync:
                     model_version=data['model_version'],
                     features=data.get('features')
                 )
-                self.ml_buffer.append(ml_label)
-                
-            # Flush buffers if they're full
-            if len(self.ohlc_buffer) >= self.buffer_size:
-                await self.flush_ohlc_buffer()
-            if len(self.ml_buffer) >= self.buffer_size:
-                await self.flush_ml_buffer()
-                
-        except Exception as e:
-            self.logger.error(f"Error processing WebSocket data: {str(e)}")
+                valid = record.prediction in (-1, 0, 1) and 0.0 <= record.confidence <= 1.0
+            else:
+                return None
+        except (KeyError, ValueError, TypeError) as e:
+            self.logger.debug(f"Rejected {kind} record: {e}")
+            valid = False
+        
+        if not valid:
+            self.metrics.incr('invalid')
+            return None
+        return record
     
-    async def process_api_data(self, data: Dict[str, Any]):
-        """Process data from REST API"""
+    async def process_tick(self, tick: Tick):
+        """Fold a tick into the forming bars, publish them, and queue closed 1min bars for COPY"""
+        updated, closed = self.bar_builder.add_tick(tick.symbol, tick.timestamp, tick.price, tick.quantity)
+        if not updated and not closed:
+            return
+        await self.publish_bars(tick.symbol, closed + updated)
+        for tf, bar in closed:
+            await self.write_closed_bar(tick.symbol, tf, bar)
+    
+    async def publish_bars(self, symbol: str, bars):
+        """One pipelined round trip per tick for every timeframe it touched"""
         try:
-            if 'ohlc_data' in data:
-                for item in data['ohlc_data']:
-                    ohlc = OHLCData(
-                        timestamp=datetime.fromisoformat(item['timestamp']),
-                        symbol=item['symbol'],
-                        open=float(item['open']),
-                        high=float(item['high']),
-                        low=float(item['low']),
-                        close=float(item['close']),
-                        volume=int(item['volume']),
-                        source='rest_api'
-                    )
-                    self.ohlc_buffer.append(ohlc)
-            
-            if 'ml_predictions' in data:
-                for item in data['ml_predictions']:
-                    ml_label = MLLabel(
-                        timestamp=datetime.fromisoformat(item['timestamp']),
-                        symbol=item['symbol'],
-                        prediction=int(item['prediction']),
-                        confidence=float(item['confidence']),
-                        model_version=item['model_version'],
-                        features=item.get('features')
-                    )
-                    self.ml_buffer.append(ml_label)
-                    
+            pipe = self.redis_client.pipeline(transaction=False)
+            for tf, bar in bars:
+                channel = bar_channel(symbol, tf)
+                payload = encode_bar(bar)
+                pipe.publish(channel, payload)
+                if not bar.closed:
+                    pipe.set(f"{channel}:forming", payload, ex=self.forming_ttl)
+            await pipe.execute()
         except Exception as e:
-            self.logger.error(f"Error processing API data: {str(e)}")
+            self.logger.debug(f"Bar publish failed: {e}")
     
-    async def buffer_flusher(self):
-        """Periodically flush data buffers to database"""
+    async def write_closed_bar(self, symbol: str, timeframe: str, bar):
+        """Only closed 1min bars reach Postgres; the pipeline derives the other timeframes"""
+        if timeframe != '1min':
+            return
+        await self.ohlc_queue.put(OHLCData(
+            timestamp=bar.time, symbol=symbol, open=bar.open, high=bar.high,
+            low=bar.low, close=bar.close, volume=bar.volume, source='ticks'
+        ))
+    
+    async def bar_closer(self):
+        """Close bars whose period ended without a later tick (quiet markets, session close)"""
         while self.running:
+            await asyncio.sleep(1)
+            now = datetime.now(IST).replace(tzinfo=None)
+            for symbol, tf, bar in self.bar_builder.close_due(now):
+                await self.publish_bars(symbol, [(tf, bar)])
+                await self.write_closed_bar(symbol, tf, bar)
+    
+    async def batcher(self, kind: str, queue: asyncio.Queue, flush):
+        """Collect up to buffer_size records, or whatever arrived flush_interval after the first"""
+        loop = asyncio.get_running_loop()
+        while self.running or not queue.empty():
             try:
-                await asyncio.sleep(self.flush_interval)
-                
-                if self.ohlc_buffer:
-                    await self.flush_ohlc_buffer()
-                if self.ml_buffer:
-                    await self.flush_ml_buffer()
-                    
-            except Exception as e:
-                self.logger.error(f"Buffer flushing error: {str(e)}")
+                batch = [await asyncio.wait_for(queue.get(), timeout=1)]
+            except asyncio.TimeoutError:
+                continue
+            
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.buffer_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self.flush_with_retry(kind, batch, flush)
     
-    async def flush_ohlc_buffer(self):
-        """Flush OHLC data buffer to database"""
-        if not self.ohlc_buffer:
+    async def flush_with_retry(self, kind: str, batch: list, flush):
+        """Flush with exponential backoff; spill the batch to disk if every attempt fails"""
+        for attempt in range(1, self.flush_retries + 1):
+            started = time.perf_counter()
+            try:
+                await flush(batch)
+            except Exception as e:
+                self.logger.error(f"Error flushing {kind} batch of {len(batch)} (attempt {attempt}/{self.flush_retries}): {str(e)}")
+                if attempt < self.flush_retries:
+                    self.metrics.incr('flush_retries')
+                    await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+                continue
+            self.metrics.flush_ms.append((time.perf_counter() - started) * 1000)
+            self.metrics.incr('flushed', len(batch))
             return
-            
+        
+        self.metrics.incr('flush_failures')
+        await self.spill([json.dumps(to_message(record)) for record in batch])
+    
+    async def flush_ohlc_batch(self, batch: List[OHLCData]):
+        """COPY a batch of OHLC records into nifty50_ohlc"""
+        async with self.db_pool.acquire() as conn:
+            result = await bulk_upsert(
+                conn,
+                "nifty50_ohlc",
+                OHLC_COLUMNS,
+                ((item.timestamp, item.open, item.high, item.low, item.close, item.volume)
+                 for item in batch),
+                key_columns=["timestamp"],
+                on_conflict="update",
+                extra_values={"updated_at": "NOW()"},
+                reuse_stage=True,
+            )
+        self.logger.info(f"Flushed {result.rows} OHLC records to database ({result.rows_per_sec:,.0f} rows/s)")
+        
+        # Only stored bars reach the cache; it is best-effort, so never wait on it
         try:
-            async with self.db_pool.acquire() as conn:
-                # Prepare data for batch insert
-                values = [
-                    (
-                        item.timestamp,
-                        item.open,
-                        item.high,
-                        item.low,
-                        item.close,
-                        item.volume
-                    )
-                    for item in self.ohlc_buffer
-                ]
-                
-                await conn.executemany(
-                    """
-                    INSERT INTO nifty50_ohlc (timestamp, open, high, low, close, volume)
-                    VALUES ($1, $2, $3, $4, $5, $6)
-                    ON CONFLICT (timestamp) DO UPDATE SET
-                        open = EXCLUDED.open,
-                        high = EXCLUDED.high,
-                        low = EXCLUDED.low,
-                        close = EXCLUDED.close,
-                        volume = EXCLUDED.volume,
-                        updated_at = NOW()
-                    """,
-                    values
-                )
-                
-                self.logger.info(f"Flushed {len(self.ohlc_buffer)} OHLC records to database")
-                
-                # Clear buffer
-                self.ohlc_buffer.clear()
-                
-        except Exception as e:
-            self.logger.error(f"Error flushing OHLC buffer: {str(e)}")
+            self.cache_queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            self.metrics.incr('cache_dropped')
     
-    async def flush_ml_buffer(self):
-        """Flush ML labels buffer to database"""
-        if not self.ml_buffer:
-            return
+    async def flush_ml_batch(self, batch: List[MLLabel]):
+        """COPY a batch of ML labels into ml_labeled_data"""
+        async with self.db_pool.acquire() as conn:
+            result = await bulk_upsert(
+                conn,
+                "ml_labeled_data",
+                ML_COLUMNS,
+                ((item.timestamp, item.symbol, item.prediction, item.confidence, item.model_version,
+                  json.dumps(item.features) if item.features else None)
+                 for item in batch),
+                key_columns=["timestamp", "symbol"],
+                on_conflict="update",
+                extra_values={"updated_at": "NOW()"},
+                reuse_stage=True,
+            )
+        self.logger.info(f"Flushed {result.rows} ML label records to database ({result.rows_per_sec:,.0f} rows/s)")
+    
+    async def spill(self, messages: List[str]):
+        """Append raw messages to today's spill file"""
+        path = os.path.join(self.spill_dir, f"ingest-{datetime.now():%Y%m%d}.jsonl")
+        async with self._spill_lock:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path, 'a') as f:
+                f.writelines(message + '\n' for message in messages)
+        self.metrics.incr('spilled', len(messages))
+    
+    async def spill_replayer(self):
+        """
+        Feed spilled messages back through the decoder once the raw queue is mostly empty.
+        Files are streamed in spill_replay_batch lines at a time (file I/O runs in a thread)
+        and the replayed byte offset is persisted next to the file, so memory stays bounded
+        however large the spill grew and a restart resumes where replay stopped.
+        """
+        batch_lines = self.config.get('spill_replay_batch', 500)
+        while self.running:
+            await asyncio.sleep(5)
+            if self.raw_queue.qsize() > self.raw_queue.maxsize // 2 or not os.path.isdir(self.spill_dir):
+                continue
             
+            # Files claimed before a restart resume first, at their saved offset
+            names = [n for n in os.listdir(self.spill_dir) if not n.endswith(('.offset', '.offset.tmp'))]
+            for name in sorted(names, key=lambda n: (not n.endswith('.replaying'), n)):
+                path = os.path.join(self.spill_dir, name)
+                if name.endswith('.replaying'):
+                    replaying = path
+                else:
+                    # Claim under a unique name so new spills start a fresh file and a
+                    # later claim of the same day's file never lands on this one
+                    replaying = f"{path}.{time.time_ns()}.replaying"
+                    async with self._spill_lock:
+                        os.replace(path, replaying)
+                    await asyncio.to_thread(self._remove_offset, replaying)
+                offset = await asyncio.to_thread(self._read_spill_offset, replaying)
+                self.logger.info(f"Replaying spilled messages from {name} (offset {offset})")
+                replayed = 0
+                while self.running:
+                    lines, offset = await asyncio.to_thread(self._read_spill_lines, replaying, offset, batch_lines)
+                    if not lines:
+                        break
+                    for message in lines:
+                        await self.raw_queue.put(message)  # blocks: replay must never spill again
+                    await asyncio.to_thread(self._write_spill_offset, replaying, offset)
+                    replayed += len(lines)
+                    self.metrics.incr('replayed', len(lines))
+                if not self.running:
+                    return
+                await asyncio.to_thread(self._remove_spill, replaying)
+                self.logger.info(f"Replayed {replayed} spilled messages from {name}")
+    
+    @staticmethod
+    def _read_spill_offset(path: str) -> int:
         try:
-            async with self.db_pool.acquire() as conn:
-                # Prepare data for batch insert
-                values = [
-                    (
-                        item.timestamp,
-                        item.symbol,
-                        item.prediction,
-                        item.confidence,
-                        item.model_version,
-                        json.dumps(item.features) if item.features else None
-                    )
-                    for item in self.ml_buffer
-                ]
-                
-                await conn.executemany(
-                    """
-                    INSERT INTO ml_labeled_data (timestamp, symbol, prediction, confidence, model_version, features)
-                    VALUES ($1, $2, $3, $4, $5, $6)
-                    ON CONFLICT (timestamp, symbol) DO UPDATE SET
-                        prediction = EXCLUDED.prediction,
-                        confidence = EXCLUDED.confidence,
-                        model_version = EXCLUDED.model_version,
-                        features = EXCLUDED.features,
-                        updated_at = NOW()
-                    """,
-                    values
-                )
-                
-                self.logger.info(f"Flushed {len(self.ml_buffer)} ML label records to database")
-                
-                # Clear buffer
-                self.ml_buffer.clear()
-                
-        except Exception as e:
-            self.logger.error(f"Error flushing ML buffer: {str(e)}")
+            with open(path + '.offset') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
     
-    async def cache_updater(self):
-        """Update Redis cache with latest data"""
+    @staticmethod
+    def _write_spill_offset(path: str, offset: int):
+        tmp = path + '.offset.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(offset))
+        os.replace(tmp, path + '.offset')
+    
+    @staticmethod
+    def _read_spill_lines(path: str, offset: int, limit: int):
+        """Up to `limit` non-empty lines from byte `offset`, and the offset after them"""
+        lines = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while len(lines) < limit:
+                raw = f.readline()
+                if not raw:
+                    break
+                offset += len(raw)
+                line = raw.decode().rstrip('\n')
+                if line.strip():
+                    lines.append(line)
+        return lines, offset
+    
+    @staticmethod
+    def _remove_offset(path: str):
+        if os.path.exists(path + '.offset'):
+            os.remove(path + '.offset')
+    
+    @classmethod
+    def _remove_spill(cls, path: str):
+        os.remove(path)
+        cls._remove_offset(path)
+    
+    def queue_depths(self) -> Dict[str, int]:
+        return {'raw': self.raw_queue.qsize(), 'ohlc': self.ohlc_queue.qsize(), 'ml': self.ml_queue.qsize(),
+                'cache': self.cache_queue.qsize()}
+    
+    async def metrics_reporter(self):
+        """Log queue depth and flush latency, and publish them to Redis"""
         while self.running:
+            await asyncio.sleep(self.metrics_interval)
+            snapshot = self.metrics.snapshot(self.queue_depths())
+            self.logger.info(f"Ingest metrics: {snapshot}")
             try:
-                await asyncio.sleep(30)  # Update cache every 30 seconds
-                
-                # Get latest OHLC data
-                async with self.db_pool.acquire() as conn:
-                    latest_data = await conn.fetch(
-                        """
-                        SELECT timestamp, open, high, low, close, volume
-                        FROM nifty50_ohlc
-                        WHERE timestamp > NOW() - INTERVAL '1 hour'
-                        ORDER BY timestamp DESC
-                        LIMIT 100
-                        """
-                    )
-                    
-                    # Update cache
-                    if latest_data:
-                        cache_data = [
-                            {
-                                'timestamp': row['timestamp'].isoformat(),
-                                'open': float(row['open']),
-                                'high': float(row['high']),
-                                'low': float(row['low']),
-                                'close': float(row['close']),
-                                'volume': row['volume']
-                            }
-                            for row in latest_data
-                        ]
-                        
-                        await self.redis_client.setex(
-                            'latest_ohlc_data',
-                            300,  # 5 minutes TTL
-                            json.dumps(cache_data)
-                        )
-                        
-                        self.logger.debug("Updated cache with latest OHLC data")
-                        
+                await self.redis_client.setex('realtime_sync:metrics', self.metrics_interval * 2, json.dumps(snapshot))
+            except Exception as e:
+                self.logger.debug(f"Could not publish metrics: {e}")
+    
+    async def cache_updater(self):
+        """Append newly flushed bars to the capped recent-bar sets; cost follows the new data only"""
+        while self.running or not self.cache_queue.empty():
+            try:
+                batch = await asyncio.wait_for(self.cache_queue.get(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            try:
+                await self.update_recent_bars(batch)
             except Exception as e:
                 self.logger.error(f"Cache update error: {str(e)}")
     
+    async def update_recent_bars(self, batch: List[OHLCData]):
+        """
+        Store flushed 1min bars, then rebuild only the higher-timeframe buckets they
+        fall in (from the 1min set), so the open bar of each timeframe is extended
+        in place and closed bars are never rewritten.
+        """
+        now = datetime.now(IST).replace(tzinfo=None)
+        by_symbol: Dict[str, List[LiveBar]] = {}
+        for item in batch:
+            by_symbol.setdefault(_normalize_symbol(item.symbol), []).append(LiveBar(
+                item.timestamp, item.timestamp + timedelta(minutes=1), item.open, item.high,
+                item.low, item.close, item.volume, closed=True
+            ))
+        
+        for symbol, bars in by_symbol.items():
+            await store_recent(self.redis_client, symbol, '1min', bars, self.recent_cap)
+            
+            for tf in self.cache_timeframes:
+                minutes = TIMEFRAME_MINUTES[tf]
+                if minutes == 1:
+                    continue
+                rolled = []
+                for start in sorted({self.calendar.bucket_start(bar.time, minutes) for bar in bars}):
+                    bounds = self.calendar.session_bounds(start.date())
+                    end = min(start + timedelta(minutes=minutes), bounds[1]) if bounds else start + timedelta(minutes=minutes)
+                    parts = await read_recent(self.redis_client, symbol, '1min', bar_epoch(start), bar_epoch(end) - 1)
+                    bar = rollup(start, end, parts, closed=now >= end)
+                    if bar:
+                        rolled.append(bar)
+                await store_recent(self.redis_client, symbol, tf, rolled, self.recent_cap)
+    
     async def get_latest_timestamp(self) -> datetime:
         """Get the latest timestamp from the database"""
         try: